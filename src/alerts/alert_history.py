@@ -0,0 +1,137 @@
+import logging
+from collections import Counter, deque
+from datetime import datetime, timezone
+from itertools import count
+from typing import Dict, Any, List, Optional, Deque
+
+logger = logging.getLogger(__name__)
+
+
+class AlertHistory:
+    """Bounded alert history with counters and indexes kept up to date on insert.
+
+    Entries live in a deque of at most max_size items. Counts by severity,
+    endpoint and hourly bucket are incremented when an entry is added and
+    decremented when it is evicted, so statistics never rescan the history.
+    Per-severity and per-endpoint deques of entry ids let filtered pages be
+    read without scanning unrelated entries.
+    """
+
+    def __init__(self, max_size: int = 1000):
+        self.max_size = max_size
+        self._entries: Deque[Dict[str, Any]] = deque(maxlen=max_size)
+        self._ids = count(1)
+        self.by_severity: Counter = Counter()
+        self.by_endpoint: Counter = Counter()
+        self.by_hour: Counter = Counter()
+        self._severity_index: Dict[str, Deque[int]] = {}
+        self._endpoint_index: Dict[str, Deque[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _keys(entry: Dict[str, Any]):
+        anomaly = entry["anomaly"]
+        return anomaly.get("severity", "LOW"), anomaly.get("api_endpoint", "unknown"), entry["timestamp"][:13]
+
+    def append(self, anomaly: Dict[str, Any]) -> Dict[str, Any]:
+        """Record an alert, evicting the oldest one at capacity"""
+        if len(self._entries) == self.max_size:
+            self._evict(self._entries[0])
+        entry = {
+            "id": next(self._ids),
+            "timestamp": datetime.utcnow().isoformat(),
+            "anomaly": anomaly
+        }
+        self._entries.append(entry)
+
+        severity, endpoint, hour = self._keys(entry)
+        self.by_severity[severity] += 1
+        self.by_endpoint[endpoint] += 1
+        self.by_hour[hour] += 1
+        self._severity_index.setdefault(severity, deque()).append(entry["id"])
+        self._endpoint_index.setdefault(endpoint, deque()).append(entry["id"])
+        return entry
+
+    def _evict(self, entry: Dict[str, Any]):
+        # The evicted entry is the oldest, so it is at the left of every index
+        severity, endpoint, hour = self._keys(entry)
+        for counter, key in ((self.by_severity, severity), (self.by_endpoint, endpoint), (self.by_hour, hour)):
+            counter[key] -= 1
+            if counter[key] <= 0:
+                del counter[key]
+        for index, key in ((self._severity_index, severity), (self._endpoint_index, endpoint)):
+            index[key].popleft()
+            if not index[key]:
+                del index[key]
+
+    def _get(self, entry_id: int) -> Dict[str, Any]:
+        return self._entries[entry_id - self._entries[0]["id"]]
+
+    def _newest_first_ids(self, severity: Optional[str], endpoint: Optional[str]):
+        candidates = []
+        if severity is not None:
+            candidates.append(self._severity_index.get(severity, ()))
+        if endpoint is not None:
+            candidates.append(self._endpoint_index.get(endpoint, ()))
+        if not candidates:
+            if self._entries:
+                first = self._entries[0]["id"]
+                return range(first + len(self._entries) - 1, first - 1, -1)
+            return ()
+        # Walk the smallest index; the other filter is checked per entry
+        return reversed(min(candidates, key=len))
+
+    @staticmethod
+    def _iso(value: Optional[datetime]) -> Optional[str]:
+        # Entry timestamps are naive UTC ISO strings, compared as text
+        if value is None:
+            return None
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.isoformat()
+
+    def query(
+        self,
+        limit: int = 100,
+        offset: int = 0,
+        severity: Optional[str] = None,
+        endpoint: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """Return a page of matching alerts, newest first"""
+        start = self._iso(start_time)
+        end = self._iso(end_time)
+        ids = self._newest_first_ids(severity, endpoint)
+        if isinstance(ids, range) and end is None:
+            # Unfiltered pages start directly at the offset
+            ids, offset = ids[offset:], 0
+        page = []
+        skipped = 0
+        for entry_id in ids:
+            entry = self._get(entry_id)
+            if start is not None and entry["timestamp"] < start:
+                break  # Everything further back is older still
+            entry_severity, entry_endpoint, _ = self._keys(entry)
+            if (end is not None and entry["timestamp"] > end) \
+                    or (severity is not None and entry_severity != severity) \
+                    or (endpoint is not None and entry_endpoint != endpoint):
+                continue
+            if skipped < offset:
+                skipped += 1
+                continue
+            page.append(entry)
+            if len(page) >= limit:
+                break
+        return page
+
+    def statistics(self) -> Dict[str, Any]:
+        """Counts over the retained history"""
+        return {
+            "total_alerts": len(self._entries),
+            "alerts_by_severity": dict(self.by_severity),
+            "alerts_by_endpoint": dict(self.by_endpoint),
+            "alerts_by_hour": dict(sorted(self.by_hour.items()))
+        }
@@ -1,10 +1,14 @@
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import json
 import asyncio
 from datetime import datetime
 import aiohttp
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from .alert_history import AlertHistory
+from .delivery_queue import DeliveryQueue
+from .suppression import SuppressionIndex, ESCALATED
+from ..telemetry import ALERT_SEND_SECONDS, ALERT_SEND_FAILURES, span
 
 logger = logging.getLogger(__name__)
 
@@ -12,51 +16,105 @@ logger = logging.getLogger(__name__)
 class AlertConfig:
     severity_thresholds: Dict[str, float]
     notification_endpoints: Dict[str, str]
-    cooldown_period: int  # minutes
+    cooldown_period: int  # minutes a fingerprint stays suppressed after alerting
     alert_history_size: int
+    channel_timeouts: Dict[str, float] = field(default_factory=dict)  # seconds, per channel
+    default_timeout: float = 10.0  # seconds
+    max_concurrent_sends: int = 20
+    rate_limit: float = 1.0  # messages per second, per channel
+    rate_burst: int = 5
+    max_digest_alerts: int = 50
+    max_queued_alerts: int = 10_000  # per channel
+    max_retries: int = 5
+    dead_letter_size: int = 1000
+    queue_path: Optional[str] = None  # SQLite file that keeps undelivered alerts across restarts
+    max_suppressed_fingerprints: int = 10_000
 
 class AlertManager:
     def __init__(self, config: AlertConfig):
         self.config = config
-        self.alert_history = []
-        self.last_alert_times = {}  # Track last alert time per endpoint
+        self.alert_history = AlertHistory(config.alert_history_size)
+        self.listeners = []
+        self.suppression = SuppressionIndex(config.cooldown_period * 60, config.max_suppressed_fingerprints)
+        self.delivery_queue = DeliveryQueue(
+            self._send_alert,
+            config.notification_endpoints,
+            rate=config.rate_limit,
+            burst=config.rate_burst,
+            max_digest=config.max_digest_alerts,
+            max_queued=config.max_queued_alerts,
+            max_retries=config.max_retries,
+            dead_letter_size=config.dead_letter_size,
+            store_path=config.queue_path
+        )
+        # Created on first send so they bind to the running event loop
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._send_semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared HTTP session, creating its connection pool on first use"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.config.max_concurrent_sends)
+            )
+            self._send_semaphore = asyncio.Semaphore(self.config.max_concurrent_sends)
+        return self._session
+
+    def add_listener(self, listener):
+        """Register a callback called with each batch of alert payloads as they are generated"""
+        self.listeners.append(listener)
+
+    async def start(self):
+        """Start the delivery workers, resending alerts queued before a restart"""
+        await self.delivery_queue.start()
+
+    async def close(self):
+        """Flush and stop the delivery workers, then close the shared HTTP session"""
+        await self.delivery_queue.stop()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
 
     async def process_anomalies(self, anomalies: List[Dict[str, Any]]):
         """Process detected anomalies and generate alerts if necessary"""
+        to_alert = []
         for anomaly in anomalies:
-            if self._should_alert(anomaly):
-                await self._generate_alert(anomaly)
-                self._update_alert_history(anomaly)
-
-    def _should_alert(self, anomaly: Dict[str, Any]) -> bool:
-        """Determine if an alert should be generated based on severity and cooldown"""
-        endpoint = anomaly.get("api_endpoint", "unknown")
+            decision = self._should_alert(anomaly)
+            if decision is None:
+                continue
+            # Anomalies are shared with the detection cache and live feed, so mark a copy
+            to_alert.append({**anomaly, "escalated": True} if decision == ESCALATED else anomaly)
+        if not to_alert:
+            return
+
+        await self._generate_alert(to_alert)
+        for anomaly in to_alert:
+            self._update_alert_history(anomaly)
+
+    def _should_alert(self, anomaly: Dict[str, Any]) -> Optional[str]:
+        """NEW or ESCALATED if an alert should be generated based on severity and suppression, else None"""
         severity = anomaly.get("severity", "LOW")
-        current_time = datetime.utcnow()
-
-        # Check cooldown period
-        if endpoint in self.last_alert_times:
-            time_since_last_alert = (current_time - self.last_alert_times[endpoint]).total_seconds() / 60
-            if time_since_last_alert < self.config.cooldown_period:
-                return False
 
         # Check severity threshold
-        return float(anomaly.get("anomaly_score", 0)) <= self.config.severity_thresholds.get(severity, -0.5)
+        if float(anomaly.get("anomaly_score", 0)) > self.config.severity_thresholds.get(severity, -0.5):
+            return None
 
-    async def _generate_alert(self, anomaly: Dict[str, Any]):
-        """Generate and send alert for the detected anomaly"""
-        alert = self._create_alert_payload(anomaly)
-        
-        # Send alerts to configured endpoints
-        for channel, endpoint in self.config.notification_endpoints.items():
+        # Suppress repeats of a recently alerted fingerprint unless severity rises
+        return self.suppression.admit(anomaly)
+
+    async def _generate_alert(self, anomalies: List[Dict[str, Any]]):
+        """Queue alerts for the detected anomalies on every notification channel.
+
+        Delivery happens in the background: see DeliveryQueue for rate
+        limiting, digests, retries and the dead-letter list.
+        """
+        alerts = [self._create_alert_payload(anomaly) for anomaly in anomalies]
+        await self.delivery_queue.put(alerts)
+        for listener in self.listeners:
             try:
-                await self._send_alert(endpoint, alert)
-                logger.info(f"Alert sent successfully to {channel}")
+                listener(alerts)
             except Exception as e:
-                logger.error(f"Failed to send alert to {channel}: {str(e)}")
-
-        # Update last alert time
-        self.last_alert_times[anomaly.get("api_endpoint", "unknown")] = datetime.utcnow()
+                logger.error(f"Error in alert listener: {str(e)}")
 
     def _create_alert_payload(self, anomaly: Dict[str, Any]) -> Dict[str, Any]:
         """Create a structured alert payload"""
@@ -66,6 +124,12 @@ class AlertManager:
             "anomaly_score": anomaly.get("anomaly_score", 0),
             "api_endpoint": anomaly.get("api_endpoint", "unknown"),
             "metrics": anomaly.get("metrics", {}),
+            "latency_percentiles": {
+                "p95": anomaly.get("metrics", {}).get("p95_response_time"),
+                "p99": anomaly.get("metrics", {}).get("p99_response_time")
+            },
+            "fingerprint": "|".join(self.suppression.fingerprint(anomaly)),
+            "escalated": anomaly.get("escalated", False),
             "description": self._generate_alert_description(anomaly),
             "recommendations": self._generate_recommendations(anomaly)
         }
@@ -76,7 +140,8 @@ class AlertManager:
         return (
             f"Anomaly detected in API {anomaly.get('api_endpoint', 'unknown')} "
             f"with severity {anomaly.get('severity', 'LOW')}. "
-            f"Response time: {metrics.get('response_time', 0):.2f}ms, "
+            f"Response time: {metrics.get('response_time', 0):.2f}ms "
+            f"(p95 {metrics.get('p95_response_time', 0):.2f}ms, p99 {metrics.get('p99_response_time', 0):.2f}ms), "
             f"Error rate: {metrics.get('error_rate', 0)*100:.2f}%, "
             f"Request rate: {metrics.get('request_rate', 0)} req/min"
         )
@@ -93,6 +158,12 @@ class AlertManager:
                 "Monitor system resource utilization"
             ])
             
+        if metrics.get("p99_response_time", 0) > 2000 and metrics.get("response_time", 0) <= 1000:  # Slow tail only
+            recommendations.extend([
+                "Investigate tail latency: slow downstream calls, lock contention or GC pauses",
+                "Check timeouts and retries on dependencies"
+            ])
+            
         if metrics.get("error_rate", 0) > 0.1:  # High error rate
             recommendations.extend([
                 "Review error logs for specific error patterns",
@@ -109,48 +180,47 @@ class AlertManager:
             
         return recommendations
 
-    async def _send_alert(self, endpoint: str, alert: Dict[str, Any]):
-        """Send alert to notification endpoint"""
-        async with aiohttp.ClientSession() as session:
-            async with session.post(endpoint, json=alert) as response:
-                if response.status >= 400:
-                    raise Exception(f"Failed to send alert: HTTP {response.status}")
+    async def _send_alert(self, channel: str, endpoint: str, alert: Dict[str, Any]):
+        """Send alert to notification endpoint over the shared session"""
+        session = self._get_session()
+        timeout = aiohttp.ClientTimeout(
+            total=self.config.channel_timeouts.get(channel, self.config.default_timeout)
+        )
+        async with self._send_semaphore:
+            try:
+                with span("send_alert"), ALERT_SEND_SECONDS.labels(channel).time():
+                    async with session.post(endpoint, json=alert, timeout=timeout) as response:
+                        if response.status >= 400:
+                            raise Exception(f"Failed to send alert: HTTP {response.status}")
+            except Exception:
+                ALERT_SEND_FAILURES.labels(channel).inc()
+                raise
 
     def _update_alert_history(self, anomaly: Dict[str, Any]):
         """Update alert history with new alert"""
-        self.alert_history.append({
-            "timestamp": datetime.utcnow().isoformat(),
-            "anomaly": anomaly
-        })
-        
-        # Maintain history size
-        if len(self.alert_history) > self.config.alert_history_size:
-            self.alert_history = self.alert_history[-self.config.alert_history_size:]
-
-    def get_alert_history(self) -> List[Dict[str, Any]]:
-        """Get alert history"""
-        return self.alert_history
+        self.alert_history.append(anomaly)
+
+    def get_alert_history(
+        self,
+        limit: int = 100,
+        offset: int = 0,
+        severity: Optional[str] = None,
+        endpoint: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """Get a page of alert history, newest first"""
+        return self.alert_history.query(limit, offset, severity, endpoint, start_time, end_time)
 
     def get_alert_statistics(self) -> Dict[str, Any]:
         """Get statistics about generated alerts"""
         return {
-            "total_alerts": len(self.alert_history),
-            "alerts_by_severity": self._count_alerts_by_severity(),
-            "alerts_by_endpoint": self._count_alerts_by_endpoint()
+            **self.alert_history.statistics(),
+            "suppression": self.suppression.statistics(),
+            "delivery": {
+                "pending": self.delivery_queue.pending,
+                "sent": self.delivery_queue.sent,
+                "dropped": self.delivery_queue.dropped,
+                "dead_lettered": len(self.delivery_queue.dead_letters)
+            }
         }
-
-    def _count_alerts_by_severity(self) -> Dict[str, int]:
-        """Count alerts by severity level"""
-        severity_counts = {}
-        for alert in self.alert_history:
-            severity = alert["anomaly"].get("severity", "LOW")
-            severity_counts[severity] = severity_counts.get(severity, 0) + 1
-        return severity_counts
-
-    def _count_alerts_by_endpoint(self) -> Dict[str, int]:
-        """Count alerts by API endpoint"""
-        endpoint_counts = {}
-        for alert in self.alert_history:
-            endpoint = alert["anomaly"].get("api_endpoint", "unknown")
-            endpoint_counts[endpoint] = endpoint_counts.get(endpoint, 0) + 1
-        return endpoint_counts
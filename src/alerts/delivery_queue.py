@@ -0,0 +1,300 @@
+import logging
+import asyncio
+import json
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import count
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Deque, Tuple
+from .suppression import severity_rank
+
+logger = logging.getLogger(__name__)
+
+# Sends one payload to a channel's endpoint, raising on failure
+AlertSender = Callable[[str, str, Dict[str, Any]], Awaitable[None]]
+
+@dataclass
+class QueuedAlert:
+    id: int
+    channel: str
+    alert: Dict[str, Any]
+    attempts: int = 0
+
+
+class TokenBucket:
+    """Allows rate sends per second on average, with bursts of up to burst"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """Wait until a token is available and take it"""
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AlertQueueStore:
+    """SQLite file holding queued and dead-lettered alerts across restarts.
+
+    Calls are blocking and serialized by a lock; the queue runs them in a
+    worker thread.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS alerts ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT NOT NULL, payload TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, dead INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.commit()
+
+    def load(self) -> Tuple[List[QueuedAlert], List[QueuedAlert]]:
+        """Return (pending, dead) alerts, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, channel, payload, attempts, dead FROM alerts ORDER BY id"
+            ).fetchall()
+        pending, dead = [], []
+        for id, channel, payload, attempts, is_dead in rows:
+            (dead if is_dead else pending).append(QueuedAlert(id, channel, json.loads(payload), attempts))
+        return pending, dead
+
+    def add(self, channel: str, alerts: List[Dict[str, Any]]) -> List[int]:
+        with self._lock:
+            ids = []
+            for alert in alerts:
+                cursor = self._conn.execute(
+                    "INSERT INTO alerts (channel, payload) VALUES (?, ?)", (channel, json.dumps(alert, default=str))
+                )
+                ids.append(cursor.lastrowid)
+            self._conn.commit()
+        return ids
+
+    def remove(self, ids: List[int]):
+        with self._lock:
+            self._conn.executemany("DELETE FROM alerts WHERE id = ?", [(id,) for id in ids])
+            self._conn.commit()
+
+    def update(self, messages: List[QueuedAlert], dead: bool = False):
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE alerts SET attempts = ?, dead = ? WHERE id = ?",
+                [(message.attempts, int(dead), message.id) for message in messages]
+            )
+            self._conn.commit()
+
+    def trim_dead(self, keep: int):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM alerts WHERE dead = 1 AND id NOT IN "
+                "(SELECT id FROM alerts WHERE dead = 1 ORDER BY id DESC LIMIT ?)", (keep,)
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class DeliveryQueue:
+    """Per-channel alert delivery with rate limits, digests and retries.
+
+    Each channel has its own queue and worker. A worker sends at most rate
+    messages per second (with bursts of up to burst), and alerts that pile
+    up while it waits are coalesced into a single digest of up to
+    max_digest alerts. Failed sends are retried with jittered exponential
+    backoff; alerts that fail max_retries times move to a bounded
+    dead-letter list. At most max_queued alerts wait per channel, and the
+    oldest are dropped beyond that. With a store_path, queued and
+    dead-lettered alerts are kept in SQLite and reloaded on start.
+    """
+
+    def __init__(
+        self,
+        send: AlertSender,
+        endpoints: Dict[str, str],
+        rate: float = 1.0,
+        burst: int = 5,
+        max_digest: int = 50,
+        max_queued: int = 10_000,
+        max_retries: int = 5,
+        base_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        dead_letter_size: int = 1000,
+        store_path: Optional[str] = None
+    ):
+        self.send = send
+        self.endpoints = endpoints
+        self.rate = rate
+        self.burst = burst
+        self.max_digest = max_digest
+        self.max_queued = max_queued
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.store = AlertQueueStore(store_path) if store_path else None
+
+        self._queues: Dict[str, Deque[QueuedAlert]] = {channel: deque() for channel in endpoints}
+        self.dead_letters: Deque[QueuedAlert] = deque(maxlen=dead_letter_size)
+        self._ids = count(1)
+        self.sent = 0
+        self.dropped = 0
+        self._tasks: List[asyncio.Task] = []
+        self._wakeups: Dict[str, asyncio.Event] = {}
+        self._stop: Optional[asyncio.Event] = None
+
+    @property
+    def pending(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def start(self):
+        """Reload persisted alerts and start one worker per channel"""
+        if self._stop is not None:
+            return
+        self._stop = asyncio.Event()
+        self._wakeups = {channel: asyncio.Event() for channel in self.endpoints}
+        if self.store is not None:
+            pending, dead = await asyncio.to_thread(self.store.load)
+            for message in pending:
+                if message.channel in self._queues:
+                    self._queues[message.channel].append(message)
+            self.dead_letters.extend(dead)
+            if pending:
+                logger.info(f"Reloaded {len(pending)} queued alerts")
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._run(channel)) for channel in self.endpoints]
+        for channel, queue in self._queues.items():
+            if queue:
+                self._wakeups[channel].set()
+
+    async def stop(self):
+        """Stop the workers after one final, unthrottled send per channel"""
+        if self._stop is None:
+            return
+        self._stop.set()
+        for wakeup in self._wakeups.values():
+            wakeup.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._stop = None
+        if self.store is not None:
+            self.store.close()
+
+    async def put(self, alerts: List[Dict[str, Any]]):
+        """Queue alerts for every channel"""
+        if not alerts:
+            return
+        if self._stop is None:
+            await self.start()
+        for channel, queue in self._queues.items():
+            if self.store is not None:
+                ids = await asyncio.to_thread(self.store.add, channel, alerts)
+            else:
+                ids = [next(self._ids) for _ in alerts]
+            queue.extend(QueuedAlert(id, channel, alert) for id, alert in zip(ids, alerts))
+            overflow = [queue.popleft() for _ in range(len(queue) - self.max_queued)]
+            if overflow:
+                self.dropped += len(overflow)
+                logger.warning(f"Alert queue for {channel} is full; dropped {len(overflow)} oldest alert(s)")
+                if self.store is not None:
+                    await asyncio.to_thread(self.store.remove, [message.id for message in overflow])
+            self._wakeups[channel].set()
+
+    async def _run(self, channel: str):
+        queue = self._queues[channel]
+        wakeup = self._wakeups[channel]
+        bucket = TokenBucket(self.rate, self.burst)
+        failures = 0
+        while not self._stop.is_set():
+            await wakeup.wait()
+            wakeup.clear()
+            while queue and not self._stop.is_set():
+                await bucket.acquire()
+                if await self._deliver(channel, queue):
+                    failures = 0
+                    continue
+                failures += 1
+                # Full jitter, so retries across channels do not synchronize
+                delay = random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** (failures - 1)))
+                try:
+                    await asyncio.wait_for(self._stop.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        if queue:
+            await self._deliver(channel, queue)
+
+    async def _deliver(self, channel: str, queue: Deque[QueuedAlert]) -> bool:
+        """Send the oldest queued alerts, as a digest if there are several"""
+        batch = [queue.popleft() for _ in range(min(len(queue), self.max_digest))]
+        payload = batch[0].alert if len(batch) == 1 else self._digest(batch)
+        try:
+            await self.send(channel, self.endpoints[channel], payload)
+        except Exception as e:
+            logger.error(f"Failed to send {len(batch)} alert(s) to {channel}: {str(e) or type(e).__name__}")
+            await self._fail(channel, queue, batch)
+            return False
+
+        self.sent += len(batch)
+        logger.info(f"Sent {len(batch)} alert(s) to {channel}")
+        if self.store is not None:
+            await asyncio.to_thread(self.store.remove, [message.id for message in batch])
+        return True
+
+    async def _fail(self, channel: str, queue: Deque[QueuedAlert], batch: List[QueuedAlert]):
+        retry, dead = [], []
+        for message in batch:
+            message.attempts += 1
+            (dead if message.attempts >= self.max_retries else retry).append(message)
+        # Retried alerts keep their place at the front of the queue
+        queue.extendleft(reversed(retry))
+        if dead:
+            self.dead_letters.extend(dead)
+            logger.error(f"Moved {len(dead)} alert(s) for {channel} to the dead-letter list")
+        if self.store is not None:
+            await asyncio.to_thread(self.store.update, retry)
+            if dead:
+                await asyncio.to_thread(self.store.update, dead, True)
+                await asyncio.to_thread(self.store.trim_dead, self.dead_letters.maxlen)
+
+    @staticmethod
+    def _digest(batch: List[QueuedAlert]) -> Dict[str, Any]:
+        alerts = [message.alert for message in batch]
+        severities = [alert.get("severity", "LOW") for alert in alerts]
+        severity = max(severities, key=severity_rank)
+        endpoints = sorted({alert.get("api_endpoint", "unknown") for alert in alerts})
+        return {
+            "timestamp": datetime.utcnow().isoformat(),
+            "type": "digest",
+            "severity": severity,
+            "alert_count": len(alerts),
+            "api_endpoints": endpoints,
+            "description": f"{len(alerts)} alerts across {len(endpoints)} endpoint(s), highest severity {severity}",
+            "alerts": alerts
+        }
+
+    def get_dead_letters(self) -> List[Dict[str, Any]]:
+        """Alerts that exhausted their retries, oldest first"""
+        return [
+            {"channel": message.channel, "attempts": message.attempts, "alert": message.alert}
+            for message in self.dead_letters
+        ]
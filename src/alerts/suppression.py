@@ -0,0 +1,107 @@
+import logging
+import heapq
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_ORDER = ["LOW", "MEDIUM", "HIGH", "CRITICAL"]
+
+# Levels at which a metric alone warrants attention, as in the alert recommendations
+METRIC_SCALES = {
+    "response_time": 1000.0,
+    "p99_response_time": 2000.0,
+    "error_rate": 0.1,
+    "request_rate": 1000.0
+}
+
+Fingerprint = Tuple[str, str]  # (endpoint, dominant metric)
+
+NEW = "new"
+ESCALATED = "escalated"
+
+
+def dominant_metric(anomaly: Dict[str, Any]) -> str:
+    """The metric furthest above its alerting scale"""
+    metrics = anomaly.get("metrics", {})
+    return max(METRIC_SCALES, key=lambda name: float(metrics.get(name, 0) or 0) / METRIC_SCALES[name])
+
+
+def severity_rank(severity: str) -> int:
+    return SEVERITY_ORDER.index(severity) if severity in SEVERITY_ORDER else 0
+
+
+class SuppressionIndex:
+    """Expiring index of recently alerted anomaly fingerprints.
+
+    An anomaly's fingerprint is its endpoint and dominant metric. The first
+    alert for a fingerprint opens a suppression window of ttl seconds in
+    which repeats at the same or a lower severity are suppressed; a higher
+    severity escalates, alerting again and restarting the window. Expiry
+    times are kept in a min-heap so expired fingerprints are dropped in
+    O(log n) each, and at most max_entries fingerprints are held, evicting
+    the ones closest to expiry first.
+    """
+
+    def __init__(self, ttl: float = 300, max_entries: int = 10_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._active: Dict[Fingerprint, Tuple[int, float]] = {}  # (severity rank, expires at)
+        self._expiry: List[Tuple[float, Fingerprint]] = []
+        self.suppressed = 0
+        self.escalated = 0
+
+    def __len__(self) -> int:
+        return len(self._active)
+
+    @staticmethod
+    def fingerprint(anomaly: Dict[str, Any]) -> Fingerprint:
+        return anomaly.get("api_endpoint", "unknown"), dominant_metric(anomaly)
+
+    def _expire(self, now: float):
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiry)
+            entry = self._active.get(key)
+            # Heap entries for windows that were since restarted are stale
+            if entry is not None and entry[1] == expires_at:
+                del self._active[key]
+
+    def _evict(self):
+        while len(self._active) > self.max_entries:
+            expires_at, key = heapq.heappop(self._expiry)
+            entry = self._active.get(key)
+            if entry is not None and entry[1] == expires_at:
+                del self._active[key]
+
+    def admit(self, anomaly: Dict[str, Any], now: Optional[float] = None) -> Optional[str]:
+        """Record an anomaly, returning NEW or ESCALATED if it should alert, else None"""
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+        key = self.fingerprint(anomaly)
+        rank = severity_rank(anomaly.get("severity", "LOW"))
+
+        entry = self._active.get(key)
+        if entry is not None and rank <= entry[0]:
+            self.suppressed += 1
+            return None
+
+        decision = NEW if entry is None else ESCALATED
+        if decision == ESCALATED:
+            self.escalated += 1
+            logger.info(f"Escalating alert for {key[0]} ({key[1]}) to {anomaly.get('severity')}")
+        expires_at = now + self.ttl
+        self._active[key] = (rank, expires_at)
+        heapq.heappush(self._expiry, (expires_at, key))
+        self._evict()
+        # Restarted windows leave stale heap entries behind; compact occasionally
+        if len(self._expiry) > 2 * len(self._active) + 64:
+            self._expiry = [(expires_at, key) for key, (_, expires_at) in self._active.items()]
+            heapq.heapify(self._expiry)
+        return decision
+
+    def statistics(self) -> Dict[str, int]:
+        return {
+            "active_fingerprints": len(self._active),
+            "suppressed": self.suppressed,
+            "escalated": self.escalated
+        }
@@ -2,92 +2,351 @@ import numpy as np
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
 import pandas as pd
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Union, Optional
 from datetime import datetime, timedelta
 import logging
+from dataclasses import dataclass
+from ..collectors.log_store import LogColumns, to_epoch_ns, from_epoch_ns
+from .feature_aggregator import MinuteAggregator, SeriesKey, NS_PER_MINUTE, FEATURE_COLUMNS
+from .model_registry import ModelRegistry, EndpointModel
+from .engines import DetectorEngine, create_engine, fit_model, score_model
+from ..telemetry import TRAIN_SECONDS, DETECTION_SECONDS, span
 
 logger = logging.getLogger(__name__)
 
+
+@dataclass
+class DetectionJob:
+    key: SeriesKey
+    index: pd.DatetimeIndex
+    features: np.ndarray
+    model: Optional[EndpointModel]
+    training_features: Optional[np.ndarray] = None  # set when the model must be (re)fit
+    update_features: Optional[np.ndarray] = None  # completed minutes for an online engine
+    update_through: Optional[int] = None  # epoch minute of the last update row
+
+
+@dataclass
+class DetectionOutput:
+    predictions: np.ndarray
+    scores: np.ndarray
+    model: Optional[EndpointModel] = None  # newly trained or updated model, if any
+
+
+def run_detection_jobs(jobs: List[DetectionJob], engine: DetectorEngine) -> List[Optional[DetectionOutput]]:
+    """Train, score and update detection jobs; CPU-bound and safe to run in a worker.
+
+    A failure only affects its own job. If refitting fails, the job is
+    scored with its previous model, when it has one.
+    """
+    outputs = []
+    for job in jobs:
+        try:
+            model, changed = job.model, None
+            if job.training_features is not None:
+                try:
+                    model = changed = EndpointModel(
+                        engine.name,
+                        engine.fit(job.training_features),
+                        training_rows=len(job.training_features),
+                        updated_through=job.update_through
+                    )
+                except Exception as e:
+                    logger.error(f"Error training anomaly model for {job.key}: {str(e)}")
+                    if model is None:
+                        outputs.append(None)
+                        continue
+            predictions, scores = engine.score(model.state, job.features)
+            # Score before updating so an anomaly is judged against the prior baseline
+            if job.update_features is not None and len(job.update_features):
+                model = changed = EndpointModel(
+                    engine.name,
+                    engine.update(model.state, job.update_features),
+                    trained_at=model.trained_at,
+                    training_rows=model.training_rows,
+                    updated_through=job.update_through
+                )
+            outputs.append(DetectionOutput(predictions, scores, changed))
+        except Exception as e:
+            logger.error(f"Error detecting anomalies for {job.key}: {str(e)}")
+            outputs.append(None)
+    return outputs
+
+
 class AnomalyDetector:
-    def __init__(self, contamination: float = 0.1):
+    def __init__(
+        self,
+        contamination: float = 0.1,
+        retention_minutes: int = 7 * 24 * 60,
+        max_models: int = 500,
+        min_training_minutes: int = 10,
+        model_max_age: timedelta = timedelta(hours=1),
+        engine: str = "isolation_forest"
+    ):
+        self.contamination = contamination
+        # Engine used for the per-endpoint models
+        self.engine = create_engine(engine, contamination)
         self.isolation_forest = IsolationForest(contamination=contamination, random_state=42)
         self.scaler = StandardScaler()
         self.training_data = None
-        self.feature_columns = ['response_time', 'error_rate', 'request_rate']
+        self.feature_columns = list(FEATURE_COLUMNS)
+        # Endpoint series beyond the model cap could never get a model, so keep no more of them
+        self.aggregator = MinuteAggregator(retention_minutes, max_series=max_models)
+        # Per (service, endpoint) models, trained lazily from the aggregator
+        self.models = ModelRegistry(max_models)
+        self.min_training_minutes = min_training_minutes
+        self.model_max_age = model_max_age
 
-    def prepare_features(self, logs: List[Dict[str, Any]]) -> pd.DataFrame:
-        """Prepare features from raw logs"""
-        df = pd.DataFrame(logs)
-        
-        # Calculate metrics per minute
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df.set_index('timestamp', inplace=True)
+    def observe(
+        self,
+        timestamps: np.ndarray,
+        response_times: np.ndarray,
+        status_codes: np.ndarray,
+        endpoints: List[str],
+        services: List[str]
+    ):
+        """Fold newly ingested logs into the per-minute feature rows"""
+        self.aggregator.update(timestamps, response_times, status_codes, endpoints, services)
+
+    def prepare_features(self, logs: Union[List[Dict[str, Any]], LogColumns, pd.DataFrame]) -> pd.DataFrame:
+        """Prepare features from raw logs, LogStore column arrays or per-minute rollups"""
+        if isinstance(logs, pd.DataFrame):
+            # Already one row per minute, e.g. from LogCollector.get_minute_rollups
+            return logs[self.feature_columns].fillna(0)
+        if isinstance(logs, LogColumns):
+            # Build straight from the column arrays, no per-entry dicts
+            df = pd.DataFrame(
+                {'response_time': logs.response_time, 'status_code': logs.status_code},
+                index=pd.to_datetime(logs.timestamp, unit='ns')
+            )
+        else:
+            df = pd.DataFrame(logs)
+
+            # Calculate metrics per minute
+            df['timestamp'] = pd.to_datetime(df['timestamp'])
+            df.set_index('timestamp', inplace=True)
         
         # Resample to minute intervals
         metrics = pd.DataFrame()
         metrics['response_time'] = df['response_time'].resample('1min').mean()
         metrics['error_rate'] = (df['status_code'] >= 400).resample('1min').mean()
-        metrics['request_rate'] = df['endpoint'].resample('1min').count()
+        metrics['request_rate'] = df['status_code'].resample('1min').count()
+        metrics['p95_response_time'] = df['response_time'].resample('1min').quantile(0.95)
+        metrics['p99_response_time'] = df['response_time'].resample('1min').quantile(0.99)
         
         return metrics.fillna(0)
 
-    def train(self, historical_logs: List[Dict[str, Any]]):
-        """Train the anomaly detection model"""
-        if not historical_logs:
+    def train(self, historical_logs: Optional[Union[List[Dict[str, Any]], LogColumns, pd.DataFrame]] = None):
+        """Train the anomaly detection model.
+
+        Without historical_logs the model is trained on all retained
+        per-minute rows from the aggregator.
+        """
+        if historical_logs is not None and len(historical_logs) == 0:
             logger.warning("No historical logs provided for training")
             return
 
         try:
-            features_df = self.prepare_features(historical_logs)
-            self.training_data = features_df.copy()
-            
-            # Scale the features
-            scaled_features = self.scaler.fit_transform(features_df[self.feature_columns])
-            
-            # Train the model
-            self.isolation_forest.fit(scaled_features)
-            logger.info("Successfully trained anomaly detection model")
-            
+            if historical_logs is None:
+                features_df = self.aggregator.frame()
+            else:
+                features_df = self.prepare_features(historical_logs)
+            if features_df.empty:
+                logger.warning("No historical logs provided for training")
+                return
+
+            with span("train"), TRAIN_SECONDS.time():
+                scaler, isolation_forest = fit_model(features_df[self.feature_columns].to_numpy(), self.contamination)
+            self.set_global_model(scaler, isolation_forest, features_df)
+
         except Exception as e:
             logger.error(f"Error training anomaly detection model: {str(e)}")
 
-    def detect_anomalies(self, current_logs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Detect anomalies in current logs"""
-        if not current_logs:
-            return []
+    def set_global_model(self, scaler: StandardScaler, isolation_forest: IsolationForest, training_data: pd.DataFrame):
+        """Swap in a fitted global model"""
+        self.scaler, self.isolation_forest, self.training_data = scaler, isolation_forest, training_data
+        logger.info("Successfully trained anomaly detection model")
+
+    def export_state(self) -> Dict[str, Any]:
+        """Fitted models and training data, in the form ModelStore saves"""
+        state = {"endpoints": dict(self.models.items()), "feature_columns": self.feature_columns}
+        if self.training_data is not None:
+            state["global"] = {
+                "scaler": self.scaler,
+                "isolation_forest": self.isolation_forest,
+                "training_data": self.training_data,
+                "feature_columns": self.feature_columns
+            }
+        return state
+
+    def import_state(self, state: Dict[str, Any]):
+        """Swap in models previously returned by export_state"""
+        global_state = state.get("global")
+        if global_state is not None:
+            if global_state["feature_columns"] != self.feature_columns:
+                logger.warning("Ignoring saved anomaly model trained on different features")
+            else:
+                self.set_global_model(
+                    global_state["scaler"], global_state["isolation_forest"], global_state["training_data"]
+                )
+        # Versions saved before feature_columns was stored used the three original features
+        if list(state.get("feature_columns", FEATURE_COLUMNS[:3])) != self.feature_columns:
+            logger.warning("Ignoring saved endpoint models trained on different features")
+            return
+        for key, model in state.get("endpoints", {}).items():
+            if model.engine == self.engine.name:
+                self.models.put(key, model)
 
+    def train_endpoint(self, key: SeriesKey) -> Optional[EndpointModel]:
+        """Fit and register a model for one (service, endpoint) from its retained rows"""
+        last_complete = to_epoch_ns(datetime.utcnow()) // NS_PER_MINUTE - 1
+        features_df = self.aggregator.frame(end_time=from_epoch_ns(last_complete * NS_PER_MINUTE), key=key)
+        if len(features_df) < self.min_training_minutes:
+            return None
         try:
-            features_df = self.prepare_features(current_logs)
-            scaled_features = self.scaler.transform(features_df[self.feature_columns])
-            
-            # Predict anomalies
-            predictions = self.isolation_forest.predict(scaled_features)
-            anomaly_scores = self.isolation_forest.score_samples(scaled_features)
-            
-            # Prepare anomaly results
-            anomalies = []
-            for idx, (pred, score) in enumerate(zip(predictions, anomaly_scores)):
-                if pred == -1:  # Anomaly detected
-                    timestamp = features_df.index[idx]
-                    metrics = features_df.iloc[idx]
-                    
-                    anomaly = {
-                        "timestamp": timestamp.isoformat(),
-                        "anomaly_score": float(score),
-                        "metrics": {
-                            "response_time": float(metrics["response_time"]),
-                            "error_rate": float(metrics["error_rate"]),
-                            "request_rate": float(metrics["request_rate"])
-                        },
-                        "severity": self._calculate_severity(score)
-                    }
-                    anomalies.append(anomaly)
-            
-            return anomalies
-            
+            state = self.engine.fit(features_df[self.feature_columns].to_numpy())
         except Exception as e:
-            logger.error(f"Error detecting anomalies: {str(e)}")
+            logger.error(f"Error training anomaly model for {key}: {str(e)}")
+            return None
+
+        model = EndpointModel(
+            self.engine.name, state,
+            training_rows=len(features_df),
+            updated_through=int(features_df.index[-1].value // NS_PER_MINUTE)
+        )
+        self.models.put(key, model)
+        return model
+
+    def detect_anomalies(
+        self,
+        current_logs: Optional[Union[List[Dict[str, Any]], LogColumns, pd.DataFrame]] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """Detect anomalies in current logs.
+
+        With current_logs, the logs are scored as a whole by the global
+        model. Without them, each (service, endpoint) with traffic between
+        start_time and end_time (default: the last hour) is scored by its own
+        model using the aggregator's per-minute rows, and anomalies carry the
+        endpoint and service they were found on. The current minute is still
+        filling up and is left out.
+        """
+        if current_logs is not None and len(current_logs) == 0:
             return []
+        with span("detect_anomalies"), DETECTION_SECONDS.time():
+            if current_logs is not None:
+                try:
+                    features_df = self.prepare_features(current_logs)
+                    features = features_df[self.feature_columns].to_numpy()
+                    predictions, scores = score_model(self.scaler, self.isolation_forest, features)
+                    return self._build_anomalies(features_df.index, features, predictions, scores)
+                except Exception as e:
+                    logger.error(f"Error detecting anomalies: {str(e)}")
+                    return []
+
+            jobs = self.plan_detection(start_time, end_time)
+            return self.finish_detection(jobs, run_detection_jobs(jobs, self.engine))
+
+    def plan_detection(
+        self,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None
+    ) -> List[DetectionJob]:
+        """Collect per-endpoint feature arrays to score, and to train where needed.
+
+        This only reads the aggregator, so it is cheap and must run wherever
+        ingest updates the aggregator (the event loop). The returned jobs
+        hold plain arrays and can be shipped to a worker thread or process.
+        """
+        if start_time is None:
+            start_time = (end_time or datetime.utcnow()) - timedelta(hours=1)
+        jobs = []
+        now = datetime.utcnow()
+        # Only minutes before the current one are complete enough to learn from or score:
+        # a partial minute looks like a traffic drop and would be cached as such
+        last_complete = to_epoch_ns(now) // NS_PER_MINUTE - 1
+        score_end_ns = last_complete * NS_PER_MINUTE
+        if end_time is not None:
+            score_end_ns = min(score_end_ns, to_epoch_ns(end_time))
+        score_end = from_epoch_ns(score_end_ns)
+        for key in self.aggregator.active_keys(start_time):
+            features_df = self.aggregator.frame(start_time, score_end, key=key)
+            if features_df.empty:
+                continue
+            model = self.models.get(key)
+            training_features = None
+            stale = not self.engine.online and model is not None and now - model.trained_at > self.model_max_age
+            if model is None or stale:
+                training_df = self.aggregator.frame(end_time=from_epoch_ns(last_complete * NS_PER_MINUTE), key=key)
+                if len(training_df) >= self.min_training_minutes:
+                    training_features = training_df[self.feature_columns].to_numpy()
+                    last_learned = int(training_df.index[-1].value // NS_PER_MINUTE)
+                elif model is None:
+                    continue  # Not enough history to train yet
+            job = DetectionJob(
+                key=key,
+                index=features_df.index,
+                features=features_df[self.feature_columns].to_numpy(),
+                model=model,
+                training_features=training_features
+            )
+            if self.engine.online and training_features is None and model.updated_through is not None \
+                    and model.updated_through < last_complete:
+                update_df = self.aggregator.frame(
+                    from_epoch_ns((model.updated_through + 1) * NS_PER_MINUTE),
+                    from_epoch_ns(last_complete * NS_PER_MINUTE),
+                    key=key
+                )
+                if not update_df.empty:
+                    job.update_features = update_df[self.feature_columns].to_numpy()
+                    job.update_through = int(update_df.index[-1].value // NS_PER_MINUTE)
+            elif training_features is not None:
+                job.update_through = last_learned
+            jobs.append(job)
+        return jobs
+
+    def finish_detection(self, jobs: List[DetectionJob], outputs: List[DetectionOutput]) -> List[Dict[str, Any]]:
+        """Register trained or updated models and turn job outputs into anomalies"""
+        anomalies = []
+        for job, output in zip(jobs, outputs):
+            if output is None:
+                continue
+            if output.model is not None:
+                self.models.put(job.key, output.model)
+            service, endpoint = job.key
+            anomalies.extend(self._build_anomalies(
+                job.index, job.features, output.predictions, output.scores, endpoint, service
+            ))
+        return anomalies
+
+    def _build_anomalies(
+        self,
+        index: pd.DatetimeIndex,
+        features: np.ndarray,
+        predictions: np.ndarray,
+        anomaly_scores: np.ndarray,
+        endpoint: Optional[str] = None,
+        service: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Turn rows flagged by the model into anomaly dicts"""
+        anomalies = []
+        for idx in np.flatnonzero(predictions == -1):  # Anomaly detected
+            score = float(anomaly_scores[idx])
+            metrics = dict(zip(self.feature_columns, features[idx].tolist()))
+
+            anomaly = {
+                "timestamp": index[idx].isoformat(),
+                "anomaly_score": score,
+                "metrics": metrics,
+                "severity": self._calculate_severity(score)
+            }
+            if endpoint is not None:
+                anomaly["api_endpoint"] = endpoint
+                anomaly["service"] = service
+            anomalies.append(anomaly)
+
+        return anomalies
 
     def _calculate_severity(self, anomaly_score: float) -> str:
         """Calculate severity level based on anomaly score"""
@@ -0,0 +1,175 @@
+import logging
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+import time
+from .anomaly_detector import AnomalyDetector, fit_model, run_detection_jobs
+from .model_store import ModelStore
+from .results_cache import ResultsCache
+from ..telemetry import TRAIN_SECONDS, DETECTION_SECONDS, ANOMALIES_DETECTED, span
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DetectionResults:
+    """One published detection cycle; replaced as a whole, never mutated"""
+    anomalies: List[Dict[str, Any]] = field(default_factory=list)
+    predictions: List[Dict[str, Any]] = field(default_factory=list)
+    generated_at: Optional[datetime] = None
+
+
+class DetectionScheduler:
+    """Runs AnomalyDetector training and scoring off the event loop.
+
+    Every interval seconds the global model is retrained and each active
+    endpoint is scored. Feature arrays are gathered on the event loop (where
+    ingest updates them), the CPU-bound sklearn work runs in a thread or
+    process pool, and the results are published as a single
+    DetectionResults object so readers never see a half-finished cycle.
+    They are also merged into a ResultsCache that the API serves from, and
+    anomalies not seen in earlier cycles are handed to the alert manager,
+    if one is given.
+
+    With a model_store, the latest saved models are loaded in the background
+    before the first cycle, and the models are saved again at most every
+    persist_interval seconds.
+    """
+
+    def __init__(
+        self,
+        detector: AnomalyDetector,
+        alert_manager=None,
+        interval: float = 60,
+        window: timedelta = timedelta(minutes=15),
+        executor: str = "thread",
+        max_workers: Optional[int] = None,
+        model_store: Optional[ModelStore] = None,
+        persist_interval: float = 900,
+        prediction_window: int = 60
+    ):
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown executor type: {executor}")
+        self.detector = detector
+        self.alert_manager = alert_manager
+        self.interval = interval
+        self.window = window
+        self.executor_type = executor
+        self.max_workers = max_workers
+        self.model_store = model_store
+        self.persist_interval = persist_interval
+        self.prediction_window = prediction_window
+        self.results = DetectionResults()
+        self.cache = ResultsCache()
+        self.listeners = []
+        self._last_persist = time.monotonic()
+        self._executor: Optional[Executor] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def add_listener(self, listener):
+        """Register a callback called as listener(results, new_anomalies, predictions_changed) after each cycle"""
+        self.listeners.append(listener)
+
+    def start(self):
+        """Start the periodic detection task on the running event loop"""
+        if self._task is not None:
+            return
+        if self.executor_type == "process":
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="detection")
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the periodic task and shut the worker pool down"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self):
+        await self.warm_start()
+        while True:
+            try:
+                await self.run_once()
+                await self._maybe_persist()
+            except Exception as e:
+                logger.error(f"Error in detection cycle: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    async def warm_start(self):
+        """Load the latest saved models without blocking the event loop"""
+        if self.model_store is None or self.detector.training_data is not None:
+            return
+        try:
+            state = await asyncio.to_thread(self.model_store.load_latest)
+        except Exception as e:
+            logger.error(f"Error loading saved anomaly models: {str(e)}")
+            return
+        if state:
+            self.detector.import_state(state)
+
+    async def _maybe_persist(self):
+        if self.model_store is None or time.monotonic() - self._last_persist < self.persist_interval:
+            return
+        state = self.detector.export_state()
+        if "global" not in state and not state["endpoints"]:
+            return
+        self._last_persist = time.monotonic()
+        await asyncio.to_thread(self.model_store.save, state)
+
+    async def _in_executor(self, fn, *args):
+        if self._executor is None:
+            return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def train(self):
+        """Retrain the global model in the worker pool and swap it in"""
+        detector = self.detector
+        features_df = detector.aggregator.frame()
+        if features_df.empty:
+            return
+        with span("train"), TRAIN_SECONDS.time():
+            scaler, isolation_forest = await self._in_executor(
+                fit_model, features_df[detector.feature_columns].to_numpy(), detector.contamination
+            )
+        detector.set_global_model(scaler, isolation_forest, features_df)
+
+    async def run_once(self) -> DetectionResults:
+        """Run one train-and-detect cycle and publish its results"""
+        detector = self.detector
+        try:
+            await self.train()
+        except Exception as e:
+            # Keep the last good global model; per-endpoint detection does not depend on it
+            logger.error(f"Error training anomaly detection model: {str(e)}")
+
+        end_time = datetime.utcnow()
+        with span("detect_anomalies"), DETECTION_SECONDS.time():
+            jobs = detector.plan_detection(end_time - self.window, end_time)
+            outputs = await self._in_executor(run_detection_jobs, jobs, detector.engine)
+            anomalies = detector.finish_detection(jobs, outputs)
+        # Reads only the detector's training data, so a thread suffices
+        predictions = await asyncio.to_thread(detector.predict_future_anomalies, self.prediction_window)
+
+        self.results = DetectionResults(anomalies, predictions, end_time)
+        # Consecutive windows overlap, so only alert on anomalies not seen before
+        predictions_version = self.cache.predictions_version
+        new_anomalies = self.cache.publish(anomalies, predictions, end_time)
+        ANOMALIES_DETECTED.inc(len(new_anomalies))
+        for listener in self.listeners:
+            try:
+                listener(self.results, new_anomalies, self.cache.predictions_version != predictions_version)
+            except Exception as e:
+                logger.error(f"Error in detection listener: {str(e)}")
+        if new_anomalies and self.alert_manager is not None:
+            await self.alert_manager.process_anomalies(new_anomalies)
+        return self.results
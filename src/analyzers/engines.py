@@ -0,0 +1,147 @@
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Tuple, Type
+import numpy as np
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+logger = logging.getLogger(__name__)
+
+
+def fit_model(features: np.ndarray, contamination: float) -> Tuple[StandardScaler, IsolationForest]:
+    """Fit a scaler and IsolationForest on a (minutes x features) array"""
+    scaler = StandardScaler()
+    isolation_forest = IsolationForest(contamination=contamination, random_state=42)
+    isolation_forest.fit(scaler.fit_transform(features))
+    return scaler, isolation_forest
+
+
+def score_model(
+    scaler: StandardScaler,
+    isolation_forest: IsolationForest,
+    features: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Return IsolationForest predictions (-1 for anomalies) and scores"""
+    scaled_features = scaler.transform(features)
+    return isolation_forest.predict(scaled_features), isolation_forest.score_samples(scaled_features)
+
+
+class DetectorEngine:
+    """Scores per-minute feature rows for a single endpoint.
+
+    fit() builds engine state from historical rows, score() returns
+    predictions (-1 for anomalies, 1 otherwise) and scores on the
+    IsolationForest scale (negative, lower is more anomalous), and update()
+    folds newly completed rows into the state. Online engines are updated
+    incrementally and never need refitting; batch engines ignore update()
+    and are refit periodically instead.
+    """
+
+    name = "base"
+    online = False
+
+    def fit(self, features: np.ndarray) -> Any:
+        raise NotImplementedError
+
+    def score(self, state: Any, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        raise NotImplementedError
+
+    def update(self, state: Any, features: np.ndarray) -> Any:
+        return state
+
+
+class IsolationForestEngine(DetectorEngine):
+    """Batch engine: StandardScaler plus IsolationForest, refit on a schedule"""
+
+    name = "isolation_forest"
+
+    def __init__(self, contamination: float = 0.1):
+        self.contamination = contamination
+
+    def fit(self, features: np.ndarray) -> Tuple[StandardScaler, IsolationForest]:
+        return fit_model(features, self.contamination)
+
+    def score(self, state: Tuple[StandardScaler, IsolationForest], features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        scaler, isolation_forest = state
+        return score_model(scaler, isolation_forest, features)
+
+
+@dataclass
+class RobustZScoreState:
+    center: np.ndarray  # per-feature location
+    spread: np.ndarray  # per-feature scale, in standard deviation units
+
+
+class RobustZScoreEngine(DetectorEngine):
+    """Online engine: exponentially weighted robust z-scores.
+
+    The initial location and scale are the median and MAD of the history.
+    Each new minute then moves them by an EWMA step of the clipped value,
+    which is O(1) per minute, and scoring is a handful of vector operations.
+    A row is anomalous when any feature is more than threshold scales away
+    from its location; spreads are floored so that near-constant features
+    (such as a zero error rate) do not turn tiny changes into alerts.
+    """
+
+    name = "robust_zscore"
+    online = True
+
+    # E|x - mu| = sigma * sqrt(2 / pi) for normal data
+    ABS_DEV_TO_SIGMA = 1.2533
+    MAD_TO_SIGMA = 1.4826
+
+    def __init__(
+        self,
+        alpha: float = 0.05,
+        threshold: float = 3.5,
+        clip: float = 5.0,
+        min_spread: float = 0.01,
+        min_relative_spread: float = 0.1
+    ):
+        self.alpha = alpha
+        self.threshold = threshold
+        self.clip = clip
+        self.min_spread = min_spread
+        self.min_relative_spread = min_relative_spread
+
+    def fit(self, features: np.ndarray) -> RobustZScoreState:
+        center = np.median(features, axis=0)
+        spread = np.median(np.abs(features - center), axis=0) * self.MAD_TO_SIGMA
+        return RobustZScoreState(center, spread)
+
+    def _zscores(self, state: RobustZScoreState, features: np.ndarray) -> np.ndarray:
+        floor = np.maximum(self.min_spread, self.min_relative_spread * np.abs(state.center))
+        return np.abs(features - state.center) / np.maximum(state.spread, floor)
+
+    def score(self, state: RobustZScoreState, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        z = self._zscores(state, features).max(axis=1)
+        # Map z onto (-1, 0] so the IsolationForest severity bands apply
+        scores = -z / (z + 3.0)
+        return np.where(z > self.threshold, -1, 1), scores
+
+    def update(self, state: RobustZScoreState, features: np.ndarray) -> RobustZScoreState:
+        center, spread = state.center.copy(), state.spread.copy()
+        floor = np.maximum(self.min_spread, self.min_relative_spread * np.abs(center))
+        for row in features:
+            # Clip outliers so a single incident does not drag the baseline
+            bound = self.clip * np.maximum(spread, floor)
+            clipped = np.clip(row, center - bound, center + bound)
+            deviation = np.abs(clipped - center)
+            center += self.alpha * (clipped - center)
+            spread += self.alpha * (deviation * self.ABS_DEV_TO_SIGMA - spread)
+        return RobustZScoreState(center, spread)
+
+
+ENGINES: Dict[str, Type[DetectorEngine]] = {
+    IsolationForestEngine.name: IsolationForestEngine,
+    RobustZScoreEngine.name: RobustZScoreEngine,
+}
+
+
+def create_engine(name: str, contamination: float = 0.1) -> DetectorEngine:
+    """Instantiate an engine by name"""
+    if name not in ENGINES:
+        raise ValueError(f"Unknown anomaly detection engine: {name}")
+    if name == IsolationForestEngine.name:
+        return IsolationForestEngine(contamination)
+    return ENGINES[name]()
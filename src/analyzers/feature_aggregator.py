@@ -0,0 +1,226 @@
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from ..collectors.log_store import to_epoch_ns, clock_horizon
+from .sketches import LatencyBins, DEFAULT_BINS
+
+logger = logging.getLogger(__name__)
+
+NS_PER_MINUTE = 60 * 1_000_000_000
+FEATURE_COLUMNS = ['response_time', 'error_rate', 'request_rate', 'p95_response_time', 'p99_response_time']
+PERCENTILES = (0.95, 0.99)
+
+SeriesKey = Tuple[str, str]  # (service, endpoint)
+
+
+class MinuteSeries:
+    """Fixed-size ring of per-minute request count, error count, response-time sum and percentiles.
+
+    Slot i holds minute m where m % retention_minutes == i, so memory is
+    fixed and minutes older than the retention window are overwritten.
+    Latency percentiles come from quantile sketches, which are only kept
+    for the newest sketch_minutes minutes: each update re-reads the
+    percentiles of the minutes it touched, and late entries for older
+    minutes still count towards the other features but not the
+    percentiles. Memory per minute is therefore fixed whatever the
+    request volume. Minutes past clock_horizon are ignored, so a client
+    with a wrong clock cannot move the window ahead of real time.
+    """
+
+    def __init__(self, retention_minutes: int, sketch_minutes: int = 5, bins: LatencyBins = DEFAULT_BINS):
+        self.retention_minutes = retention_minutes
+        self.minutes = np.full(retention_minutes, -1, dtype=np.int64)
+        self.values = np.zeros((retention_minutes, 3))  # requests, errors, response_time_sum
+        self.percentiles = np.zeros((retention_minutes, len(PERCENTILES)))
+        self.bins = bins
+        self.sketch_minutes = np.full(sketch_minutes, -1, dtype=np.int64)
+        self.sketches = np.zeros((sketch_minutes, bins.n_bins), dtype=np.uint32)
+        self.newest = -1
+
+    def add(self, minutes: np.ndarray, values: np.ndarray, sketches: Optional[np.ndarray] = None):
+        """Add pre-aggregated rows, and optionally latency sketches, for distinct minutes"""
+        current = minutes <= clock_horizon(NS_PER_MINUTE)
+        if not current.all():
+            minutes, values = minutes[current], values[current]
+            sketches = None if sketches is None else sketches[current]
+            if len(minutes) == 0:
+                return
+        slots = minutes % self.retention_minutes
+        stale = self.minutes[slots] < minutes
+        if stale.any():
+            self.minutes[slots[stale]] = minutes[stale]
+            self.values[slots[stale]] = 0
+            self.percentiles[slots[stale]] = 0
+        # Minutes already overwritten by newer data are dropped
+        keep = self.minutes[slots] == minutes
+        np.add.at(self.values, slots[keep], values[keep])
+
+        if sketches is not None:
+            self._add_sketches(minutes[keep], slots[keep], sketches[keep])
+        self.newest = max(self.newest, int(minutes.max()))
+
+    def _add_sketches(self, minutes: np.ndarray, slots: np.ndarray, sketches: np.ndarray):
+        sketch_slots = minutes % len(self.sketch_minutes)
+        stale = self.sketch_minutes[sketch_slots] < minutes
+        if stale.any():
+            self.sketch_minutes[sketch_slots[stale]] = minutes[stale]
+            self.sketches[sketch_slots[stale]] = 0
+        keep = self.sketch_minutes[sketch_slots] == minutes
+        if not keep.any():
+            return
+        sketch_slots = sketch_slots[keep]
+        self.sketches[sketch_slots] += sketches[keep]
+        self.percentiles[slots[keep]] = self.bins.quantiles(self.sketches[sketch_slots], PERCENTILES)
+
+    def frame(self, first: Optional[int] = None, last: Optional[int] = None) -> pd.DataFrame:
+        """Feature rows for minutes first..last, trimmed to minutes with traffic"""
+        if self.newest < 0:
+            return pd.DataFrame(columns=FEATURE_COLUMNS, dtype=float)
+        oldest = self.newest - self.retention_minutes + 1
+        first = oldest if first is None else max(first, oldest)
+        last = self.newest if last is None else min(last, self.newest)
+        if last < first:
+            return pd.DataFrame(columns=FEATURE_COLUMNS, dtype=float)
+
+        minutes = np.arange(first, last + 1)
+        slots = minutes % self.retention_minutes
+        present = (self.minutes[slots] == minutes)[:, None]
+        values = np.where(present, self.values[slots], 0.0)
+        percentiles = np.where(present, self.percentiles[slots], 0.0)
+
+        requests = values[:, 0]
+        active = np.flatnonzero(requests)
+        if len(active) == 0:
+            return pd.DataFrame(columns=FEATURE_COLUMNS, dtype=float)
+        # Trim empty leading/trailing minutes, as resampling raw logs would
+        window = slice(active[0], active[-1] + 1)
+        minutes, values, requests, percentiles = minutes[window], values[window], requests[window], percentiles[window]
+
+        safe = np.maximum(requests, 1)
+        return pd.DataFrame(
+            {
+                'response_time': np.where(requests > 0, values[:, 2] / safe, 0.0),
+                'error_rate': np.where(requests > 0, values[:, 1] / safe, 0.0),
+                'request_rate': requests,
+                'p95_response_time': percentiles[:, 0],
+                'p99_response_time': percentiles[:, 1]
+            },
+            index=pd.to_datetime(minutes * NS_PER_MINUTE, unit='ns')
+        )
+
+
+class MinuteAggregator:
+    """Running per-minute features, overall and per (service, endpoint).
+
+    Updated as logs are ingested so that detection reads one precomputed
+    row per minute instead of re-aggregating raw logs. Per-endpoint series
+    are kept for endpoint_retention_minutes and at most max_series of them
+    are tracked; the least recently updated series is dropped first. A
+    series takes 48 bytes per retained minute plus 2.5 KB of sketches, so
+    the defaults of six hours and 500 series (the per-endpoint model cap)
+    come to about 10 MB.
+    """
+
+    def __init__(
+        self,
+        retention_minutes: int = 7 * 24 * 60,
+        endpoint_retention_minutes: int = 6 * 60,
+        max_series: int = 500
+    ):
+        self.retention_minutes = retention_minutes
+        self.endpoint_retention_minutes = endpoint_retention_minutes
+        self.max_series = max_series
+        self.overall = MinuteSeries(retention_minutes)
+        self.series: "OrderedDict[SeriesKey, MinuteSeries]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.series)
+
+    def update(
+        self,
+        timestamps: np.ndarray,
+        response_times: np.ndarray,
+        status_codes: np.ndarray,
+        endpoints: Optional[List[str]] = None,
+        services: Optional[List[str]] = None
+    ):
+        """Fold a batch of log entries into the per-minute rows"""
+        n = len(timestamps)
+        if n == 0:
+            return
+        minutes = np.asarray(timestamps) // NS_PER_MINUTE
+        weights = np.column_stack([
+            np.ones(n),
+            np.asarray(status_codes) >= 400,
+            np.asarray(response_times, dtype=np.float64)
+        ])
+        bins = self.overall.bins.index(response_times)
+
+        self.overall.add(*self._group(minutes, weights, bins))
+        if endpoints is None:
+            return
+
+        # Group by (series, minute) using a combined integer key
+        key_ids: Dict[SeriesKey, int] = {}
+        ids = np.fromiter(
+            (key_ids.setdefault(key, len(key_ids)) for key in zip(services or ["unknown"] * n, endpoints)),
+            dtype=np.int64, count=n
+        )
+        base = int(minutes.min())
+        span = int(minutes.max()) - base + 1
+        combined, inverse = np.unique(ids * span + (minutes - base), return_inverse=True)
+        sums = np.zeros((len(combined), 3))
+        np.add.at(sums, inverse, weights)
+        sketches = np.zeros((len(combined), self.overall.bins.n_bins), dtype=np.uint32)
+        np.add.at(sketches, (inverse, bins), 1)
+        group_ids, group_minutes = combined // span, combined % span + base
+
+        keys = list(key_ids)
+        bounds = np.flatnonzero(np.diff(group_ids)) + 1
+        for start, stop in zip(np.r_[0, bounds], np.r_[bounds, len(combined)]):
+            key = keys[group_ids[start]]
+            series = self.series.get(key)
+            if series is None:
+                series = MinuteSeries(self.endpoint_retention_minutes)
+                self.series[key] = series
+                if len(self.series) > self.max_series:
+                    self.series.popitem(last=False)
+            else:
+                self.series.move_to_end(key)
+            series.add(group_minutes[start:stop], sums[start:stop], sketches[start:stop])
+
+    @staticmethod
+    def _group(minutes: np.ndarray, weights: np.ndarray, bins: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        unique, inverse = np.unique(minutes, return_inverse=True)
+        sums = np.zeros((len(unique), 3))
+        np.add.at(sums, inverse, weights)
+        sketches = np.zeros((len(unique), DEFAULT_BINS.n_bins), dtype=np.uint32)
+        np.add.at(sketches, (inverse, bins), 1)
+        return unique, sums, sketches
+
+    def frame(
+        self,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        key: Optional[SeriesKey] = None
+    ) -> pd.DataFrame:
+        """Per-minute feature rows for [start_time, end_time], like prepare_features.
+
+        Rows are for all traffic, or for one (service, endpoint) key. Cost is
+        proportional to the number of minutes in the window, not to the
+        number of logs or the retained history.
+        """
+        series = self.overall if key is None else self.series.get(key)
+        if series is None:
+            return pd.DataFrame(columns=FEATURE_COLUMNS, dtype=float)
+        first = None if start_time is None else to_epoch_ns(start_time) // NS_PER_MINUTE
+        last = None if end_time is None else to_epoch_ns(end_time) // NS_PER_MINUTE
+        return series.frame(first, last)
+
+    def active_keys(self, start_time: datetime) -> List[SeriesKey]:
+        """Keys with traffic at or after start_time, most recently updated last"""
+        first = to_epoch_ns(start_time) // NS_PER_MINUTE
+        return [key for key, series in self.series.items() if series.newest >= first]
@@ -0,0 +1,60 @@
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class EndpointModel:
+    engine: str  # name of the DetectorEngine that owns state
+    state: Any
+    trained_at: datetime = field(default_factory=datetime.utcnow)
+    training_rows: int = 0
+    updated_through: Optional[int] = None  # last epoch minute folded in by an online engine
+
+
+class ModelRegistry:
+    """Size-bounded LRU cache of fitted models keyed by (service, endpoint).
+
+    Looking a model up marks it as recently used; once more than max_models
+    are held the least recently used one is evicted and will be retrained
+    on its next use.
+    """
+
+    def __init__(self, max_models: int = 500):
+        self.max_models = max_models
+        self._models: "OrderedDict[Hashable, EndpointModel]" = OrderedDict()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._models
+
+    def get(self, key: Hashable) -> Optional[EndpointModel]:
+        """Return the model for a key, marking it as recently used"""
+        model = self._models.get(key)
+        if model is not None:
+            self._models.move_to_end(key)
+        return model
+
+    def put(self, key: Hashable, model: EndpointModel):
+        """Store a model, evicting the coldest ones beyond max_models"""
+        self._models[key] = model
+        self._models.move_to_end(key)
+        while len(self._models) > self.max_models:
+            evicted, _ = self._models.popitem(last=False)
+            self.evictions += 1
+            logger.debug(f"Evicted anomaly model for {evicted}")
+
+    def keys(self) -> List[Hashable]:
+        """Keys from coldest to hottest"""
+        return list(self._models)
+
+    def items(self) -> List[Tuple[Hashable, EndpointModel]]:
+        """(key, model) pairs from coldest to hottest"""
+        return list(self._models.items())
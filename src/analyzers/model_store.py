@@ -0,0 +1,87 @@
+import logging
+import os
+import shutil
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+import joblib
+
+logger = logging.getLogger(__name__)
+
+LATEST_FILE = "LATEST"
+
+
+class ModelStore:
+    """Versioned on-disk storage for fitted anomaly detection models.
+
+    Each save writes a new version directory under a temporary name and
+    renames it into place, then atomically repoints the LATEST file, so a
+    reader never sees a partially written version. Artifacts are stored
+    uncompressed so that their NumPy arrays can be memory-mapped on load.
+    Only the newest keep_versions versions are retained.
+    """
+
+    def __init__(self, directory: str = "models", keep_versions: int = 3):
+        self.directory = directory
+        self.keep_versions = keep_versions
+
+    def versions(self) -> List[str]:
+        """Saved versions, oldest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith("v") and os.path.isdir(os.path.join(self.directory, name))
+        )
+
+    def save(self, state: Dict[str, Any]) -> str:
+        """Write a new model version and make it the latest, returning its name"""
+        os.makedirs(self.directory, exist_ok=True)
+        version = datetime.utcnow().strftime("v%Y%m%d%H%M%S%f")
+        tmp_dir = os.path.join(self.directory, f".tmp-{version}")
+        os.makedirs(tmp_dir)
+        try:
+            for name, artifact in state.items():
+                joblib.dump(artifact, os.path.join(tmp_dir, f"{name}.joblib"))
+            os.rename(tmp_dir, os.path.join(self.directory, version))
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        pointer = os.path.join(self.directory, LATEST_FILE)
+        with open(f"{pointer}.tmp", "w") as f:
+            f.write(version)
+        os.replace(f"{pointer}.tmp", pointer)
+
+        self._prune()
+        logger.info(f"Saved anomaly models as {version}")
+        return version
+
+    def latest_version(self) -> Optional[str]:
+        """Name of the latest complete version, if any"""
+        try:
+            with open(os.path.join(self.directory, LATEST_FILE)) as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return version if os.path.isdir(os.path.join(self.directory, version)) else None
+
+    def load_latest(self, mmap: bool = True) -> Optional[Dict[str, Any]]:
+        """Load every artifact of the latest version, memory-mapping arrays if asked"""
+        version = self.latest_version()
+        if version is None:
+            return None
+        path = os.path.join(self.directory, version)
+        state = {}
+        for filename in os.listdir(path):
+            if filename.endswith(".joblib"):
+                state[filename[:-len(".joblib")]] = joblib.load(
+                    os.path.join(path, filename), mmap_mode="r" if mmap else None
+                )
+        logger.info(f"Loaded anomaly models from {version}")
+        return state
+
+    def _prune(self):
+        latest = self.latest_version()
+        for version in self.versions()[:-self.keep_versions]:
+            if version != latest:
+                shutil.rmtree(os.path.join(self.directory, version), ignore_errors=True)
@@ -0,0 +1,146 @@
+import logging
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from itertools import count
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+AnomalyKey = Tuple[Optional[str], Optional[str], str]  # (service, endpoint, timestamp)
+
+
+def _iso(value: datetime) -> str:
+    # Anomaly timestamps are naive UTC ISO strings, compared as text
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat()
+
+
+class _TimeIndex:
+    """Anomalies sorted by timestamp, with a parallel list of keys for bisection"""
+
+    def __init__(self):
+        self.times: List[str] = []
+        self.items: List[Dict[str, Any]] = []
+
+    def insert(self, anomaly: Dict[str, Any]):
+        # Later detections are usually the newest, so this is an append
+        i = bisect_right(self.times, anomaly["timestamp"])
+        self.times.insert(i, anomaly["timestamp"])
+        self.items.insert(i, anomaly)
+
+    def prune(self, cutoff: str) -> List[Dict[str, Any]]:
+        i = bisect_left(self.times, cutoff)
+        removed = self.items[:i]
+        del self.times[:i], self.items[:i]
+        return removed
+
+    def range(self, start: Optional[str], end: Optional[str]) -> List[Dict[str, Any]]:
+        lo = 0 if start is None else bisect_left(self.times, start)
+        hi = len(self.times) if end is None else bisect_right(self.times, end)
+        return self.items[lo:hi]
+
+
+class ResultsCache:
+    """Detected anomalies and the latest predictions, as served to the API.
+
+    Each detection cycle's anomalies are merged in, de-duplicated by
+    (service, endpoint, timestamp) since consecutive cycles score
+    overlapping windows, and kept for retention. Anomalies are indexed by
+    timestamp overall and per severity, so a time-window query is a pair
+    of binary searches. Entity tags and last_modified change only when the
+    content does, which lets the API answer conditional requests cheaply.
+    """
+
+    def __init__(self, retention: timedelta = timedelta(hours=24), max_anomalies: int = 50_000):
+        self.retention = retention
+        self.max_anomalies = max_anomalies
+        self._keys: Dict[AnomalyKey, Dict[str, Any]] = {}
+        self._all = _TimeIndex()
+        self._by_severity: Dict[str, _TimeIndex] = {}
+        self._ids = count(1)
+        self.predictions: List[Dict[str, Any]] = []
+        self.predictions_version = 0
+        self.last_modified: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @staticmethod
+    def _key(anomaly: Dict[str, Any]) -> AnomalyKey:
+        return anomaly.get("service"), anomaly.get("api_endpoint"), anomaly["timestamp"]
+
+    def publish(
+        self,
+        anomalies: List[Dict[str, Any]],
+        predictions: List[Dict[str, Any]],
+        generated_at: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """Merge a detection cycle's results, returning the anomalies not seen before"""
+        generated_at = generated_at or datetime.utcnow()
+        new = []
+        for anomaly in anomalies:
+            key = self._key(anomaly)
+            if key in self._keys:
+                continue
+            # Ids increase in publication order and identify entries in ETags
+            anomaly = {**anomaly, "id": next(self._ids)}
+            self._keys[key] = anomaly
+            self._all.insert(anomaly)
+            self._by_severity.setdefault(anomaly.get("severity", "LOW"), _TimeIndex()).insert(anomaly)
+            new.append(anomaly)
+
+        removed = self._prune(generated_at)
+        if predictions != self.predictions:
+            self.predictions = predictions
+            self.predictions_version += 1
+        elif not new and not removed:
+            return new
+        self.last_modified = generated_at.replace(microsecond=0)
+        return new
+
+    def _prune(self, now: datetime) -> int:
+        cutoff = _iso(now - self.retention)
+        if len(self._all.times) > self.max_anomalies:
+            cutoff = max(cutoff, self._all.times[len(self._all.times) - self.max_anomalies])
+        removed = self._all.prune(cutoff)
+        for index in self._by_severity.values():
+            index.prune(cutoff)
+        for anomaly in removed:
+            del self._keys[self._key(anomaly)]
+        return len(removed)
+
+    def anomalies(
+        self,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        severity: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Anomalies in [start_time, end_time], oldest first, optionally of one severity"""
+        index = self._all if severity is None else self._by_severity.get(severity)
+        if index is None:
+            return []
+        return index.range(
+            None if start_time is None else _iso(start_time),
+            None if end_time is None else _iso(end_time)
+        )
+
+    @staticmethod
+    def anomalies_etag(anomalies: List[Dict[str, Any]]) -> str:
+        """Entity tag for an anomaly query result.
+
+        Entries never change once published and only leave from the oldest
+        end, so the first and last ids and the count identify the content.
+        """
+        if not anomalies:
+            return '"a-empty"'
+        return f'"a-{anomalies[0]["id"]}-{anomalies[-1]["id"]}-{len(anomalies)}"'
+
+    def predictions_etag(self, window_size: int) -> str:
+        return f'"p-{self.predictions_version}-{window_size}"'
+
+    def http_last_modified(self) -> Optional[str]:
+        if self.last_modified is None:
+            return None
+        return format_datetime(self.last_modified.replace(tzinfo=timezone.utc), usegmt=True)
@@ -0,0 +1,287 @@
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+import numpy as np
+from ..collectors.log_store import to_epoch_ns, from_epoch_ns, clock_horizon
+from .feature_aggregator import SeriesKey
+from .sketches import LatencyBins, DEFAULT_BINS
+
+logger = logging.getLogger(__name__)
+
+NS_PER_SECOND = 1_000_000_000
+
+# name -> (bucket width in seconds, retention in seconds)
+DEFAULT_RESOLUTIONS: Dict[str, Tuple[int, int]] = {
+    "10s": (10, 60 * 60),
+    "1m": (60, 24 * 60 * 60),
+    "1h": (60 * 60, 30 * 24 * 60 * 60),
+}
+# Per-endpoint series keep the same bucket widths for less time
+DEFAULT_SERIES_RESOLUTIONS: Dict[str, Tuple[int, int]] = {
+    "10s": (10, 60 * 60),
+    "1m": (60, 6 * 60 * 60),
+    "1h": (60 * 60, 7 * 24 * 60 * 60),
+}
+
+
+class RollupRing:
+    """Fixed-size ring of buckets of one resolution for one series.
+
+    Each bucket holds request count, error count, response-time sum, min
+    and max, and a latency sketch. Slot i holds bucket b where
+    b % slots == i, so buckets older than the retention are overwritten.
+    Buckets past clock_horizon are ignored, as in MinuteSeries.
+    """
+
+    def __init__(self, slots: int, n_bins: int, width_ns: int):
+        self.slots = slots
+        self.width_ns = width_ns
+        self.buckets = np.full(slots, -1, dtype=np.int64)
+        self.totals = np.zeros((slots, 3))  # count, errors, response_time_sum
+        self.mins = np.full(slots, np.inf)
+        self.maxs = np.full(slots, -np.inf)
+        self.sketches = np.zeros((slots, n_bins), dtype=np.uint32)
+        self.newest = -1
+
+    def add(self, buckets: np.ndarray, totals: np.ndarray, mins: np.ndarray, maxs: np.ndarray, sketches: np.ndarray):
+        """Merge pre-aggregated rows for distinct buckets"""
+        current = buckets <= clock_horizon(self.width_ns)
+        if not current.all():
+            buckets, totals, mins, maxs, sketches = (
+                rows[current] for rows in (buckets, totals, mins, maxs, sketches)
+            )
+            if len(buckets) == 0:
+                return
+        slots = buckets % self.slots
+        stale = self.buckets[slots] < buckets
+        if stale.any():
+            reset = slots[stale]
+            self.buckets[reset] = buckets[stale]
+            self.totals[reset] = 0
+            self.mins[reset] = np.inf
+            self.maxs[reset] = -np.inf
+            self.sketches[reset] = 0
+        # Buckets already overwritten by newer data are dropped
+        keep = self.buckets[slots] == buckets
+        slots = slots[keep]
+        self.totals[slots] += totals[keep]
+        self.mins[slots] = np.minimum(self.mins[slots], mins[keep])
+        self.maxs[slots] = np.maximum(self.maxs[slots], maxs[keep])
+        self.sketches[slots] += sketches[keep].astype(np.uint32)
+        self.newest = max(self.newest, int(buckets.max()))
+
+    def read(self, first: int, last: int):
+        """(buckets, totals, mins, maxs, sketches) for retained buckets in [first, last]"""
+        first = max(first, self.newest - self.slots + 1)
+        last = min(last, self.newest)
+        if last < first:
+            return None
+        buckets = np.arange(first, last + 1)
+        slots = buckets % self.slots
+        valid = self.buckets[slots] == buckets
+        slots = slots[valid]
+        return buckets[valid], self.totals[slots], self.mins[slots], self.maxs[slots], self.sketches[slots]
+
+
+class MetricsRollup:
+    """Multi-resolution per-endpoint metrics maintained on ingest.
+
+    Every ingested batch is folded into 10 second, 1 minute and 1 hour
+    buckets (by default), overall and per (service, endpoint). Each
+    resolution keeps its own retention, so a week-long chart reads about
+    170 hourly buckets rather than the raw logs. Per-endpoint series use
+    series_resolutions, which must have the same names and bucket widths
+    but may keep them for less time.
+
+    A bucket takes about 550 bytes, nearly all of it the latency sketch.
+    The overall series keeps 2520 buckets (1.4 MB) and an endpoint series
+    888 (0.5 MB); at most max_series endpoint series are tracked, dropping
+    the least recently updated one, so the defaults come to about 25 MB.
+    """
+
+    def __init__(
+        self,
+        resolutions: Optional[Dict[str, Tuple[int, int]]] = None,
+        bins: LatencyBins = DEFAULT_BINS,
+        max_series: int = 50,
+        series_resolutions: Optional[Dict[str, Tuple[int, int]]] = None
+    ):
+        self.resolutions = resolutions or DEFAULT_RESOLUTIONS
+        if series_resolutions is None:
+            series_resolutions = DEFAULT_SERIES_RESOLUTIONS if resolutions is None else self.resolutions
+        if {name: width for name, (width, _) in series_resolutions.items()} != \
+                {name: width for name, (width, _) in self.resolutions.items()}:
+            raise ValueError("series_resolutions must have the same names and bucket widths as resolutions")
+        self.series_resolutions = series_resolutions
+        self.bins = bins
+        self.max_series = max_series
+        self.overall = self._new_rings(self.resolutions)
+        self.series: "OrderedDict[SeriesKey, Dict[str, RollupRing]]" = OrderedDict()
+
+    def _new_rings(self, resolutions: Dict[str, Tuple[int, int]]) -> Dict[str, RollupRing]:
+        return {
+            name: RollupRing(retention // width, self.bins.n_bins, width * NS_PER_SECOND)
+            for name, (width, retention) in resolutions.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.series)
+
+    def update(
+        self,
+        timestamps: np.ndarray,
+        response_times: np.ndarray,
+        status_codes: np.ndarray,
+        endpoints: Optional[List[str]] = None,
+        services: Optional[List[str]] = None
+    ):
+        """Fold a batch of log entries into every resolution"""
+        n = len(timestamps)
+        if n == 0:
+            return
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        response_times = np.asarray(response_times, dtype=np.float64)
+        errors = np.asarray(status_codes) >= 400
+        bins = self.bins.index(response_times)
+
+        if endpoints is None:
+            ids, keys = np.zeros(n, dtype=np.int64), []
+        else:
+            key_ids: Dict[SeriesKey, int] = {}
+            ids = np.fromiter(
+                (key_ids.setdefault(key, len(key_ids)) for key in zip(services or ["unknown"] * n, endpoints)),
+                dtype=np.int64, count=n
+            )
+            keys = list(key_ids)
+            for key in keys:
+                if key not in self.series:
+                    self.series[key] = self._new_rings(self.series_resolutions)
+                    if len(self.series) > self.max_series:
+                        self.series.popitem(last=False)
+                else:
+                    self.series.move_to_end(key)
+
+        for name, (width, _) in self.resolutions.items():
+            buckets = timestamps // (width * NS_PER_SECOND)
+            self.overall[name].add(*self._group(np.zeros(n, dtype=np.int64), buckets, response_times, errors, bins)[1:])
+            if not keys:
+                continue
+            group_ids, *rows = self._group(ids, buckets, response_times, errors, bins)
+            bounds = np.flatnonzero(np.diff(group_ids)) + 1
+            for start, stop in zip(np.r_[0, bounds], np.r_[bounds, len(group_ids)]):
+                rings = self.series.get(keys[group_ids[start]])
+                if rings is not None:
+                    rings[name].add(*(row[start:stop] for row in rows))
+
+    def _group(self, ids: np.ndarray, buckets: np.ndarray, response_times: np.ndarray, errors: np.ndarray, bins: np.ndarray):
+        """Aggregate entries by (series id, bucket) using a combined integer key"""
+        base = int(buckets.min())
+        span = int(buckets.max()) - base + 1
+        combined, inverse = np.unique(ids * span + (buckets - base), return_inverse=True)
+        groups = len(combined)
+
+        totals = np.zeros((groups, 3))
+        np.add.at(totals, inverse, np.column_stack([np.ones(len(ids)), errors, response_times]))
+        mins = np.full(groups, np.inf)
+        np.minimum.at(mins, inverse, response_times)
+        maxs = np.full(groups, -np.inf)
+        np.maximum.at(maxs, inverse, response_times)
+        sketches = np.zeros((groups, self.bins.n_bins), dtype=np.uint32)
+        np.add.at(sketches, (inverse, bins), 1)
+        return combined // span, combined % span + base, totals, mins, maxs, sketches
+
+    def choose_resolution(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        max_points: int = 500,
+        per_series: bool = False
+    ) -> str:
+        """Finest resolution that covers start_time and needs at most max_points buckets.
+
+        With per_series, the retention of the endpoint series applies.
+        """
+        resolutions = self.series_resolutions if per_series else self.resolutions
+        start_ns = to_epoch_ns(start_time)
+        span = (to_epoch_ns(end_time) - start_ns) / NS_PER_SECOND
+        age = (to_epoch_ns(datetime.utcnow()) - start_ns) / NS_PER_SECOND
+        for name, (width, retention) in sorted(resolutions.items(), key=lambda item: item[1][0]):
+            if span / width <= max_points and age <= retention:
+                return name
+        return max(self.resolutions, key=lambda name: self.resolutions[name][0])
+
+    def query(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        resolution: str,
+        endpoint: Optional[str] = None,
+        service: Optional[str] = None,
+        quantiles: Sequence[float] = (0.5, 0.95, 0.99)
+    ) -> List[Dict[str, Any]]:
+        """Non-empty buckets in [start_time, end_time], oldest first.
+
+        With an endpoint but no service, the endpoint's series across all
+        services are merged; sketches merge exactly by addition.
+        """
+        if resolution not in self.resolutions:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        width_ns = self.resolutions[resolution][0] * NS_PER_SECOND
+        first = to_epoch_ns(start_time) // width_ns
+        last = to_epoch_ns(end_time) // width_ns
+
+        if endpoint is None and service is None:
+            rings = [self.overall[resolution]]
+        else:
+            rings = [
+                series[resolution] for (series_service, series_endpoint), series in self.series.items()
+                if (endpoint is None or series_endpoint == endpoint) and (service is None or series_service == service)
+            ]
+
+        merged = None
+        for ring in rings:
+            rows = ring.read(first, last)
+            if rows is None:
+                continue
+            merged = rows if merged is None else self._merge(merged, rows)
+        if merged is None:
+            return []
+
+        buckets, totals, mins, maxs, sketches = merged
+        values = self.bins.quantiles(sketches, quantiles)
+        points = []
+        for i, bucket in enumerate(buckets.tolist()):
+            count = totals[i, 0]
+            point = {
+                "timestamp": from_epoch_ns(bucket * width_ns).isoformat(),
+                "count": int(count),
+                "errors": int(totals[i, 1]),
+                "error_rate": float(totals[i, 1] / count),
+                "avg": float(totals[i, 2] / count),
+                "min": float(mins[i]),
+                "max": float(maxs[i])
+            }
+            for q, value in zip(quantiles, values[i].tolist()):
+                # Clamp sketch estimates to the exact range
+                point[f"p{q * 100:g}"] = min(max(value, point["min"]), point["max"])
+            points.append(point)
+        return points
+
+    @staticmethod
+    def _merge(left, right):
+        buckets = np.union1d(left[0], right[0])
+        merged = (
+            buckets,
+            np.zeros((len(buckets), 3)),
+            np.full(len(buckets), np.inf),
+            np.full(len(buckets), -np.inf),
+            np.zeros((len(buckets), left[4].shape[1]), dtype=np.uint32)
+        )
+        for rows in (left, right):
+            at = np.searchsorted(buckets, rows[0])
+            merged[1][at] += rows[1]
+            merged[2][at] = np.minimum(merged[2][at], rows[2])
+            merged[3][at] = np.maximum(merged[3][at], rows[3])
+            merged[4][at] += rows[4]
+        return merged
@@ -0,0 +1,52 @@
+import logging
+from typing import Sequence
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyBins:
+    """Logarithmic bins for DDSketch-style latency quantile sketches.
+
+    A sketch is just an array of per-bin counts, so sketches of equal
+    shape merge by addition and memory per sketch is fixed at n_bins
+    counters whatever the request volume. Bin i covers
+    (gamma**(i-1), gamma**i] relative to the bin offset, so any quantile
+    read back is within relative_accuracy of the true value for latencies
+    between min_value and max_value; values outside are clamped into the
+    first or last bin.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.05, min_value: float = 0.5, max_value: float = 120_000.0):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self.gamma)
+        self.min_value = min_value
+        self.max_value = max_value
+        self._offset = int(np.floor(np.log(min_value) / self._log_gamma))
+        self.n_bins = int(np.ceil(np.log(max_value) / self._log_gamma)) - self._offset + 1
+        # Representative value of each bin, with relative error at most relative_accuracy
+        upper = self.gamma ** (np.arange(self.n_bins) + self._offset)
+        self.values = 2 * upper / (self.gamma + 1)
+
+    def index(self, values: np.ndarray) -> np.ndarray:
+        """Bin index of each value"""
+        values = np.clip(np.asarray(values, dtype=np.float64), self.min_value, self.max_value)
+        bins = np.ceil(np.log(values) / self._log_gamma).astype(np.int64) - self._offset
+        return np.clip(bins, 0, self.n_bins - 1)
+
+    def quantiles(self, counts: np.ndarray, quantiles: Sequence[float]) -> np.ndarray:
+        """Quantiles of each sketch in a (..., n_bins) array, NaN for empty sketches"""
+        counts = np.asarray(counts)
+        cumulative = np.cumsum(counts, axis=-1)
+        totals = cumulative[..., -1:]
+        result = np.empty(counts.shape[:-1] + (len(quantiles),))
+        for i, q in enumerate(quantiles):
+            # Same rank convention as DDSketch: the value at rank q * (n - 1)
+            rank = q * (totals - 1)
+            result[..., i] = self.values[np.argmax(cumulative > rank, axis=-1)]
+        result[totals[..., 0] == 0] = np.nan
+        return result
+
+
+DEFAULT_BINS = LatencyBins()
@@ -0,0 +1,174 @@
+import logging
+import asyncio
+import gzip
+from datetime import date, datetime
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # Optional, responses fall back to gzip
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:  # Optional, responses are JSON only
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+MINIMUM_COMPRESS_SIZE = 1024
+# Larger bodies are compressed in a worker thread so the event loop keeps serving
+THREAD_COMPRESS_SIZE = 256 * 1024
+# Content types that must reach the client as they are written
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+
+
+def _default(value: Any) -> Any:
+    """Fallback for types neither encoder handles natively"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    return str(value)
+
+
+def dumps(data: Any) -> bytes:
+    """Serialize to JSON bytes; datetimes, NumPy values and non-string keys included"""
+    return orjson.dumps(data, default=_default, option=JSON_OPTIONS)
+
+
+loads = orjson.loads
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered with orjson, the app's default response class"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def wants_msgpack(request: Request) -> bool:
+    accept = request.headers.get("accept", "")
+    return msgpack is not None and any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES)
+
+
+def accepted_encoding(request_headers) -> Optional[str]:
+    """Best content coding the client accepts: br, then gzip"""
+    accept = request_headers.get("accept-encoding", "")
+    if brotli is not None and "br" in accept:
+        return "br"
+    if "gzip" in accept:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    # Fast settings: these are API responses compressed per request, not static assets
+    if encoding == "br":
+        return brotli.compress(body, quality=4)
+    return gzip.compress(body, compresslevel=5)
+
+
+def encode(data: Any, request: Request) -> Tuple[bytes, str]:
+    """(body, media type) in the representation the client asked for"""
+    if wants_msgpack(request):
+        return msgpack.packb(data, default=_default, use_bin_type=True), MSGPACK_MEDIA_TYPES[0]
+    return dumps(data), "application/json"
+
+
+def negotiated_response(request: Request, data: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    """JSON or MessagePack response, depending on the Accept header"""
+    body, media_type = encode(data, request)
+    headers = {**(headers or {}), "Vary": "Accept, Accept-Encoding"}
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def _vary(headers, field: bytes) -> bytes:
+    """Vary header value of a raw header list, with field added"""
+    values = [value for key, value in headers if key.lower() == b"vary"]
+    if any(field.lower() in value.lower() for value in values):
+        return b", ".join(values)
+    return b", ".join(values + [field])
+
+
+class CompressionMiddleware:
+    """Compresses response bodies with brotli or gzip, as the client accepts.
+
+    Only bodies sent in a single message of at least minimum_size bytes
+    are compressed. Streamed responses (such as server-sent events) and
+    responses that already carry a Content-Encoding pass through as they
+    are.
+    """
+
+    def __init__(self, app, minimum_size: int = MINIMUM_COMPRESS_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        encoding = accepted_encoding(headers)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                response_headers = {key.lower(): value for key, value in message.get("headers", [])}
+                content_type = response_headers.get(b"content-type", b"").decode("latin-1")
+                if b"content-encoding" in response_headers or content_type.startswith(UNCOMPRESSED_TYPES):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if start_message is not None:
+                message_start, start_message = start_message, None
+                if message.get("more_body", False) or len(body) < self.minimum_size:
+                    # Streamed or small, send it as it is
+                    passthrough = True
+                    await send(message_start)
+                    await send(message)
+                    return
+                if len(body) >= THREAD_COMPRESS_SIZE:
+                    body = await asyncio.to_thread(compress, body, encoding)
+                else:
+                    body = compress(body, encoding)
+                response_headers = [
+                    (key, value) for key, value in message_start.get("headers", [])
+                    if key.lower() not in (b"content-length", b"vary")
+                ]
+                response_headers += [
+                    (b"content-encoding", encoding.encode()),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"vary", _vary(message_start.get("headers", []), b"Accept-Encoding"))
+                ]
+                await send({**message_start, "headers": response_headers})
+                await send({"type": "http.response.body", "body": body})
+                return
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
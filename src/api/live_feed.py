@@ -0,0 +1,158 @@
+import logging
+import asyncio
+from collections import deque
+from datetime import datetime, timedelta
+from itertools import count
+from typing import Dict, Any, List, Optional, Set, AsyncIterator
+from .encoding import dumps
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """One connected client's bounded queue of encoded events"""
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.closed = False
+
+
+class Broadcaster:
+    """Fans server-sent events out to subscribers.
+
+    Each event is encoded once, however many clients are connected, and
+    put on every subscriber's bounded queue. A client whose queue is full
+    has fallen behind: it is dropped and its stream closed, and the
+    browser's EventSource reconnects and resynchronizes from a snapshot.
+    """
+
+    def __init__(self, queue_size: int = 256):
+        self.queue_size = queue_size
+        self._subscribers: Set[Subscription] = set()
+        self._ids = count(1)
+        self.dropped_clients = 0
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, initial: Optional[List[bytes]] = None) -> Subscription:
+        subscription = Subscription(self.queue_size)
+        for event in initial or []:
+            subscription.queue.put_nowait(event)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscription.closed = True
+        self._subscribers.discard(subscription)
+
+    def _close(self, subscription: Subscription):
+        self.unsubscribe(subscription)
+        # Wake the stream so it notices it was closed
+        if subscription.queue.full():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(b"")
+
+    def close_all(self):
+        """End every open stream"""
+        for subscription in list(self._subscribers):
+            self._close(subscription)
+
+    def encode(self, event: str, data: Any) -> bytes:
+        return b"id: %d\nevent: %s\ndata: %s\n\n" % (next(self._ids), event.encode(), dumps(data))
+
+    def publish(self, event: str, data: Any):
+        """Queue an event for every subscriber"""
+        if not self._subscribers:
+            return
+        message = self.encode(event, data)
+        for subscription in list(self._subscribers):
+            try:
+                subscription.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self.dropped_clients += 1
+                self._close(subscription)
+                logger.warning("Dropped a live feed client that fell behind")
+
+    async def stream(self, subscription: Subscription, keepalive: float = 15.0) -> AsyncIterator[bytes]:
+        """Yield a subscriber's events, with comment lines to keep idle connections open"""
+        try:
+            while not subscription.closed:
+                try:
+                    message = await asyncio.wait_for(subscription.queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if message:
+                    yield message
+        finally:
+            self.unsubscribe(subscription)
+
+
+class LiveFeed:
+    """Pushes dashboard updates: new anomalies, alerts, predictions and metric points.
+
+    Anomalies and predictions come from the detection scheduler, alerts
+    from the alert manager, and once a minute the overall metrics of the
+    last complete minute are read from the detector's aggregator. The last
+    history_minutes metric points are kept, already encoded, to prime new
+    subscribers' charts.
+    """
+
+    def __init__(self, detector, detection_scheduler, alert_manager, history_minutes: int = 60):
+        self.detector = detector
+        self.broadcaster = Broadcaster()
+        self.metric_points: deque = deque(maxlen=history_minutes)
+        self._metric_snapshot: Optional[bytes] = None
+        self._task: Optional[asyncio.Task] = None
+        detection_scheduler.add_listener(self._on_detection)
+        alert_manager.add_listener(self._on_alerts)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Close open streams so shutdown does not wait on them
+        self.broadcaster.close_all()
+
+    def subscribe(self) -> Subscription:
+        initial = [self._metric_snapshot] if self._metric_snapshot else []
+        return self.broadcaster.subscribe(initial)
+
+    def _on_detection(self, results, new_anomalies: List[Dict[str, Any]], predictions_changed: bool):
+        if new_anomalies:
+            self.broadcaster.publish("anomalies", new_anomalies)
+        if predictions_changed:
+            self.broadcaster.publish("predictions", results.predictions)
+
+    def _on_alerts(self, alerts: List[Dict[str, Any]]):
+        self.broadcaster.publish("alerts", alerts)
+
+    async def _run(self):
+        while True:
+            # Wake just after each minute boundary, once the minute is complete
+            now = datetime.utcnow()
+            next_minute = now.replace(second=0, microsecond=0) + timedelta(minutes=1, seconds=1)
+            await asyncio.sleep((next_minute - now).total_seconds())
+            try:
+                self._publish_metrics(next_minute.replace(second=0) - timedelta(minutes=1))
+            except Exception as e:
+                logger.error(f"Error publishing live metrics: {str(e)}")
+
+    def _publish_metrics(self, minute: datetime):
+        frame = self.detector.aggregator.frame(minute, minute)
+        if frame.empty:
+            point = {"timestamp": minute.isoformat(), "response_time": 0.0, "error_rate": 0.0, "request_rate": 0.0}
+        else:
+            point = {"timestamp": minute.isoformat(), **{k: float(v) for k, v in frame.iloc[-1].items()}}
+        self.metric_points.append(point)
+        self._metric_snapshot = self.broadcaster.encode("metrics", list(self.metric_points))
+        self.broadcaster.publish("metrics", [point])
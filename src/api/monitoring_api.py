@@ -1,61 +1,374 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import List, Dict, Any
-from datetime import datetime, timedelta
+from fastapi import APIRouter, HTTPException, Request, Query, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
 import logging
+import os
+import zlib
 from ..collectors.log_collector import LogCollector
+from ..collectors.probe_scheduler import ProbeScheduler, ProbeLimitError
+from ..collectors.ingest_ipc import IngestServer
+from ..collectors.line_ingest import FileTailer, ingest_stream, gunzip_chunks
 from ..analyzers.anomaly_detector import AnomalyDetector
+from ..analyzers.detection_scheduler import DetectionScheduler
+from ..analyzers.model_store import ModelStore
+from ..analyzers.rollups import MetricsRollup
 from ..alerts.alert_manager import AlertManager, AlertConfig
+from .live_feed import LiveFeed
+from ..telemetry import BUFFERED_ENTRIES, SCRAPED_COUNTERS
+from .encoding import (
+    loads, encode, compress, accepted_encoding, wants_msgpack, negotiated_response, MINIMUM_COMPRESS_SIZE
+)
 import asyncio
 
 router = APIRouter()
+ingest_router = APIRouter()  # the only routes served by ingest workers
 logger = logging.getLogger(__name__)
 
+# "standalone" runs everything in one process. For multi-worker ingest, run
+# the app once as "aggregator" and with N uvicorn workers as "ingest": the
+# workers validate batches and forward them to the aggregator over
+# INGEST_SOCKET, and the aggregator stores, detects and alerts.
+INGEST_ROLE = os.getenv("INGEST_ROLE", "standalone")
+if INGEST_ROLE not in ("standalone", "ingest", "aggregator"):
+    raise ValueError(f"Unknown INGEST_ROLE: {INGEST_ROLE}")
+INGEST_SOCKET = os.getenv("INGEST_SOCKET", "/tmp/api-monitor-ingest.sock")
+# Largest POST /logs body accepted, measured after any gzip decompression
+MAX_PAYLOAD_BYTES = int(os.getenv("LOG_MAX_PAYLOAD_BYTES", str(64 * 1024 * 1024)))
+
 # Initialize components with in-memory storage for demo
-log_collector = LogCollector(es_host=None)  # Use in-memory storage
-anomaly_detector = AnomalyDetector()
-alert_manager = AlertManager(
-    AlertConfig(
-        severity_thresholds={
-            "CRITICAL": -0.8,
-            "HIGH": -0.6,
-            "MEDIUM": -0.4,
-            "LOW": -0.2
-        },
-        notification_endpoints={
-            "slack": "https://hooks.slack.com/services/your-webhook-url",
-            "email": "http://internal-alert-service/email"
-        },
-        cooldown_period=5,  # 5 minutes
-        alert_history_size=1000
+log_collector = LogCollector(
+    es_host=None,  # Use in-memory storage
+    store_capacity=int(os.getenv("LOG_STORE_CAPACITY", "1000000")),
+    max_buffered=int(os.getenv("LOG_MAX_BUFFERED", "100000")),
+    backpressure_policy=os.getenv("LOG_BACKPRESSURE_POLICY", "drop"),
+    forward_to=INGEST_SOCKET if INGEST_ROLE == "ingest" else None,
+    data_dir=os.getenv("LOG_DATA_DIR") or None,
+    retention_days=float(os.getenv("LOG_RETENTION_DAYS", "7"))
+)
+if INGEST_ROLE == "ingest":
+    # Ingest workers only validate and forward; storage, detection and alerting live in the aggregator
+    anomaly_detector = metrics_rollup = alert_manager = detection_scheduler = live_feed = probe_scheduler = None
+else:
+    anomaly_detector = AnomalyDetector(engine=os.getenv("ANOMALY_ENGINE", "isolation_forest"))
+    log_collector.add_listener(anomaly_detector.observe)
+    metrics_rollup = MetricsRollup(max_series=int(os.getenv("ROLLUP_MAX_SERIES", "50")))
+    log_collector.add_listener(metrics_rollup.update)
+    alert_manager = AlertManager(
+        AlertConfig(
+            severity_thresholds={
+                "CRITICAL": -0.8,
+                "HIGH": -0.6,
+                "MEDIUM": -0.4,
+                "LOW": -0.2
+            },
+            notification_endpoints={
+                "slack": "https://hooks.slack.com/services/your-webhook-url",
+                "email": "http://internal-alert-service/email"
+            },
+            cooldown_period=5,  # 5 minutes
+            alert_history_size=1000,
+            default_timeout=float(os.getenv("ALERT_SEND_TIMEOUT", "10")),
+            max_concurrent_sends=int(os.getenv("ALERT_MAX_CONCURRENT_SENDS", "20")),
+            rate_limit=float(os.getenv("ALERT_RATE_LIMIT", "1")),
+            rate_burst=int(os.getenv("ALERT_RATE_BURST", "5")),
+            max_retries=int(os.getenv("ALERT_MAX_RETRIES", "5")),
+            queue_path=os.getenv("ALERT_QUEUE_PATH") or None
+        )
+    )
+    detection_scheduler = DetectionScheduler(
+        anomaly_detector,
+        alert_manager,
+        interval=int(os.getenv("ANOMALY_DETECTION_INTERVAL", "60")),
+        executor=os.getenv("DETECTION_EXECUTOR", "thread"),
+        model_store=ModelStore(os.getenv("MODEL_DIR", "models")),
+        persist_interval=int(os.getenv("MODEL_PERSIST_INTERVAL", "900"))
+    )
+    live_feed = LiveFeed(anomaly_detector, detection_scheduler, alert_manager)
+    probe_scheduler = ProbeScheduler(
+        log_collector,
+        max_concurrency=int(os.getenv("PROBE_MAX_CONCURRENCY", "100")),
+        default_timeout=float(os.getenv("PROBE_DEFAULT_TIMEOUT", "10"))
     )
+ingest_server = IngestServer(log_collector, INGEST_SOCKET) if INGEST_ROLE == "aggregator" else None
+# Ingest workers share their files, so only a storing process tails them
+LOG_TAIL_PATHS = [path.strip() for path in os.getenv("LOG_TAIL_PATHS", "").split(",") if path.strip()]
+file_tailer = FileTailer(
+    log_collector,
+    LOG_TAIL_PATHS,
+    checkpoint_path=os.getenv("LOG_TAIL_CHECKPOINT", "tail-checkpoints.json"),
+    poll_interval=float(os.getenv("LOG_TAIL_POLL_INTERVAL", "1")),
+    start_at_end=os.getenv("LOG_TAIL_START_AT_END", "false").lower() == "true"
+) if LOG_TAIL_PATHS and INGEST_ROLE != "ingest" else None
+
+# Read at scrape time, so the hot paths do not pay for them
+if log_collector.forwarder:
+    BUFFERED_ENTRIES.labels("forwarder").set_function(lambda: log_collector.forwarder.pending)
+if log_collector.es_client:
+    BUFFERED_ENTRIES.labels("elasticsearch").set_function(lambda: log_collector.flusher.pending)
+if log_collector.segments is not None:
+    BUFFERED_ENTRIES.labels("segments").set_function(lambda: log_collector.segments.pending)
+SCRAPED_COUNTERS.add("api_monitor_logs_ingested", "Log entries accepted", lambda: log_collector.ingested)
+SCRAPED_COUNTERS.add("api_monitor_logs_rejected", "Log entries rejected as invalid", lambda: log_collector.rejected)
+SCRAPED_COUNTERS.add(
+    "api_monitor_logs_dropped", "Log entries dropped by a full or failing buffer",
+    lambda: log_collector.flusher.dropped + (log_collector.forwarder.dropped if log_collector.forwarder else 0)
 )
+if alert_manager is not None:
+    BUFFERED_ENTRIES.labels("alerts").set_function(lambda: alert_manager.delivery_queue.pending)
+    SCRAPED_COUNTERS.add("api_monitor_alerts_sent", "Alerts delivered", lambda: alert_manager.delivery_queue.sent)
+    SCRAPED_COUNTERS.add(
+        "api_monitor_alerts_dropped", "Alerts dropped from a full queue", lambda: alert_manager.delivery_queue.dropped
+    )
+
+async def start_components():
+    """Start background tasks for the monitoring components"""
+    log_collector.start()
+    if INGEST_ROLE == "ingest":
+        return
+    await alert_manager.start()
+    detection_scheduler.start()
+    live_feed.start()
+    probe_scheduler.start()
+    if ingest_server:
+        await ingest_server.start()
+    if file_tailer:
+        file_tailer.start()
+
+async def stop_components():
+    """Stop background tasks and release resources"""
+    if INGEST_ROLE == "ingest":
+        await log_collector.cleanup()
+        return
+    if file_tailer:
+        await file_tailer.stop()
+    if ingest_server:
+        await ingest_server.stop()
+    await probe_scheduler.stop()
+    await live_feed.stop()
+    await detection_scheduler.stop()
+    await alert_manager.close()
+    await log_collector.cleanup()
+
+async def _gunzip_body(chunks, limit: int) -> bytes:
+    """Decompress a gzip request body, refusing to inflate it beyond limit bytes"""
+    body = bytearray()
+    async for data in gunzip_chunks(chunks):
+        body += data
+        if len(body) > limit:
+            raise HTTPException(status_code=413, detail=f"Decompressed log payload exceeds {limit} bytes")
+    return bytes(body)
 
-@router.post("/logs")
-async def ingest_logs(logs: List[Dict[str, Any]]):
-    """Ingest API logs for processing"""
+async def _read_body(request: Request, limit: int) -> bytes:
+    """Read a request body, refusing one longer than limit bytes before or while it is received"""
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > limit:
+        raise HTTPException(status_code=413, detail=f"Log payload exceeds {limit} bytes")
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            raise HTTPException(status_code=413, detail=f"Log payload exceeds {limit} bytes")
+    return bytes(body)
+
+def _decode_log_payload(body: bytes, content_type: str) -> List[Any]:
+    """Decode a JSON array or NDJSON request body"""
+    try:
+        if "ndjson" in content_type or "jsonlines" in content_type:
+            return [loads(line) for line in body.splitlines() if line.strip()]
+        payload = loads(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid log payload: {str(e)}")
+
+    if isinstance(payload, dict):
+        return [payload]
+    if not isinstance(payload, list):
+        raise HTTPException(status_code=400, detail="Log payload must be a JSON array or object")
+    return payload
+
+@ingest_router.post("/logs")
+async def ingest_logs(request: Request):
+    """Ingest API logs for processing.
+
+    Accepts a JSON array, or newline-delimited JSON with an
+    application/x-ndjson content type; either may be gzip-encoded. Bodies
+    are limited to LOG_MAX_PAYLOAD_BYTES, once decompressed.
+    """
+    if "gzip" in request.headers.get("content-encoding", "").lower():
+        try:
+            body = await _gunzip_body(request.stream(), MAX_PAYLOAD_BYTES)
+        except zlib.error as e:
+            raise HTTPException(status_code=400, detail=f"Invalid log payload: {str(e)}")
+    else:
+        body = await _read_body(request, MAX_PAYLOAD_BYTES)
+    logs = _decode_log_payload(body, request.headers.get("content-type", ""))
     try:
-        for log in logs:
-            await log_collector.collect_logs(log)
-        return {"status": "success", "message": f"Ingested {len(logs)} log entries"}
+        accepted, rejected = await log_collector.collect_batch(logs)
+        return {
+            "status": "success",
+            "message": f"Ingested {accepted} log entries",
+            "rejected": rejected
+        }
     except Exception as e:
         logger.error(f"Error ingesting logs: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@ingest_router.post("/logs/lines")
+async def ingest_log_lines(request: Request):
+    """Ingest raw JSON-lines logs of any size.
+
+    The body, optionally gzip-encoded, is read and parsed chunk by chunk,
+    so memory use does not grow with its size. Lines that are not JSON
+    objects are rejected.
+    """
+    chunks = request.stream()
+    if "gzip" in request.headers.get("content-encoding", "").lower():
+        chunks = gunzip_chunks(chunks)
+    try:
+        accepted, rejected = await ingest_stream(log_collector, chunks)
+    except zlib.error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid log payload: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error ingesting log lines: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "status": "success",
+        "message": f"Ingested {accepted} log entries",
+        "rejected": rejected
+    }
+
 @router.post("/api/monitor")
-async def add_api_monitor(background_tasks: BackgroundTasks, api_endpoint: str):
-    """Add a new API endpoint to monitor"""
+async def add_api_monitor(
+    api_endpoint: str,
+    interval: float = Query(60, gt=0),
+    timeout: Optional[float] = Query(None, gt=0),
+    method: str = "GET"
+):
+    """Add a synthetic probe for an API endpoint, or update an existing one"""
     try:
-        background_tasks.add_task(log_collector.monitor_api, api_endpoint)
-        return {
+        probe = probe_scheduler.add(api_endpoint, interval=interval, timeout=timeout, method=method)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ProbeLimitError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {
+        "status": "success",
+        "message": f"Started monitoring {api_endpoint}",
+        "probe": probe.to_dict()
+    }
+
+@router.get("/api/monitor")
+async def list_api_monitors(request: Request):
+    """List synthetic probes with their latest results"""
+    return negotiated_response(request, {"probes": [probe.to_dict() for probe in probe_scheduler.list()]})
+
+@router.delete("/api/monitor/{probe_id}")
+async def remove_api_monitor(probe_id: str):
+    """Stop a synthetic probe"""
+    if not probe_scheduler.remove(probe_id):
+        raise HTTPException(status_code=404, detail=f"Probe not found: {probe_id}")
+    return {
+        "status": "success",
+        "message": f"Stopped probe {probe_id}"
+    }
+
+def _representation(request: Request, etag: str) -> str:
+    """Entity tag of the encoding of a result the client will get"""
+    variant = "-".join(filter(None, ["msgpack" if wants_msgpack(request) else None, accepted_encoding(request.headers)]))
+    return f'{etag[:-1]}-{variant}"' if variant else etag
+
+def _conditional_response(request: Request, etag: str, build) -> Response:
+    """Serve a cached encoded body, or 304 if the client already has this version"""
+    results = detection_scheduler.cache
+    etag = _representation(request, etag)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept, Accept-Encoding"}
+    last_modified = results.http_last_modified()
+    if last_modified:
+        headers["Last-Modified"] = last_modified
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(",")):
+            return Response(status_code=304, headers=headers)
+    elif last_modified and request.headers.get("if-modified-since"):
+        try:
+            since = parsedate_to_datetime(request.headers["if-modified-since"])
+            if results.last_modified.replace(tzinfo=timezone.utc) <= since:
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+
+    # Identical results are serialized and compressed once, however many clients poll
+    cached = _response_bodies.get(etag)
+    if cached is None:
+        body, media_type = encode(build(), request)
+        content_encoding = accepted_encoding(request.headers) if len(body) >= MINIMUM_COMPRESS_SIZE else None
+        if content_encoding:
+            body = compress(body, content_encoding)
+        cached = _response_bodies[etag] = (body, media_type, content_encoding)
+        while len(_response_bodies) > 256:
+            _response_bodies.popitem(last=False)
+    else:
+        _response_bodies.move_to_end(etag)
+    body, media_type, content_encoding = cached
+    if content_encoding:
+        headers["Content-Encoding"] = content_encoding
+    return Response(content=body, media_type=media_type, headers=headers)
+
+# etag of a representation -> (body, media type, content encoding)
+_response_bodies: "OrderedDict[str, Tuple[bytes, str, Optional[str]]]" = OrderedDict()
+
+@router.get("/metrics", response_model=Dict[str, Any])
+async def get_metrics(
+    request: Request,
+    start_time: datetime = None,
+    end_time: datetime = None,
+    resolution: str = "auto",
+    endpoint: str = None,
+    service: str = None,
+    quantiles: str = "0.5,0.95,0.99",
+    max_points: int = Query(500, ge=1, le=10000)
+):
+    """Get pre-aggregated request metrics and latency percentiles over time.
+
+    resolution is one of 10s, 1m or 1h, or auto to pick the finest one
+    that covers the range in at most max_points buckets.
+    """
+    try:
+        quantile_values = [float(q) for q in quantiles.split(",") if q.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid quantiles: {quantiles}")
+    if any(not 0 <= q <= 1 for q in quantile_values):
+        raise HTTPException(status_code=400, detail="Quantiles must be between 0 and 1")
+    if resolution != "auto" and resolution not in metrics_rollup.resolutions:
+        raise HTTPException(status_code=400, detail=f"Unknown resolution: {resolution}")
+
+    try:
+        if not end_time:
+            end_time = datetime.utcnow()
+        if not start_time:
+            start_time = end_time - timedelta(hours=1)
+        if resolution == "auto":
+            resolution = metrics_rollup.choose_resolution(
+                start_time, end_time, max_points, per_series=endpoint is not None or service is not None
+            )
+
+        points = metrics_rollup.query(start_time, end_time, resolution, endpoint, service, quantile_values)
+        return negotiated_response(request, {
             "status": "success",
-            "message": f"Started monitoring {api_endpoint}"
-        }
+            "resolution": resolution,
+            "points": points,
+            "total": len(points)
+        })
     except Exception as e:
-        logger.error(f"Error setting up API monitor: {str(e)}")
+        logger.error(f"Error getting metrics: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/anomalies", response_model=Dict[str, Any])
 async def get_anomalies(
+    request: Request,
     start_time: datetime = None,
     end_time: datetime = None,
     severity: str = None
@@ -64,88 +377,107 @@ async def get_anomalies(
     try:
         if not start_time:
             start_time = datetime.utcnow() - timedelta(hours=1)
-        if not end_time:
-            end_time = datetime.utcnow()
 
-        # Generate sample anomalies for demo
-        import random
-        sample_anomalies = []
-        endpoints = ["/test/success", "/test/error", "/test/slow"]
-        severities = ["LOW", "MEDIUM", "HIGH", "CRITICAL"]
-        
-        for _ in range(5):  # Generate 5 sample anomalies
-            anomaly_time = datetime.utcnow() - timedelta(minutes=random.randint(1, 30))
-            sample_anomalies.append({
-                "timestamp": anomaly_time.isoformat(),
-                "severity": random.choice(severities),
-                "anomaly_score": random.uniform(-0.9, -0.1),
-                "api_endpoint": random.choice(endpoints),
-                "metrics": {
-                    "response_time": random.uniform(100, 2000),
-                    "error_rate": random.uniform(0, 0.2),
-                    "request_rate": random.uniform(10, 100)
-                }
-            })
-        
-        # Filter by severity if specified
-        if severity:
-            sample_anomalies = [a for a in sample_anomalies if a["severity"] == severity.upper()]
-        
-        return {
-            "status": "success",
-            "anomalies": sample_anomalies,
-            "total": len(sample_anomalies)
-        }
+        anomalies = detection_scheduler.cache.anomalies(
+            start_time, end_time, severity.upper() if severity else None
+        )
+        return _conditional_response(
+            request,
+            detection_scheduler.cache.anomalies_etag(anomalies),
+            lambda: {
+                "status": "success",
+                "anomalies": anomalies,
+                "total": len(anomalies)
+            }
+        )
     except Exception as e:
         logger.error(f"Error getting anomalies: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/predictions", response_model=Dict[str, Any])
-async def get_predictions(window_size: int = 60):
+async def get_predictions(request: Request, window_size: int = Query(60, ge=2)):
     """Get predictions for potential future anomalies"""
     try:
-        # Generate sample predictions for demo
-        import random
-        sample_predictions = []
-        endpoints = ["/test/success", "/test/error", "/test/slow"]
-        
-        for i in range(3):  # Generate 3 sample predictions
-            prediction_time = datetime.utcnow() + timedelta(minutes=random.randint(5, 60))
-            sample_predictions.append({
-                "timestamp": prediction_time.isoformat(),
-                "confidence": random.uniform(0.6, 0.95),
-                "predicted_metrics": {
-                    "response_time": random.uniform(800, 3000),
-                    "error_rate": random.uniform(0.1, 0.3),
-                    "request_rate": random.uniform(50, 150)
-                },
-                "api_endpoint": random.choice(endpoints)
-            })
-        
-        return {
-            "status": "success",
-            "predictions": sample_predictions,
-            "window_size_minutes": window_size
-        }
+        etag = detection_scheduler.cache.predictions_etag(window_size)
+        predictions = detection_scheduler.cache.predictions
+        if window_size != detection_scheduler.prediction_window and _representation(request, etag) not in _response_bodies:
+            # Other windows are computed on demand, at most once per detection cycle
+            predictions = await asyncio.to_thread(anomaly_detector.predict_future_anomalies, window_size)
+
+        return _conditional_response(
+            request,
+            etag,
+            lambda: {
+                "status": "success",
+                "predictions": predictions,
+                "window_size_minutes": window_size
+            }
+        )
     except Exception as e:
         logger.error(f"Error getting predictions: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/stream")
+async def stream_updates():
+    """Server-sent events for the dashboard.
+
+    Events are "anomalies" (newly detected anomalies), "alerts" (alert
+    payloads as they are generated), "predictions" (the full list, when it
+    changes) and "metrics" (per-minute overall metric points; the recent
+    history is sent on connect).
+    """
+    subscription = live_feed.subscribe()
+    return StreamingResponse(
+        live_feed.broadcaster.stream(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/api/alerts/history")
-async def get_alert_history():
-    """Get alert history"""
+async def get_alert_history(
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    severity: str = None,
+    endpoint: str = None,
+    start_time: datetime = None,
+    end_time: datetime = None
+):
+    """Get a page of alert history, newest first, optionally filtered"""
     try:
-        history = alert_manager.get_alert_history()
+        # Fetch one extra entry to tell whether another page follows
+        history = alert_manager.get_alert_history(
+            limit + 1, offset, severity.upper() if severity else None, endpoint, start_time, end_time
+        )
         stats = alert_manager.get_alert_statistics()
-        return {
+        return negotiated_response(request, {
             "status": "success",
-            "history": history,
+            "history": history[:limit],
+            "pagination": {
+                "limit": limit,
+                "offset": offset,
+                "has_more": len(history) > limit
+            },
             "statistics": stats
-        }
+        })
     except Exception as e:
         logger.error(f"Error getting alert history: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/api/alerts/dead-letters")
+async def get_dead_letters(request: Request):
+    """Get alerts that could not be delivered after all retries"""
+    try:
+        dead_letters = alert_manager.delivery_queue.get_dead_letters()
+        return negotiated_response(request, {
+            "status": "success",
+            "dead_letters": dead_letters,
+            "total": len(dead_letters)
+        })
+    except Exception as e:
+        logger.error(f"Error getting dead-lettered alerts: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/api/alerts/test")
 async def test_alert():
     """Generate a test alert"""
@@ -165,7 +497,7 @@ async def test_alert():
         await alert_manager.process_anomalies([test_anomaly])
         return {
             "status": "success",
-            "message": "Test alert generated successfully"
+            "message": "Test alert queued for delivery"
         }
     except Exception as e:
         logger.error(f"Error generating test alert: {str(e)}")
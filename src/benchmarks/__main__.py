@@ -0,0 +1,41 @@
+import argparse
+import json
+from . import alerting, detection, detector_engines, ingest_load, response_encoding
+from .timing import run_info
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m src.benchmarks",
+        description="Ingest, detection, engine, encoding and alerting benchmarks, written as one JSON document"
+    )
+    parser.add_argument("--url", help="base URL of a running server for the ingest benchmark")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per ingest combination")
+    parser.add_argument(
+        "--skip", action="append", default=[], choices=["ingest", "detection", "engines", "encoding", "alerting"]
+    )
+    parser.add_argument("--output", help="write the results to this file instead of stdout")
+    args = parser.parse_args()
+
+    results = {"run": run_info()}
+    if "ingest" not in args.skip:
+        results["ingest"] = ingest_load.run(args.url, duration=args.duration)
+    if "detection" not in args.skip:
+        results["detection"] = detection.run()
+    if "engines" not in args.skip:
+        results["engines"] = detector_engines.run()
+    if "encoding" not in args.skip:
+        results["encoding"] = response_encoding.run()
+    if "alerting" not in args.skip:
+        results["alerting"] = alerting.run()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
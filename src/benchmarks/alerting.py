@@ -0,0 +1,147 @@
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict, List
+from aiohttp import web
+from ..alerts.alert_manager import AlertManager, AlertConfig
+from .timing import summarize, run_info
+
+SCENARIOS = [
+    # (channels, anomalies, max_digest, webhook delay in ms)
+    (1, 1000, 1, 0),
+    (10, 1000, 1, 0),
+    (10, 1000, 50, 0),
+    (10, 200, 1, 50)
+]
+TIMEOUT = 120  # seconds to wait for every alert to arrive
+
+
+class StubWebhook:
+    """Local webhook receiver that counts what it is sent"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.requests = 0
+        self.alerts = 0
+        self.arrived = asyncio.Event()
+        self.expected = 0
+        self._runner = None
+        self.port = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.requests += 1
+        self.alerts += payload.get("alert_count", 1)
+        if self.alerts >= self.expected:
+            self.arrived.set()
+        return web.Response(text="ok")
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/hook/{channel}", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+
+def synthetic_anomalies(count: int) -> List[Dict[str, Any]]:
+    """Anomalies on distinct endpoints, so none are suppressed as repeats"""
+    return [{
+        "timestamp": "2024-01-01T00:00:00",
+        "severity": "CRITICAL",
+        "anomaly_score": -0.9,
+        "api_endpoint": f"/api/v1/resource/{i}",
+        "service": "benchmark",
+        "metrics": {"response_time": 2500.0, "error_rate": 0.3, "request_rate": 120.0}
+    } for i in range(count)]
+
+
+async def benchmark_fanout(channels: int, anomalies: int, max_digest: int, delay_ms: float) -> Dict[str, Any]:
+    webhook = StubWebhook(delay_ms / 1000)
+    await webhook.start()
+    webhook.expected = channels * anomalies
+    manager = AlertManager(AlertConfig(
+        severity_thresholds={"CRITICAL": -0.8, "HIGH": -0.6, "MEDIUM": -0.4, "LOW": -0.2},
+        notification_endpoints={
+            f"channel-{i}": f"http://127.0.0.1:{webhook.port}/hook/{i}" for i in range(channels)
+        },
+        cooldown_period=5,
+        alert_history_size=anomalies,
+        # Rate limits off: the point is how fast delivery itself goes
+        rate_limit=1e9,
+        rate_burst=1_000_000,
+        max_digest_alerts=max_digest,
+        max_queued_alerts=anomalies
+    ))
+
+    send = manager.delivery_queue.send
+    latencies: List[float] = []
+
+    async def timed_send(channel: str, endpoint: str, alert: Dict[str, Any]):
+        start = time.perf_counter()
+        await send(channel, endpoint, alert)
+        latencies.append(time.perf_counter() - start)
+
+    manager.delivery_queue.send = timed_send
+    await manager.start()
+    try:
+        start = time.perf_counter()
+        await manager.process_anomalies(synthetic_anomalies(anomalies))
+        queued = time.perf_counter() - start
+        try:
+            await asyncio.wait_for(webhook.arrived.wait(), TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+        elapsed = time.perf_counter() - start
+    finally:
+        await manager.close()
+        await webhook.stop()
+
+    return {
+        "channels": channels,
+        "anomalies": anomalies,
+        "max_digest": max_digest,
+        "webhook_delay_ms": delay_ms,
+        "queue_ms": queued * 1000,
+        "elapsed_s": elapsed,
+        "webhook_requests": webhook.requests,
+        "alerts_delivered": webhook.alerts,
+        "alerts_expected": webhook.expected,
+        "requests_per_s": webhook.requests / elapsed,
+        "alerts_per_s": webhook.alerts / elapsed,
+        **summarize(latencies, "send_")
+    }
+
+
+async def run_scenarios(scenarios=SCENARIOS) -> List[Dict[str, Any]]:
+    return [await benchmark_fanout(*scenario) for scenario in scenarios]
+
+
+def run(scenarios=SCENARIOS) -> List[Dict[str, Any]]:
+    return asyncio.run(run_scenarios(scenarios))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AlertManager fan-out benchmark against a local webhook")
+    parser.add_argument("--channels", type=int)
+    parser.add_argument("--anomalies", type=int, default=1000)
+    parser.add_argument("--max-digest", type=int, default=1)
+    parser.add_argument("--webhook-delay-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    scenarios = SCENARIOS
+    if args.channels is not None:
+        scenarios = [(args.channels, args.anomalies, args.max_digest, args.webhook_delay_ms)]
+    print(json.dumps({"run": run_info(), "alerting": run(scenarios)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
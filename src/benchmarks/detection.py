@@ -0,0 +1,91 @@
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+import numpy as np
+from ..analyzers.anomaly_detector import AnomalyDetector
+from ..collectors.log_store import LogColumns, to_epoch_ns
+from .timing import summarize, run_info
+
+# Minutes of history: an hour, a day and a week
+HISTORY_MINUTES = [60, 24 * 60, 7 * 24 * 60]
+ENTRIES_PER_MINUTE = 100
+ENDPOINTS = 20
+REPEATS = 5
+
+
+def synthetic_columns(minutes: int, entries_per_minute: int, seed: int) -> LogColumns:
+    """Log columns ending now, with a daily cycle in latency and 2% errors"""
+    rng = np.random.default_rng(seed)
+    count = minutes * entries_per_minute
+    end_ns = to_epoch_ns(datetime.now(timezone.utc))
+    timestamps = np.sort(rng.integers(end_ns - minutes * 60_000_000_000, end_ns, count)).astype(np.int64)
+    cycle = np.sin(2 * np.pi * (timestamps / 60e9) / (24 * 60))
+    return LogColumns(
+        timestamp=timestamps,
+        response_time=rng.lognormal(4.5 + 0.2 * cycle, 0.3),
+        status_code=np.where(rng.random(count) < 0.02, 500, 200).astype(np.int16),
+        endpoint_id=rng.integers(0, ENDPOINTS, count).astype(np.int32),
+        service_id=np.zeros(count, dtype=np.int32),
+        environment_id=np.zeros(count, dtype=np.int32),
+        error=np.full(count, None, dtype=object)
+    )
+
+
+def _timed(function, repeats: int = REPEATS):
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        latencies.append(time.perf_counter() - start)
+    return result, latencies
+
+
+def benchmark_history(minutes: int, entries_per_minute: int = ENTRIES_PER_MINUTE) -> Dict[str, Any]:
+    """Global model on raw columns, and per-endpoint models on the minute aggregator"""
+    columns = synthetic_columns(minutes, entries_per_minute, seed=minutes)
+    last_hour = columns.timestamp >= columns.timestamp[-1] - 3600 * 1_000_000_000
+    current = LogColumns(*(column[last_hour] for column in columns))
+
+    detector = AnomalyDetector()
+    _, prepare = _timed(lambda: detector.prepare_features(columns))
+    _, train = _timed(lambda: detector.train(columns), repeats=1)
+    _, detect_global = _timed(lambda: detector.detect_anomalies(current))
+
+    # What the detection scheduler does: rows folded in at ingest, one model per endpoint
+    endpoints = [f"/api/v1/resource/{i}" for i in range(ENDPOINTS)]
+    start = time.perf_counter()
+    detector.observe(
+        columns.timestamp, columns.response_time, columns.status_code,
+        [endpoints[i] for i in columns.endpoint_id], ["benchmark"] * len(columns)
+    )
+    observe_seconds = time.perf_counter() - start
+    end_time = datetime.now(timezone.utc)
+    _, first = _timed(lambda: detector.detect_anomalies(start_time=end_time - timedelta(hours=1), end_time=end_time), 1)
+    anomalies, steady = _timed(lambda: detector.detect_anomalies(
+        start_time=end_time - timedelta(hours=1), end_time=end_time
+    ))
+
+    return {
+        "history_minutes": minutes,
+        "entries": len(columns),
+        **summarize(prepare, "prepare_features_"),
+        "train_ms": train[0] * 1000,
+        **summarize(detect_global, "detect_global_"),
+        "observe_ms": observe_seconds * 1000,
+        "detect_endpoints_first_ms": first[0] * 1000,
+        **summarize(steady, "detect_endpoints_"),
+        "anomalies": len(anomalies)
+    }
+
+
+def run(history_minutes: List[int] = HISTORY_MINUTES) -> List[Dict[str, Any]]:
+    return [benchmark_history(minutes) for minutes in history_minutes]
+
+
+def main():
+    print(json.dumps({"run": run_info(), "detection": run()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
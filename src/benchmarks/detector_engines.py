@@ -0,0 +1,70 @@
+import time
+import numpy as np
+from typing import Dict, Any, List, Tuple
+from ..analyzers.engines import create_engine, ENGINES
+from .timing import summarize
+
+TRAINING_MINUTES = 24 * 60
+TEST_MINUTES = 6 * 60
+ANOMALY_RATE = 0.02
+
+
+def synthetic_traffic(minutes: int, seed: int, anomaly_rate: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-minute feature rows with a daily cycle, slow drift and labelled incidents"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(minutes)
+    cycle = np.sin(2 * np.pi * t / (24 * 60))
+    drift = 1 + t / (7 * 24 * 60)
+
+    request_rate = rng.poisson(np.maximum(200 + 80 * cycle, 1) * drift).astype(float)
+    response_time = rng.normal(120 + 20 * cycle, 8) * drift
+    error_rate = rng.binomial(request_rate.astype(int), 0.01) / np.maximum(request_rate, 1)
+
+    labels = rng.random(minutes) < anomaly_rate
+    kinds = rng.integers(0, 3, size=minutes)
+    response_time[labels & (kinds == 0)] *= 3
+    error_rate[labels & (kinds == 1)] += 0.2
+    request_rate[labels & (kinds == 2)] *= 0.1
+
+    return np.column_stack([response_time, error_rate, request_rate]), labels
+
+
+def benchmark_engine(name: str, contamination: float = 0.1) -> Dict[str, Any]:
+    engine = create_engine(name, contamination)
+    history, _ = synthetic_traffic(TRAINING_MINUTES, seed=1)
+    # Later traffic continues the drift so stale baselines are penalised
+    features, labels = synthetic_traffic(TRAINING_MINUTES + TEST_MINUTES, seed=2, anomaly_rate=ANOMALY_RATE)
+    features, labels = features[TRAINING_MINUTES:], labels[TRAINING_MINUTES:]
+
+    start = time.perf_counter()
+    state = engine.fit(history)
+    fit_seconds = time.perf_counter() - start
+
+    predictions = np.empty(len(features), dtype=int)
+    score_latencies = []
+    update_latencies = []
+    for i, row in enumerate(features):
+        # One call per minute, as the scheduler does
+        start = time.perf_counter()
+        predictions[i] = engine.score(state, row[None, :])[0][0]
+        score_latencies.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        state = engine.update(state, row[None, :])
+        update_latencies.append(time.perf_counter() - start)
+
+    flagged = predictions == -1
+    true_positives = int((flagged & labels).sum())
+    return {
+        "engine": name,
+        "fit_ms": fit_seconds * 1000,
+        **summarize(score_latencies, "score_"),
+        **summarize(update_latencies, "update_"),
+        "recall": true_positives / max(int(labels.sum()), 1),
+        "precision": true_positives / max(int(flagged.sum()), 1),
+        "anomalies": int(labels.sum()),
+        "flagged": int(flagged.sum())
+    }
+
+
+def run() -> List[Dict[str, Any]]:
+    return [benchmark_engine(name) for name in ENGINES]
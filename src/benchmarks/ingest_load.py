@@ -0,0 +1,210 @@
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+import aiohttp
+import numpy as np
+from .timing import summarize, run_info
+
+DEFAULT_BATCH_SIZES = [1, 100, 1000]
+DEFAULT_CONCURRENCY = [1, 16, 64]
+# Distinct bodies per batch size; workers cycle through them
+BODIES = 8
+FORMATS = ("json", "ndjson", "lines")
+
+
+def synthetic_logs(count: int, seed: int) -> List[Dict[str, Any]]:
+    """Log entries over the last minute across 20 endpoints, about 2% of them errors"""
+    rng = np.random.default_rng(seed)
+    now = datetime.now(timezone.utc)
+    offsets = np.sort(rng.uniform(0, 60_000, count))
+    status_codes = np.where(rng.random(count) < 0.02, 500, 200)
+    response_times = rng.lognormal(4.5, 0.4, count)
+    return [{
+        "timestamp": (now - timedelta(milliseconds=float(offsets[-1] - offsets[i]))).isoformat(),
+        "endpoint": f"/api/v1/resource/{i % 20}",
+        "service": f"service-{i % 3}",
+        "environment": "benchmark",
+        "response_time": float(response_times[i]),
+        "status_code": int(status_codes[i]),
+        "error": "Internal Server Error" if status_codes[i] >= 400 else None
+    } for i in range(count)]
+
+
+def encode_body(logs: List[Dict[str, Any]], payload_format: str, compress: bool) -> bytes:
+    if payload_format == "json":
+        body = json.dumps(logs).encode()
+    else:
+        body = "\n".join(json.dumps(log) for log in logs).encode()
+    return gzip.compress(body, compresslevel=5) if compress else body
+
+
+def request_target(base_url: str, payload_format: str, compress: bool):
+    """(url, headers) for posting bodies of the given format"""
+    headers = {"Content-Type": "application/json"}
+    if payload_format == "ndjson":
+        headers["Content-Type"] = "application/x-ndjson"
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    path = "/api/v1/logs/lines" if payload_format == "lines" else "/api/v1/logs"
+    return base_url.rstrip("/") + path, headers
+
+
+async def run_load(
+    base_url: str,
+    batch_size: int,
+    concurrency: int,
+    duration: float,
+    payload_format: str = "json",
+    compress: bool = False,
+    seed: int = 1
+) -> Dict[str, Any]:
+    """Post batches from concurrency workers for duration seconds"""
+    url, headers = request_target(base_url, payload_format, compress)
+    bodies = [
+        encode_body(synthetic_logs(batch_size, seed + i), payload_format, compress) for i in range(BODIES)
+    ]
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker(session: aiohttp.ClientSession, offset: int, deadline: float):
+        nonlocal errors
+        i = offset
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                async with session.post(url, data=bodies[i % BODIES], headers=headers) as response:
+                    await response.read()
+                    if response.status != 200:
+                        errors += 1
+                        continue
+            except aiohttp.ClientError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            i += 1
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(worker(session, i, deadline) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "format": payload_format,
+        "gzip": compress,
+        "batch_size": batch_size,
+        "concurrency": concurrency,
+        "duration_s": elapsed,
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_s": len(latencies) / elapsed,
+        "entries_per_s": len(latencies) * batch_size / elapsed,
+        "body_bytes": len(bodies[0]),
+        **summarize(latencies)
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_ready(base_url: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.post(base_url + "/api/v1/logs", json=[]) as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not become ready within {timeout}s")
+
+
+def start_server(port: int, workers: int = 1, env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    """Run the monitoring app under uvicorn in a child process"""
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "src.main:app",
+            "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning"
+        ],
+        env={**os.environ, "PYTHONPATH": os.getcwd(), **(env or {})}
+    )
+
+
+async def run_matrix(
+    base_url: str,
+    batch_sizes: List[int],
+    concurrency: List[int],
+    duration: float,
+    payload_format: str,
+    compress: bool
+) -> List[Dict[str, Any]]:
+    results = []
+    for batch_size in batch_sizes:
+        for workers in concurrency:
+            results.append(await run_load(base_url, batch_size, workers, duration, payload_format, compress))
+    return results
+
+
+def run(
+    url: Optional[str] = None,
+    batch_sizes: List[int] = DEFAULT_BATCH_SIZES,
+    concurrency: List[int] = DEFAULT_CONCURRENCY,
+    duration: float = 10.0,
+    payload_format: str = "json",
+    compress: bool = False,
+    server_workers: int = 1
+) -> List[Dict[str, Any]]:
+    """Benchmark the server at url, or a fresh local one when url is None"""
+    server = None
+    if url is None:
+        port = _free_port()
+        url = f"http://127.0.0.1:{port}"
+        # Alerts would go to the placeholder webhooks; detection is not what is measured here
+        server = start_server(port, server_workers, {"ANOMALY_DETECTION_INTERVAL": "3600"})
+    try:
+        if server is not None:
+            asyncio.run(_wait_ready(url, timeout=60))
+        return asyncio.run(run_matrix(url, batch_sizes, concurrency, duration, payload_format, compress))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest throughput and latency benchmark")
+    parser.add_argument("--url", help="base URL of a running server; starts a local one if omitted")
+    parser.add_argument("--batch-sizes", type=_int_list, default=DEFAULT_BATCH_SIZES)
+    parser.add_argument("--concurrency", type=_int_list, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per combination")
+    parser.add_argument("--format", choices=FORMATS, default="json")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--server-workers", type=int, default=1)
+    args = parser.parse_args()
+
+    results = run(
+        args.url, args.batch_sizes, args.concurrency, args.duration, args.format, args.gzip, args.server_workers
+    )
+    print(json.dumps({"run": run_info(), "ingest": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
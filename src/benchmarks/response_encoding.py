@@ -0,0 +1,99 @@
+import gzip
+import json
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from typing import Any, Callable, Dict, List
+from fastapi.encoders import jsonable_encoder
+from ..api.encoding import dumps, brotli, msgpack, _default
+from .timing import summarize
+
+ROWS = 5000
+REPEATS = 20
+
+
+def synthetic_payloads(rows: int = ROWS, seed: int = 1) -> Dict[str, Any]:
+    """Bodies shaped like the anomalies, alert history, metrics and predictions routes"""
+    rng = np.random.default_rng(seed)
+    start = datetime(2024, 1, 1)
+    timestamps = [start + timedelta(minutes=i) for i in range(rows)]
+    endpoints = [f"/api/v1/resource/{i}" for i in range(20)]
+    response_times = rng.normal(120, 15, rows)
+    error_rates = rng.beta(1, 80, rows)
+    request_rates = rng.poisson(200, rows)
+
+    anomalies = [{
+        "timestamp": timestamps[i],
+        "endpoint": endpoints[i % len(endpoints)],
+        "service": "checkout",
+        "response_time": float(response_times[i]),
+        "error_rate": float(error_rates[i]),
+        "request_rate": int(request_rates[i]),
+        "anomaly_score": float(rng.normal()),
+        "severity": "high" if i % 7 == 0 else "medium"
+    } for i in range(rows)]
+    history = [{
+        "id": f"alert-{i}",
+        "timestamp": timestamps[i],
+        "severity": "critical" if i % 11 == 0 else "warning",
+        "message": f"Response time anomaly on {endpoints[i % len(endpoints)]}",
+        "channels": ["slack", "email"],
+        "delivered": True
+    } for i in range(rows)]
+    points = [{
+        "timestamp": timestamps[i],
+        "requests": int(request_rates[i]),
+        "errors": int(request_rates[i] * error_rates[i]),
+        "avg_response_time": float(response_times[i]),
+        "p95_response_time": float(response_times[i] * 1.6),
+        "p99_response_time": float(response_times[i] * 2.1)
+    } for i in range(rows)]
+    predictions = {
+        "timestamps": timestamps,
+        "response_time": response_times,
+        "error_rate": error_rates,
+        "lower": response_times * 0.8,
+        "upper": response_times * 1.2
+    }
+    return {
+        "anomalies": {"status": "success", "anomalies": anomalies, "total": rows},
+        "alert_history": {"status": "success", "history": history},
+        "metrics": {"status": "success", "resolution": "1m", "points": points, "total": rows},
+        "predictions": {"status": "success", "predictions": predictions}
+    }
+
+
+def _time(encode: Callable[[], bytes]) -> Dict[str, Any]:
+    latencies = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        body = encode()
+        latencies.append(time.perf_counter() - start)
+    return {**summarize(latencies), "bytes": len(body)}
+
+
+def _stdlib(data: Any) -> bytes:
+    # What FastAPI's default JSONResponse does for a returned dict
+    return json.dumps(
+        jsonable_encoder(data, custom_encoder={np.ndarray: np.ndarray.tolist}),
+        ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def benchmark_payload(name: str, data: Any) -> Dict[str, Any]:
+    body = dumps(data)
+    result = {
+        "payload": name,
+        "stdlib_json": _time(lambda: _stdlib(data)),
+        "orjson": _time(lambda: dumps(data)),
+        "gzip": _time(lambda: gzip.compress(body, compresslevel=5))
+    }
+    if brotli is not None:
+        result["brotli"] = _time(lambda: brotli.compress(body, quality=4))
+    if msgpack is not None:
+        result["msgpack"] = _time(lambda: msgpack.packb(data, default=_default, use_bin_type=True))
+    return result
+
+
+def run() -> List[Dict[str, Any]]:
+    return [benchmark_payload(name, data) for name, data in synthetic_payloads().items()]
@@ -0,0 +1,37 @@
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+
+def summarize(latencies: List[float], prefix: str = "") -> Dict[str, Optional[float]]:
+    """p50, p99 and max in milliseconds of latencies measured in seconds"""
+    if len(latencies) == 0:
+        return {f"{prefix}p50_ms": None, f"{prefix}p99_ms": None, f"{prefix}max_ms": None}
+    latencies = np.asarray(latencies) * 1000
+    return {
+        f"{prefix}p50_ms": float(np.percentile(latencies, 50)),
+        f"{prefix}p99_ms": float(np.percentile(latencies, 99)),
+        f"{prefix}max_ms": float(latencies.max())
+    }
+
+
+def run_info() -> Dict[str, Any]:
+    """What a benchmark ran on, so results can be compared across releases"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "argv": sys.argv[1:]
+    }
@@ -0,0 +1,170 @@
+import logging
+import asyncio
+import time
+from typing import Dict, Any, List, Callable, Awaitable, Optional
+
+logger = logging.getLogger(__name__)
+
+# bulk(entries) sends entries to storage and returns the ones that should be retried
+BulkSender = Callable[[List[Dict[str, Any]]], Awaitable[List[Dict[str, Any]]]]
+
+
+class BulkFlusher:
+    """Background task that ships buffered log entries to bulk storage.
+
+    Ingest appends to an active buffer and returns immediately; the flusher
+    task swaps it for an empty one and sends the swapped batch, so ingest
+    never waits on storage I/O. A flush is triggered once max_batch entries
+    are buffered or the oldest buffered entry is max_age seconds old.
+    Failed sends are retried with bounded exponential backoff. When
+    max_buffered entries are pending, new entries are either dropped
+    (policy "drop") or put() waits for room (policy "block").
+    """
+
+    def __init__(
+        self,
+        bulk: BulkSender,
+        max_batch: int = 1000,
+        max_age: float = 60.0,
+        max_buffered: int = 100_000,
+        policy: str = "drop",
+        max_retries: int = 5,
+        base_backoff: float = 0.5,
+        max_backoff: float = 30.0
+    ):
+        if policy not in ("drop", "block"):
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        self.bulk = bulk
+        self.max_batch = max_batch
+        self.max_age = max_age
+        self.max_buffered = max_buffered
+        self.policy = policy
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self.flushed = 0  # entries accepted by storage
+        self.dropped = 0  # entries discarded by backpressure or exhausted retries
+        self.failed_flushes = 0
+
+        self._active: List[Dict[str, Any]] = []
+        self._in_flight = 0
+        self._oldest: Optional[float] = None  # monotonic time of the oldest active entry
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        # Created in start() so they bind to the running event loop
+        self._wakeup: Optional[asyncio.Event] = None
+        self._room: Optional[asyncio.Event] = None
+        self._send_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def pending(self) -> int:
+        """Entries buffered or currently being sent"""
+        return len(self._active) + self._in_flight
+
+    def start(self):
+        """Start the background flush task on the running event loop"""
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._room = asyncio.Event()
+        self._room.set()
+        self._send_lock = asyncio.Lock()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task after flushing whatever is left"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        self._stopping = False
+
+    async def put(self, entries: List[Dict[str, Any]]) -> int:
+        """Buffer entries for the next flush, returning how many were accepted"""
+        self.start()
+        accepted = 0
+        while entries:
+            room = self.max_buffered - self.pending
+            if room <= 0:
+                if self.policy == "drop":
+                    break
+                self._room.clear()
+                await self._room.wait()
+                continue
+
+            chunk, entries = entries[:room], entries[room:]
+            was_empty = not self._active
+            if was_empty:
+                self._oldest = time.monotonic()
+            self._active.extend(chunk)
+            accepted += len(chunk)
+            # Wake the flusher to arm its age timer or flush a full batch
+            if was_empty or len(self._active) >= self.max_batch:
+                self._wakeup.set()
+
+        if entries:
+            self.dropped += len(entries)
+            logger.warning(f"Log buffer full, dropped {len(entries)} entries")
+        return accepted
+
+    async def flush(self):
+        """Send everything currently buffered"""
+        if self._send_lock is None:
+            return
+        async with self._send_lock:
+            batch, self._active, self._oldest = self._active, [], None
+            self._in_flight = len(batch)
+            try:
+                for i in range(0, len(batch), self.max_batch):
+                    await self._send(batch[i:i + self.max_batch])
+            finally:
+                self._in_flight = 0
+                self._room.set()
+
+    def _due(self) -> bool:
+        if len(self._active) >= self.max_batch:
+            return True
+        return self._oldest is not None and time.monotonic() - self._oldest >= self.max_age
+
+    async def _run(self):
+        while not self._stopping:
+            timeout = None
+            if self._oldest is not None:
+                timeout = max(0.0, self._oldest + self.max_age - time.monotonic())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            if self._active and (self._due() or self._stopping):
+                try:
+                    await self.flush()
+                except Exception as e:
+                    logger.error(f"Unexpected error in log flusher: {str(e)}")
+
+        if self._active:
+            await self.flush()
+
+    async def _send(self, batch: List[Dict[str, Any]]):
+        """Send one batch, retrying failed entries with exponential backoff"""
+        pending = batch
+        for attempt in range(self.max_retries + 1):
+            try:
+                failed = await self.bulk(pending)
+            except Exception as e:
+                logger.error(f"Error flushing {len(pending)} logs: {str(e)}")
+                failed = pending
+            self.flushed += len(pending) - len(failed)
+            pending = failed
+            if not pending:
+                return
+            if attempt < self.max_retries:
+                await asyncio.sleep(min(self.max_backoff, self.base_backoff * 2 ** attempt))
+
+        self.failed_flushes += 1
+        self.dropped += len(pending)
+        logger.error(f"Giving up on {len(pending)} logs after {self.max_retries} retries")
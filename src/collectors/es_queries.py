@@ -0,0 +1,157 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from ..analyzers.feature_aggregator import FEATURE_COLUMNS, PERCENTILES
+from .log_store import to_epoch_ns, from_epoch_ns
+
+logger = logging.getLogger(__name__)
+
+INDEX_PREFIX = "api-logs-"
+
+# Beyond this many daily indices, query the wildcard pattern instead of listing them
+MAX_LISTED_INDICES = 62
+
+# Fields returned for each log entry; the raw "data" payload stays in the index
+LOG_FIELDS = ["timestamp", "environment", "service", "api_endpoint", "response_time", "status_code", "error"]
+
+INDEX_TEMPLATE = {
+    "index_patterns": [f"{INDEX_PREFIX}*"],
+    "template": {
+        "mappings": {
+            "properties": {
+                "timestamp": {"type": "date"},
+                "environment": {"type": "keyword"},
+                "service": {"type": "keyword"},
+                "api_endpoint": {"type": "keyword"},
+                "response_time": {"type": "float"},
+                "status_code": {"type": "short"},
+                "error": {"type": "text"},
+                "data": {"type": "object", "enabled": False}
+            }
+        }
+    }
+}
+
+
+def index_name(timestamp: str) -> str:
+    """Daily index for an ISO-8601 UTC timestamp"""
+    return f"{INDEX_PREFIX}{timestamp[:10]}"
+
+
+def index_names(start_time: datetime, end_time: datetime) -> str:
+    """Comma-separated daily indices overlapping [start_time, end_time]"""
+    start = from_epoch_ns(to_epoch_ns(start_time)).date()
+    end = from_epoch_ns(to_epoch_ns(end_time)).date()
+    days = (end - start).days + 1
+    if days <= 0:
+        return ""
+    if days > MAX_LISTED_INDICES:
+        return f"{INDEX_PREFIX}*"
+    return ",".join(index_name((start + timedelta(days=i)).isoformat()) for i in range(days))
+
+
+def range_query(
+    start_time: datetime,
+    end_time: datetime,
+    endpoint: Optional[str] = None,
+    service: Optional[str] = None,
+    status_code: Optional[int] = None
+) -> Dict[str, Any]:
+    """Filter-context query, so ES can cache it and skip scoring"""
+    filters = [{
+        "range": {
+            "timestamp": {
+                "gte": to_epoch_ns(start_time) // 1_000_000,
+                "lte": to_epoch_ns(end_time) // 1_000_000,
+                "format": "epoch_millis"
+            }
+        }
+    }]
+    for field, value in (("api_endpoint", endpoint), ("service", service), ("status_code", status_code)):
+        if value is not None:
+            filters.append({"term": {field: value}})
+    return {"bool": {"filter": filters}}
+
+
+async def search_pages(
+    es_client,
+    index: str,
+    query: Dict[str, Any],
+    page_size: int = 5000,
+    keep_alive: str = "1m"
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield every matching log entry in timestamp order, one page at a time.
+
+    Pages are read from a point-in-time, so entries indexed while paging
+    neither appear nor shift later pages, and each page continues with
+    search_after from the sort values of the last hit rather than an
+    offset, which keeps deep pages as cheap as the first.
+    """
+    pit = await es_client.open_point_in_time(index=index, keep_alive=keep_alive, ignore_unavailable=True)
+    pit_id = pit["id"]
+    search_after = None
+    try:
+        while True:
+            params = {}
+            if search_after is not None:
+                params["search_after"] = search_after
+            result = await es_client.search(
+                pit={"id": pit_id, "keep_alive": keep_alive},
+                query=query,
+                sort=[{"timestamp": "asc"}, {"_shard_doc": "asc"}],
+                size=page_size,
+                source=LOG_FIELDS,
+                track_total_hits=False,
+                **params
+            )
+            pit_id = result.get("pit_id", pit_id)
+            hits = result["hits"]["hits"]
+            if hits:
+                yield [hit["_source"] for hit in hits]
+            if len(hits) < page_size:
+                return
+            search_after = hits[-1]["sort"]
+    finally:
+        try:
+            await es_client.close_point_in_time(id=pit_id)
+        except Exception as e:
+            logger.warning(f"Error closing Elasticsearch point in time: {str(e)}")
+
+
+def minute_rollup_aggregation() -> Dict[str, Any]:
+    """Per-minute date_histogram computing the detector's feature columns"""
+    return {
+        "minutes": {
+            "date_histogram": {"field": "timestamp", "fixed_interval": "1m", "min_doc_count": 1},
+            "aggs": {
+                "response_time": {"avg": {"field": "response_time"}},
+                "errors": {"filter": {"range": {"status_code": {"gte": 400}}}},
+                "percentiles": {
+                    "percentiles": {"field": "response_time", "percents": [q * 100 for q in PERCENTILES]}
+                }
+            }
+        }
+    }
+
+
+def rollup_frame(buckets: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Turn date_histogram buckets into feature rows like MinuteSeries.frame"""
+    if not buckets:
+        return pd.DataFrame(columns=FEATURE_COLUMNS, dtype=float)
+    requests = np.array([bucket["doc_count"] for bucket in buckets], dtype=np.float64)
+    percentiles = np.array([
+        [bucket["percentiles"]["values"].get(f"{q * 100:.1f}") or 0.0 for q in PERCENTILES]
+        for bucket in buckets
+    ], dtype=np.float64)
+    return pd.DataFrame(
+        {
+            'response_time': [bucket["response_time"]["value"] or 0.0 for bucket in buckets],
+            'error_rate': np.array([bucket["errors"]["doc_count"] for bucket in buckets]) / requests,
+            'request_rate': requests,
+            'p95_response_time': percentiles[:, 0],
+            'p99_response_time': percentiles[:, 1]
+        },
+        index=pd.to_datetime([bucket["key"] for bucket in buckets], unit='ms')
+    )
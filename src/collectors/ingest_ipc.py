@@ -0,0 +1,310 @@
+import logging
+import asyncio
+import os
+import struct
+from collections import deque
+from itertools import chain
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+import numpy as np
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# magic, entries, length of the JSON string table
+_HEADER = struct.Struct("<4sII")
+_LENGTH = struct.Struct("<I")
+MAGIC = b"ALB1"
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+
+def encode_batch(
+    timestamps: np.ndarray,
+    response_times,
+    status_codes,
+    endpoints: List[str],
+    services: List[str],
+    environments: List[str],
+    errors: List[Any]
+) -> bytes:
+    """Pack normalised log columns into one binary frame.
+
+    Numeric columns are sent as raw little-endian arrays; endpoints,
+    services and environments are dictionary-encoded into a string table,
+    and errors, which are mostly None, are sent sparsely.
+    """
+    n = len(timestamps)
+    strings: Dict[str, int] = {}
+    codes = np.fromiter(
+        (strings.setdefault(value, len(strings)) for value in chain(endpoints, services, environments)),
+        dtype="<i4", count=3 * n
+    )
+    table = orjson.dumps(
+        [list(strings), [[i, error] for i, error in enumerate(errors) if error is not None]],
+        default=str
+    )
+    return b"".join([
+        _HEADER.pack(MAGIC, n, len(table)),
+        table,
+        np.asarray(timestamps, dtype="<i8").tobytes(),
+        np.asarray(response_times, dtype="<f8").tobytes(),
+        np.asarray(status_codes, dtype="<i2").tobytes(),
+        codes.tobytes()
+    ])
+
+
+def decode_batch(frame: bytes) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str], List[str], List[str], List[Any]]:
+    """Inverse of encode_batch, numeric columns are read-only views into the frame"""
+    magic, n, table_length = _HEADER.unpack_from(frame)
+    if magic != MAGIC:
+        raise ValueError("Not an ingest batch frame")
+    offset = _HEADER.size
+    strings, sparse_errors = orjson.loads(frame[offset:offset + table_length])
+    offset += table_length
+
+    columns = []
+    for dtype, count in (("<i8", n), ("<f8", n), ("<i2", n), ("<i4", 3 * n)):
+        column = np.frombuffer(frame, dtype=dtype, count=count, offset=offset)
+        columns.append(column)
+        offset += column.nbytes
+    timestamps, response_times, status_codes, codes = columns
+
+    values = np.array(strings, dtype=object)
+    errors: List[Any] = [None] * n
+    for i, error in sparse_errors:
+        errors[i] = error
+    return (
+        timestamps,
+        response_times,
+        status_codes,
+        values[codes[:n]].tolist(),
+        values[codes[n:2 * n]].tolist(),
+        values[codes[2 * n:]].tolist(),
+        errors
+    )
+
+
+def parse_address(address: str) -> Tuple[str, Any]:
+    """("unix", path) for a socket path, ("tcp", (host, port)) for host:port"""
+    if "/" in address or ":" not in address:
+        return "unix", address
+    host, _, port = address.rpartition(":")
+    return "tcp", (host or "127.0.0.1", int(port))
+
+
+class IngestForwarder:
+    """Ships batches from an ingest worker to the aggregator process.
+
+    Request handlers encode their batch and queue it; one background task
+    writes queued frames over a single persistent connection, coalescing
+    whatever queued up while the previous write drained. If the aggregator
+    is unreachable the task reconnects with bounded exponential backoff
+    while frames queue up. Once max_buffered entries are pending, new
+    batches are dropped (policy "drop") or put() waits for room (policy
+    "block"), as with the Elasticsearch flusher. Frames lost with a broken
+    connection are counted as dropped rather than resent, so delivery is
+    at most once.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        max_buffered: int = 100_000,
+        policy: str = "drop",
+        base_backoff: float = 0.1,
+        max_backoff: float = 5.0
+    ):
+        if policy not in ("drop", "block"):
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        self.address = address
+        self.max_buffered = max_buffered
+        self.policy = policy
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self.forwarded = 0  # entries written to the aggregator
+        self.dropped = 0
+        self.reconnects = 0
+
+        self._frames: Deque[Tuple[bytes, int]] = deque()
+        self._pending = 0
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        # Created in start() so they bind to the running event loop
+        self._wakeup: Optional[asyncio.Event] = None
+        self._room: Optional[asyncio.Event] = None
+
+    @property
+    def pending(self) -> int:
+        """Entries queued or currently being written"""
+        return self._pending
+
+    def start(self):
+        """Start the background writer task on the running event loop"""
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._room = asyncio.Event()
+        self._room.set()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Write whatever is queued, if the aggregator is reachable, and disconnect"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        self._stopping = False
+
+    async def put(self, frame: bytes, entries: int) -> int:
+        """Queue an encoded batch of entries, returning how many were accepted"""
+        self.start()
+        while self._pending + entries > self.max_buffered and self._pending:
+            if self.policy == "drop":
+                self.dropped += entries
+                logger.warning(f"Ingest forward queue full, dropped {entries} entries")
+                return 0
+            self._room.clear()
+            await self._room.wait()
+
+        self._frames.append((frame, entries))
+        self._pending += entries
+        self._wakeup.set()
+        return entries
+
+    async def _connect(self) -> asyncio.StreamWriter:
+        kind, target = parse_address(self.address)
+        if kind == "unix":
+            _, writer = await asyncio.open_unix_connection(target)
+        else:
+            _, writer = await asyncio.open_connection(*target)
+        return writer
+
+    async def _run(self):
+        attempt = 0
+        while True:
+            if not self._frames:
+                if self._stopping:
+                    break
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            if self._writer is None:
+                try:
+                    self._writer = await self._connect()
+                    attempt = 0
+                except OSError as e:
+                    if self._stopping:
+                        self._discard(len(self._frames))
+                        logger.error(f"Aggregator unreachable at shutdown: {str(e)}")
+                        break
+                    attempt += 1
+                    self.reconnects += 1
+                    delay = min(self.max_backoff, self.base_backoff * 2 ** min(attempt, 16))
+                    logger.error(f"Cannot reach ingest aggregator at {self.address}, retrying in {delay:.1f}s: {str(e)}")
+                    await asyncio.sleep(delay)
+                    continue
+
+            count = len(self._frames)
+            batch = [self._frames.popleft() for _ in range(count)]
+            try:
+                self._writer.writelines(
+                    chain.from_iterable((_LENGTH.pack(len(frame)), frame) for frame, _ in batch)
+                )
+                await self._writer.drain()
+                self.forwarded += sum(entries for _, entries in batch)
+            except (OSError, ConnectionError) as e:
+                self.dropped += sum(entries for _, entries in batch)
+                logger.error(f"Lost connection to ingest aggregator: {str(e)}")
+                self._writer.close()
+                self._writer = None
+            finally:
+                self._pending -= sum(entries for _, entries in batch)
+                self._room.set()
+
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (OSError, ConnectionError):
+                pass
+            self._writer = None
+
+    def _discard(self, count: int):
+        for _ in range(count):
+            _, entries = self._frames.popleft()
+            self.dropped += entries
+            self._pending -= entries
+        self._room.set()
+
+
+class IngestServer:
+    """Receives batches from ingest workers and stores them through one collector.
+
+    Runs in the aggregator process. Frames from all connected workers are
+    handled on its single event loop, so the store, the rollups and the
+    detector see one merged stream and detection, suppression and alert
+    state stay global however many workers accept requests.
+    """
+
+    def __init__(self, collector, address: str):
+        self.collector = collector
+        self.address = address
+        self.received = 0  # entries
+        self.rejected_frames = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Set[asyncio.StreamWriter] = set()
+
+    async def start(self):
+        if self._server is not None:
+            return
+        kind, target = parse_address(self.address)
+        if kind == "unix":
+            # A socket file left by a previous run would make bind fail
+            if os.path.exists(target):
+                os.unlink(target)
+            self._server = await asyncio.start_unix_server(self._handle, target)
+        else:
+            self._server = await asyncio.start_server(self._handle, *target)
+        logger.info(f"Accepting ingest batches on {self.address}")
+
+    async def stop(self):
+        if self._server is None:
+            return
+        self._server.close()
+        for writer in list(self._connections):
+            writer.close()
+        await self._server.wait_closed()
+        self._server = None
+        kind, target = parse_address(self.address)
+        if kind == "unix" and os.path.exists(target):
+            os.unlink(target)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections.add(writer)
+        try:
+            while True:
+                (length,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+                if length > MAX_FRAME_BYTES:
+                    logger.error(f"Ingest frame of {length} bytes exceeds limit, closing connection")
+                    self.rejected_frames += 1
+                    break
+                frame = await reader.readexactly(length)
+                try:
+                    columns = decode_batch(frame)
+                except (ValueError, struct.error) as e:  # orjson.JSONDecodeError is a ValueError
+                    self.rejected_frames += 1
+                    logger.error(f"Invalid ingest frame: {str(e)}")
+                    continue
+                await self.collector.ingest_columns(*columns)
+                self.received += len(columns[0])
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # Worker disconnected
+        except Exception as e:
+            logger.error(f"Error handling ingest connection: {str(e)}")
+        finally:
+            self._connections.discard(writer)
+            writer.close()
@@ -0,0 +1,391 @@
+import logging
+import asyncio
+import glob
+import os
+import zlib
+from stat import S_ISREG
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+import orjson
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_BATCH_SIZE = 5000
+# Longer lines are skipped rather than buffered
+MAX_LINE_BYTES = 1024 * 1024
+
+
+class LineBatcher:
+    """Splits a byte stream into log lines and parses them into batches.
+
+    Chunks may end anywhere; the incomplete last line is kept until the
+    next chunk completes it. A line that grows beyond max_line_bytes is
+    dropped and counted as rejected, so memory stays bounded by one chunk,
+    one line and one batch. Lines that parse_log_line cannot decode as JSON
+    are counted as rejected as well.
+    """
+
+    def __init__(
+        self,
+        parse: Callable[[bytes], Any],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_line_bytes: int = MAX_LINE_BYTES
+    ):
+        self.parse = parse
+        self.batch_size = batch_size
+        self.max_line_bytes = max_line_bytes
+        self.lines = 0
+        self.rejected = 0
+        self._batch: List[Any] = []
+        self._partial = bytearray()
+        self._skipped = 0  # bytes of an overlong line dropped so far
+
+    @property
+    def pending(self) -> int:
+        """Bytes received that belong to a line not yet complete"""
+        return len(self._partial) + self._skipped
+
+    def feed(self, chunk: bytes) -> Iterator[List[Any]]:
+        """Consume a chunk, yielding each batch as it fills up"""
+        lines = chunk.split(b"\n")
+        tail = lines.pop()
+        for line in lines:
+            if self._skipped:
+                self._skipped = 0
+                self.rejected += 1
+                continue
+            if len(self._partial) + len(line) > self.max_line_bytes:
+                self._partial.clear()
+                self.rejected += 1
+                logger.warning(f"Skipping log line longer than {self.max_line_bytes} bytes")
+                continue
+            if self._partial:
+                self._partial += line
+                line = bytes(self._partial)
+                self._partial.clear()
+            self._add(line)
+            if len(self._batch) >= self.batch_size:
+                yield self.take()
+
+        if self._skipped:
+            self._skipped += len(tail)
+        elif len(self._partial) + len(tail) > self.max_line_bytes:
+            self._skipped = len(self._partial) + len(tail)
+            self._partial.clear()
+            logger.warning(f"Skipping log line longer than {self.max_line_bytes} bytes")
+        else:
+            self._partial += tail
+
+    def take(self) -> List[Any]:
+        """Return the entries parsed so far and start a new batch"""
+        batch, self._batch = self._batch, []
+        return batch
+
+    def finish(self) -> List[Any]:
+        """Parse a last line without a trailing newline and return what is left"""
+        if self._skipped:
+            self.rejected += 1
+        elif self._partial:
+            self._add(bytes(self._partial))
+        self._partial.clear()
+        self._skipped = 0
+        return self.take()
+
+    def reset(self):
+        """Forget a partial line, e.g. after the file was truncated"""
+        self._partial.clear()
+        self._skipped = 0
+
+    def _add(self, line: bytes):
+        line = line.strip()
+        if not line:
+            return
+        self.lines += 1
+        entry = self.parse(line)
+        if isinstance(entry, dict) and entry.get("parsed") is False and "raw_log" in entry:
+            self.rejected += 1
+        else:
+            self._batch.append(entry)
+
+
+async def gunzip_chunks(chunks: AsyncIterator[bytes], chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Decompress a gzip stream incrementally, never inflating more than chunk_size at once.
+
+    Concatenated gzip members are decompressed one after another, as gzip
+    does. Raises zlib.error if the stream ends inside a member.
+    """
+    decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+    started = False
+    async for chunk in chunks:
+        while chunk:
+            started = True
+            data = decompressor.decompress(chunk, chunk_size)
+            while data:
+                yield data
+                if decompressor.eof:
+                    break
+                data = decompressor.decompress(decompressor.unconsumed_tail, chunk_size)
+            chunk = b""
+            if decompressor.eof:
+                # The rest of the input starts the next member
+                chunk = decompressor.unused_data
+                decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+                started = False
+    data = decompressor.flush()
+    if data:
+        yield data
+    if started and not decompressor.eof:
+        raise zlib.error("Truncated gzip stream")
+
+
+async def ingest_stream(
+    collector,
+    chunks: AsyncIterator[bytes],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_line_bytes: int = MAX_LINE_BYTES
+) -> Tuple[int, int]:
+    """Ingest a stream of JSON lines through collector.collect_batch.
+
+    Returns the number of accepted and rejected entries.
+    """
+    batcher = LineBatcher(collector.parse_log_line, batch_size, max_line_bytes)
+    accepted = rejected = 0
+    async for chunk in chunks:
+        for batch in batcher.feed(chunk):
+            counts = await collector.collect_batch(batch)
+            accepted += counts[0]
+            rejected += counts[1]
+    counts = await collector.collect_batch(batcher.finish())
+    return accepted + counts[0], rejected + counts[1] + batcher.rejected
+
+
+FileId = Tuple[int, int]  # (st_dev, st_ino)
+
+
+class _TailedFile:
+    def __init__(self, path: str, file, device: int, inode: int, batcher: LineBatcher):
+        self.path = path
+        self.file = file
+        self.device = device
+        self.inode = inode
+        self.batcher = batcher
+
+    @property
+    def offset(self) -> int:
+        """Offset just past the last complete line read"""
+        return self.file.tell() - self.batcher.pending
+
+    @property
+    def key(self) -> str:
+        """Checkpoint key: the file's identity, which survives renames"""
+        return f"{self.device}:{self.inode}"
+
+
+class FileTailer:
+    """Follows JSON-lines log files and feeds them to the log collector.
+
+    Paths may be glob patterns, re-expanded on every poll so new files are
+    picked up. Files are tracked by device and inode rather than by path,
+    so a rotated file that still matches a pattern (app.log renamed to
+    app.log.1 under app.log*) is recognised and not read a second time.
+    Each file is read chunk by chunk from the offset recorded in the
+    checkpoint file, and the offset of the last complete line handed to
+    the collector is checkpointed after every poll. A file that no longer
+    matches any pattern is read to its end and dropped, and files that
+    appear after the first poll, such as the new file after a rotation,
+    are read from the start. A file that shrinks below the recorded offset
+    (copytruncate) is read again from the start.
+    """
+
+    def __init__(
+        self,
+        collector,
+        paths: List[str],
+        checkpoint_path: str,
+        poll_interval: float = 1.0,
+        chunk_size: int = CHUNK_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_line_bytes: int = MAX_LINE_BYTES,
+        start_at_end: bool = False
+    ):
+        self.collector = collector
+        self.paths = paths
+        self.checkpoint_path = checkpoint_path
+        self.poll_interval = poll_interval
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.max_line_bytes = max_line_bytes
+        self.start_at_end = start_at_end
+
+        self.accepted = 0
+        self.rejected = 0
+
+        self.files: Dict[FileId, _TailedFile] = {}
+        self._checkpoints: Dict[str, Dict[str, Any]] = self._load_checkpoints()
+        self._saved: Dict[str, Dict[str, Any]] = dict(self._checkpoints)
+        self._polled = False
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def _load_checkpoints(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.checkpoint_path, "rb") as f:
+                checkpoints = orjson.loads(f.read())
+            # Files were keyed by path in earlier versions; key them by identity
+            return {
+                f"{checkpoint['device']}:{checkpoint['inode']}": {"path": path, **checkpoint}
+                for path, checkpoint in checkpoints.items()
+            }
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.error(f"Ignoring unreadable tail checkpoint file {self.checkpoint_path}: {str(e)}")
+            return {}
+
+    def _save_checkpoints(self):
+        if self._checkpoints == self._saved:
+            return
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(orjson.dumps(self._checkpoints))
+            os.replace(tmp_path, self.checkpoint_path)
+            self._saved = dict(self._checkpoints)
+        except OSError as e:
+            logger.error(f"Error writing tail checkpoint file {self.checkpoint_path}: {str(e)}")
+
+    def start(self):
+        """Start the tailing task on the running event loop"""
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop after the current chunk, checkpoint and close the files"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        self._stopping = False
+        for tailed in self.files.values():
+            tailed.file.close()
+        self.files.clear()
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await self.poll()
+            except Exception as e:
+                logger.error(f"Error tailing log files: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+        self._save_checkpoints()
+
+    def _expand(self) -> Dict[FileId, str]:
+        """The files matching the patterns by identity, least recently modified first"""
+        found = []
+        for pattern in self.paths:
+            for path in glob.glob(pattern):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if S_ISREG(stat.st_mode):
+                    found.append((stat.st_mtime, path, (stat.st_dev, stat.st_ino)))
+        files: Dict[FileId, str] = {}
+        for _, path, file_id in sorted(found):
+            # A file matched under several names is read once
+            files.setdefault(file_id, path)
+        return files
+
+    async def poll(self):
+        """Read everything appended since the last poll, following rotations"""
+        found = self._expand()
+        # Oldest first, so a rotated file is finished before its successor is read
+        for file_id, path in found.items():
+            tailed = self.files.get(file_id)
+            if tailed is None:
+                self._open(path, file_id)
+            elif tailed.path != path:
+                logger.info(f"{tailed.path} was renamed to {path}")
+                tailed.path = path
+
+        for file_id, tailed in list(self.files.items()):
+            await self._read(tailed)
+            if self._stopping:
+                break
+            if file_id not in found:
+                # Rotated out of the patterns or removed; it has been read to its end
+                await self._submit(tailed.batcher.finish())
+                self._count_rejected(tailed)
+                tailed.file.close()
+                del self.files[file_id]
+                self._checkpoints.pop(tailed.key, None)
+            elif os.fstat(tailed.file.fileno()).st_size < tailed.offset:
+                logger.info(f"{tailed.path} was truncated, reading it from the start")
+                tailed.file.seek(0)
+                tailed.batcher.reset()
+                await self._read(tailed)
+
+        if not self._stopping:
+            # Forget files that are gone, so a reused inode does not inherit an offset
+            open_keys = {tailed.key for tailed in self.files.values()}
+            self._checkpoints = {key: value for key, value in self._checkpoints.items() if key in open_keys}
+        self._polled = True
+        self._save_checkpoints()
+
+    def _open(self, path: str, file_id: FileId) -> bool:
+        try:
+            file = open(path, "rb")
+        except OSError as e:
+            logger.error(f"Cannot open {path} for tailing: {str(e)}")
+            return False
+        stat = os.fstat(file.fileno())
+        if (stat.st_dev, stat.st_ino) != file_id:
+            file.close()  # Replaced since it was listed; picked up on the next poll
+            return False
+        offset = 0
+        checkpoint = self._checkpoints.get(f"{stat.st_dev}:{stat.st_ino}")
+        if checkpoint:
+            offset = checkpoint["offset"] if checkpoint["offset"] <= stat.st_size else 0
+        elif self.start_at_end and not self._polled:
+            offset = stat.st_size
+        file.seek(offset)
+        batcher = LineBatcher(self.collector.parse_log_line, self.batch_size, self.max_line_bytes)
+        self.files[file_id] = _TailedFile(path, file, stat.st_dev, stat.st_ino, batcher)
+        logger.info(f"Tailing {path} from offset {offset}")
+        return True
+
+    async def _read(self, tailed: _TailedFile):
+        while not self._stopping:
+            chunk = await asyncio.to_thread(tailed.file.read, self.chunk_size)
+            if not chunk:
+                break
+            for batch in tailed.batcher.feed(chunk):
+                await self._submit(batch)
+            await self._submit(tailed.batcher.take())
+            self._count_rejected(tailed)
+            self._checkpoints[tailed.key] = {
+                "path": tailed.path,
+                "device": tailed.device,
+                "inode": tailed.inode,
+                "offset": tailed.offset
+            }
+
+    def _count_rejected(self, tailed: _TailedFile):
+        self.rejected += tailed.batcher.rejected
+        tailed.batcher.rejected = 0
+
+    async def _submit(self, batch: List[Any]):
+        if not batch:
+            return
+        accepted, rejected = await self.collector.collect_batch(batch)
+        self.accepted += accepted
+        self.rejected += rejected
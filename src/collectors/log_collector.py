@@ -1,132 +1,390 @@
 import logging
+import math
 from datetime import datetime
-from typing import Dict, Any, List
-import aiohttp
-import asyncio
+from typing import Dict, Any, List, Optional, Tuple, Callable, AsyncIterator, Union
+import numpy as np
+import pandas as pd
+import time
 from elasticsearch import AsyncElasticsearch
-import json
+from elasticsearch.serializer import OrjsonSerializer
+import orjson
+from .bulk_flusher import BulkFlusher
+from .ingest_ipc import IngestForwarder, encode_batch
+from .segment_store import SegmentStore, batch_to_records
+from .es_queries import (
+    INDEX_TEMPLATE, index_name, index_names, range_query, search_pages, minute_rollup_aggregation, rollup_frame
+)
+from .log_store import LogStore, LogColumns, to_epoch_ns, from_epoch_ns, parse_timestamps, MAX_CLOCK_SKEW_NS
+from ..telemetry import INGEST_BATCH_SECONDS, INGEST_LAG_SECONDS, FLUSH_SECONDS, FLUSHED_ENTRIES, span
 
 logger = logging.getLogger(__name__)
 
 class LogCollector:
-    def __init__(self, es_host: str = "localhost:9200"):
-        self.es_client = AsyncElasticsearch([es_host]) if es_host else None
-        self.log_buffer = []
+    def __init__(
+        self,
+        es_host: str = "localhost:9200",
+        store_capacity: int = 1_000_000,
+        max_buffered: int = 100_000,
+        backpressure_policy: str = "drop",
+        forward_to: Optional[str] = None,
+        data_dir: Optional[str] = None,
+        retention_days: float = 7,
+        replay_hours: float = 24
+    ):
+        self.es_client = AsyncElasticsearch(
+            [es_host], serializer=OrjsonSerializer()
+        ) if es_host and not forward_to else None
+        # In an ingest worker, batches go to the aggregator process instead of storage
+        self.forwarder = IngestForwarder(
+            forward_to, max_buffered=max_buffered, policy=backpressure_policy
+        ) if forward_to else None
         self.buffer_size = 1000
         self.buffer_timeout = 60  # seconds
-        self.in_memory_logs = []  # For demo without Elasticsearch
-
-    async def collect_logs(self, log_data: Dict[str, Any]):
-        """Collect and buffer logs before sending to storage"""
-        log_entry = {
-            "timestamp": datetime.utcnow().isoformat(),
-            "data": log_data,
-            "environment": log_data.get("environment", "unknown"),
-            "service": log_data.get("service", "unknown"),
-            "api_endpoint": log_data.get("endpoint", "unknown"),
-            "response_time": log_data.get("response_time", 0),
-            "status_code": log_data.get("status_code", 0),
-            "error": log_data.get("error", None)
-        }
-        
-        if self.es_client:
-            self.log_buffer.append(log_entry)
-            if len(self.log_buffer) >= self.buffer_size:
-                await self.flush_buffer()
-        else:
-            # Store in memory for demo
-            self.in_memory_logs.append(log_entry)
-            if len(self.in_memory_logs) > self.buffer_size:
-                self.in_memory_logs = self.in_memory_logs[-self.buffer_size:]
-        
-        return log_entry
+        self.flusher = BulkFlusher(
+            self._bulk_index,
+            max_batch=self.buffer_size,
+            max_age=self.buffer_timeout,
+            max_buffered=max_buffered,
+            policy=backpressure_policy
+        )
+        self._template_installed = False
+        # For demo without Elasticsearch; an ingest worker keeps no logs of its own
+        self.store = LogStore(store_capacity) if not self.forwarder else None
+        # Without Elasticsearch, logs can also be persisted to local segment files
+        self.segments = SegmentStore(
+            data_dir, retention_days=retention_days
+        ) if data_dir and not self.es_client and not self.forwarder else None
+        self.replay_hours = replay_hours
+        # Event times older than this are rejected at ingest
+        self.retention_ns = int(retention_days * 86400e9)
+        self.listeners: List[Callable[..., None]] = []
+        self.ingested = 0  # entries accepted
+        self.rejected = 0
 
-    async def flush_buffer(self):
-        """Flush the log buffer to Elasticsearch"""
-        if not self.log_buffer:
+    def add_listener(self, listener: Callable[..., None]):
+        """Register a callback fed every ingested batch.
+
+        Called as listener(timestamps, response_times, status_codes,
+        endpoints, services) with NumPy arrays for the numeric columns.
+        Listeners are not called when forwarding to an aggregator; the
+        aggregator's collector feeds its own listeners.
+        """
+        self.listeners.append(listener)
+
+    def _notify(self, timestamps, response_times, status_codes, endpoints, services):
+        for listener in self.listeners:
+            try:
+                listener(timestamps, response_times, status_codes, endpoints, services)
+            except Exception as e:
+                logger.error(f"Error in log listener: {str(e)}")
+
+    def start(self):
+        """Start background tasks, must be called from the running event loop"""
+        if self.forwarder:
+            self.forwarder.start()
+        elif self.es_client:
+            self.flusher.start()
+        elif self.segments is not None:
+            self._replay()
+            self.segments.start()
+
+    def _replay(self):
+        """Reload recent persisted logs into memory and the listeners after a restart"""
+        if len(self.store) or not len(self.segments):
+            return
+        now_ns = to_epoch_ns(datetime.utcnow())
+        batch = self.segments.read_latest(now_ns - int(self.replay_hours * 3600e9), self.store.capacity)
+        if len(batch[0]) == 0:
             return
+        self.store.append_batch(*batch)
+        if self.listeners:
+            self._notify(*batch[:5])
+        logger.info(f"Replayed {len(batch[0])} persisted log entries")
 
-        try:
-            # Bulk index the logs
-            actions = []
-            for log in self.log_buffer:
-                actions.append({
-                    "index": {
-                        "_index": f"api-logs-{datetime.utcnow().strftime('%Y-%m-%d')}",
-                    }
-                })
-                actions.append(log)
-
-            await self.es_client.bulk(operations=actions)
-            logger.info(f"Successfully flushed {len(self.log_buffer)} logs to Elasticsearch")
-            self.log_buffer.clear()
+    async def collect_logs(self, log_data: Dict[str, Any]) -> bool:
+        """Validate and store a single log entry, returning whether it was accepted"""
+        accepted, _ = await self.collect_batch([log_data])
+        return accepted == 1
 
-        except Exception as e:
-            logger.error(f"Error flushing logs to Elasticsearch: {str(e)}")
+    async def collect_batch(self, logs: List[Any]) -> Tuple[int, int]:
+        """Validate, normalise and store a batch of logs in one pass.
+
+        Returns the number of accepted and rejected entries. Entries that are
+        not objects, carry non-numeric response_time/status_code values, a
+        negative or non-finite response time or a status code outside 0-999,
+        or whose timestamp lies before the retention window or more than
+        MAX_CLOCK_SKEW_NS in the future are rejected.
+        """
+        now_ns = to_epoch_ns(datetime.utcnow())
+        timestamps, response_times, status_codes = [], [], []
+        endpoints, services, environments, errors = [], [], [], []
+        rejected = 0
+
+        for log_data in logs:
+            if not isinstance(log_data, dict):
+                rejected += 1
+                continue
+            try:
+                response_time = float(log_data.get("response_time") or 0)
+                status_code = int(log_data.get("status_code") or 0)
+            except (TypeError, ValueError):
+                rejected += 1
+                continue
+            if not 0 <= status_code <= 999 or not math.isfinite(response_time) or response_time < 0:
+                rejected += 1
+                continue
+            timestamp = log_data.get("timestamp")
+            timestamps.append(timestamp if isinstance(timestamp, str) else None)
+            response_times.append(response_time)
+            status_codes.append(status_code)
+            endpoints.append(str(log_data.get("endpoint", "unknown")))
+            services.append(str(log_data.get("service", "unknown")))
+            environments.append(str(log_data.get("environment", "unknown")))
+            errors.append(log_data.get("error", None))
+
+        timestamps = parse_timestamps(timestamps, now_ns)
+        in_range = (timestamps >= now_ns - self.retention_ns) & (timestamps <= now_ns + MAX_CLOCK_SKEW_NS)
+        if not in_range.all():
+            rejected += int(len(timestamps) - np.count_nonzero(in_range))
+            keep = np.flatnonzero(in_range).tolist()
+            timestamps = timestamps[in_range]
+            response_times, status_codes, endpoints, services, environments, errors = (
+                [column[i] for i in keep]
+                for column in (response_times, status_codes, endpoints, services, environments, errors)
+            )
+        self.rejected += rejected
+        await self.ingest_columns(
+            timestamps, response_times, status_codes, endpoints, services, environments, errors
+        )
+        return len(timestamps), rejected
+
+    async def ingest_columns(
+        self,
+        timestamps: np.ndarray,
+        response_times,
+        status_codes,
+        endpoints: List[str],
+        services: List[str],
+        environments: List[str],
+        errors: List[Any]
+    ):
+        """Store validated column data and notify listeners.
+
+        Shared by collect_batch and the aggregator's ingest server, which
+        receives the columns already normalised by an ingest worker.
+        """
+        if len(timestamps) == 0:
+            return
+        with span("ingest_columns"), INGEST_BATCH_SECONDS.time():
+            await self._store_columns(
+                timestamps, response_times, status_codes, endpoints, services, environments, errors
+            )
+        self.ingested += len(timestamps)
+        INGEST_LAG_SECONDS.observe(max(time.time_ns() - int(np.max(timestamps)), 0) / 1e9)
+
+    async def _store_columns(
+        self,
+        timestamps: np.ndarray,
+        response_times,
+        status_codes,
+        endpoints: List[str],
+        services: List[str],
+        environments: List[str],
+        errors: List[Any]
+    ):
+        if self.forwarder:
+            await self.forwarder.put(
+                encode_batch(timestamps, response_times, status_codes, endpoints, services, environments, errors),
+                len(timestamps)
+            )
+            return
+
+        if self.es_client:
+            await self.flusher.put([
+                {
+                    "timestamp": from_epoch_ns(timestamp_ns).isoformat(),
+                    "environment": environment,
+                    "service": service,
+                    "api_endpoint": endpoint,
+                    "response_time": response_time,
+                    "status_code": status_code,
+                    "error": error
+                }
+                for timestamp_ns, response_time, status_code, endpoint, service, environment, error in zip(
+                    timestamps.tolist(), np.asarray(response_times).tolist(), np.asarray(status_codes).tolist(),
+                    endpoints, services, environments, errors
+                )
+            ])
+        else:
+            self.store.append_batch(
+                timestamps, response_times, status_codes, endpoints, services, environments, errors
+            )
+            if self.segments is not None:
+                self.segments.append_batch(
+                    timestamps, response_times, status_codes, endpoints, services, environments, errors
+                )
 
-    async def monitor_api(self, api_endpoint: str, interval: int = 60):
-        """Monitor a specific API endpoint"""
-        async with aiohttp.ClientSession() as session:
-            while True:
-                try:
-                    start_time = datetime.utcnow()
-                    async with session.get(api_endpoint) as response:
-                        end_time = datetime.utcnow()
-                        response_time = (end_time - start_time).total_seconds() * 1000
+        if self.listeners:
+            self._notify(
+                timestamps,
+                np.asarray(response_times, dtype=np.float64),
+                np.asarray(status_codes, dtype=np.int16),
+                endpoints,
+                services
+            )
 
-                        log_data = {
-                            "endpoint": api_endpoint,
-                            "response_time": response_time,
-                            "status_code": response.status,
-                            "timestamp": end_time.isoformat(),
-                            "error": None if response.status < 400 else await response.text()
-                        }
+    async def flush_buffer(self):
+        """Flush the log buffer to Elasticsearch now"""
+        await self.flusher.flush()
 
-                        await self.collect_logs(log_data)
+    async def _bulk_index(self, logs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Bulk index logs into daily indices, returning the entries worth retrying"""
+        if not self._template_installed:
+            await self._install_index_template()
+        # Encode the NDJSON body up front; the client passes bytes lines through unchanged
+        actions = []
+        for log in logs:
+            actions.append(orjson.dumps({"index": {"_index": index_name(log["timestamp"])}}))
+            actions.append(orjson.dumps(log, default=str))
 
-                except Exception as e:
-                    logger.error(f"Error monitoring API {api_endpoint}: {str(e)}")
+        with span("bulk_index"), FLUSH_SECONDS.labels("elasticsearch").time():
+            result = await self.es_client.bulk(operations=actions)
+        if not result.get("errors"):
+            FLUSHED_ENTRIES.labels("elasticsearch").inc(len(logs))
+            logger.info(f"Successfully flushed {len(logs)} logs to Elasticsearch")
+            return []
 
-                await asyncio.sleep(interval)
+        retry = []
+        for log, item in zip(logs, result["items"]):
+            status = item["index"].get("status", 500)
+            if status == 429 or status >= 500:
+                retry.append(log)
+            elif status >= 400:
+                logger.error(f"Elasticsearch rejected log entry: {item['index'].get('error')}")
+            else:
+                FLUSHED_ENTRIES.labels("elasticsearch").inc()
+        return retry
+
+    async def _install_index_template(self):
+        """Map the daily indices' fields as keywords and numbers, so term filters and aggregations work"""
+        try:
+            await self.es_client.indices.put_index_template(name="api-logs", **INDEX_TEMPLATE)
+            self._template_installed = True
+        except Exception as e:
+            logger.error(f"Error installing Elasticsearch index template: {str(e)}")
 
     async def cleanup(self):
         """Cleanup resources"""
-        await self.flush_buffer()
-        await self.es_client.close()
+        if self.forwarder:
+            await self.forwarder.stop()
+        if self.segments is not None:
+            await self.segments.stop()
+        if self.es_client:
+            await self.flusher.stop()
+            await self.es_client.close()
 
-    async def get_logs_in_range(self, start_time: datetime, end_time: datetime) -> List[Dict[str, Any]]:
-        """Get logs within a specific time range"""
+    async def get_logs_in_range(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        endpoint: Optional[str] = None,
+        service: Optional[str] = None,
+        status_code: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Get logs within a specific time range, optionally filtered"""
         if self.es_client:
-            # Implementation for Elasticsearch
-            query = {
-                "query": {
-                    "range": {
-                        "timestamp": {
-                            "gte": start_time.isoformat(),
-                            "lte": end_time.isoformat()
-                        }
-                    }
-                }
-            }
+            logs = []
             try:
-                result = await self.es_client.search(body=query)
-                return [hit["_source"] for hit in result["hits"]["hits"]]
+                async for page in self.iter_logs_in_range(start_time, end_time, endpoint, service, status_code):
+                    logs.extend(page)
+                return logs
             except Exception as e:
                 logger.error(f"Error querying Elasticsearch: {str(e)}")
                 return []
-        else:
-            # Return from in-memory storage
-            return [
-                log for log in self.in_memory_logs
-                if start_time.isoformat() <= log["timestamp"] <= end_time.isoformat()
-            ]
+        start_ns = to_epoch_ns(start_time)
+        oldest = self.store.oldest_timestamp()
+        if self.segments is not None and (oldest is None or start_ns < oldest):
+            # Older than the in-memory window, read the persisted segments
+            return batch_to_records(
+                self.segments.read(start_ns, to_epoch_ns(end_time), endpoint, service, status_code)
+            )
+        # Return from in-memory storage
+        return self.store.to_records(
+            self.get_columns_in_range(start_time, end_time, endpoint, service, status_code)
+        )
+
+    async def iter_logs_in_range(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        endpoint: Optional[str] = None,
+        service: Optional[str] = None,
+        status_code: Optional[int] = None,
+        page_size: int = 5000
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield logs within a time range in pages, oldest first.
+
+        With Elasticsearch only the daily indices overlapping the range are
+        searched, and results are paged through a point-in-time, so memory
+        stays bounded by page_size however large the range.
+        """
+        if not self.es_client:
+            yield await self.get_logs_in_range(start_time, end_time, endpoint, service, status_code)
+            return
+        index = index_names(start_time, end_time)
+        if not index:
+            return
+        query = range_query(start_time, end_time, endpoint, service, status_code)
+        async for page in search_pages(self.es_client, index, query, page_size):
+            yield page
+
+    async def get_minute_rollups(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        endpoint: Optional[str] = None,
+        service: Optional[str] = None
+    ) -> pd.DataFrame:
+        """Per-minute feature rows computed by Elasticsearch.
+
+        Runs a date_histogram aggregation instead of fetching raw logs; the
+        result has the detector's feature columns and can be passed
+        straight to AnomalyDetector.train. Without Elasticsearch the same
+        rows are kept by the detector's aggregator, so this returns an
+        empty frame.
+        """
+        index = index_names(start_time, end_time) if self.es_client else ""
+        if not index:
+            return rollup_frame([])
+        result = await self.es_client.search(
+            index=index,
+            query=range_query(start_time, end_time, endpoint, service),
+            aggs=minute_rollup_aggregation(),
+            size=0,
+            ignore_unavailable=True
+        )
+        return rollup_frame(result["aggregations"]["minutes"]["buckets"])
+
+    def get_columns_in_range(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        endpoint: Optional[str] = None,
+        service: Optional[str] = None,
+        status_code: Optional[int] = None
+    ) -> LogColumns:
+        """Get in-memory logs within a time range as column arrays"""
+        return self.store.columns(
+            to_epoch_ns(start_time), to_epoch_ns(end_time),
+            endpoint=endpoint, service=service, status_code=status_code
+        )
 
     @staticmethod
-    def parse_log_line(log_line: str) -> Dict[str, Any]:
+    def parse_log_line(log_line: Union[str, bytes]) -> Dict[str, Any]:
         """Parse a log line into structured data"""
         try:
-            return json.loads(log_line)
-        except json.JSONDecodeError:
+            return orjson.loads(log_line)
+        except orjson.JSONDecodeError:
             # Fallback parsing for non-JSON logs
             return {
                 "raw_log": log_line,
@@ -0,0 +1,380 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, NamedTuple, Optional
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# How far ahead of the server clock a client's event time may be
+MAX_CLOCK_SKEW_NS = 5 * 60 * 1_000_000_000
+
+
+def to_epoch_ns(value: datetime) -> int:
+    """Convert a datetime (naive values are treated as UTC) to epoch nanoseconds"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - EPOCH) // timedelta(microseconds=1) * 1000
+
+
+def from_epoch_ns(value: int) -> datetime:
+    """Convert epoch nanoseconds to a naive UTC datetime"""
+    return datetime(1970, 1, 1) + timedelta(microseconds=int(value) // 1000)
+
+
+def clock_horizon(width_ns: int) -> int:
+    """Newest bucket of width_ns that may hold data: now plus MAX_CLOCK_SKEW_NS"""
+    return (to_epoch_ns(datetime.utcnow()) + MAX_CLOCK_SKEW_NS) // width_ns
+
+
+def parse_timestamp(value: Any) -> Optional[int]:
+    """Parse an ISO-8601 string or datetime into epoch nanoseconds, None if invalid"""
+    if isinstance(value, datetime):
+        return to_epoch_ns(value)
+    if isinstance(value, str):
+        try:
+            return to_epoch_ns(datetime.fromisoformat(value.replace("Z", "+00:00")))
+        except ValueError:
+            return None
+    return None
+
+
+def parse_timestamps(values: List[Optional[str]], default_ns: int) -> np.ndarray:
+    """Vectorised parse_timestamp: missing or invalid entries get default_ns"""
+    parsed = pd.to_datetime(values, utc=True, format="ISO8601", errors="coerce")
+    result = np.asarray(parsed.as_unit("ns").asi8, dtype=np.int64).copy()
+    result[np.asarray(parsed.isna())] = default_ns
+    return result
+
+
+class StringInterner:
+    """Maps repeated strings (endpoints, services) to small integer IDs"""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._values: List[str] = []
+
+    def intern(self, value: str) -> int:
+        """Return the ID for a value, assigning a new one if needed"""
+        idx = self._ids.get(value)
+        if idx is None:
+            idx = len(self._values)
+            self._ids[value] = idx
+            self._values.append(value)
+        return idx
+
+    def get_id(self, value: str) -> Optional[int]:
+        """Return the ID for a value without interning it"""
+        return self._ids.get(value)
+
+    def lookup(self, idx: int) -> str:
+        """Return the string for an ID"""
+        return self._values[idx]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+class LogColumns(NamedTuple):
+    """Column arrays for a contiguous run of log entries"""
+    timestamp: np.ndarray       # int64 epoch-ns
+    response_time: np.ndarray   # float64 ms
+    status_code: np.ndarray     # int16
+    endpoint_id: np.ndarray     # int32, see LogStore.endpoints
+    service_id: np.ndarray      # int32, see LogStore.services
+    environment_id: np.ndarray  # int32, see LogStore.environments
+    error: np.ndarray           # object, None for successful requests
+
+    def __len__(self) -> int:
+        # Number of entries rather than number of columns
+        return len(self.timestamp)
+
+
+class LogStore:
+    """Preallocated columnar ring buffer holding the most recent logs.
+
+    Entries are kept sorted by timestamp so that the timestamp column doubles
+    as a time index: range lookups are two binary searches. In-order appends
+    are O(1) and never copy existing entries; once the buffer is full the
+    oldest entry is overwritten. Entries that arrive out of order are parked
+    in a small merge buffer and merged into the sorted tail in one pass.
+    Reads return NumPy views into the underlying arrays where possible, so
+    callers must not modify them.
+    """
+
+    def __init__(self, capacity: int = 1_000_000, merge_buffer_size: int = 1024):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.merge_buffer_size = merge_buffer_size
+        self.timestamps = np.empty(capacity, dtype=np.int64)
+        self.response_times = np.empty(capacity, dtype=np.float64)
+        self.status_codes = np.empty(capacity, dtype=np.int16)
+        self.endpoint_ids = np.empty(capacity, dtype=np.int32)
+        self.service_ids = np.empty(capacity, dtype=np.int32)
+        self.environment_ids = np.empty(capacity, dtype=np.int32)
+        self.errors = np.empty(capacity, dtype=object)
+        self.endpoints = StringInterner()
+        self.services = StringInterner()
+        self.environments = StringInterner()
+        self._head = 0  # next slot to write
+        self._size = 0
+        self._last_ts = None  # newest timestamp in the ring
+        self._late: List[tuple] = []  # out-of-order entries awaiting merge
+
+    def __len__(self) -> int:
+        return self._size + len(self._late)
+
+    def oldest_timestamp(self) -> Optional[int]:
+        """Timestamp of the oldest retained entry, None when empty"""
+        self._merge_late()
+        if self._size == 0:
+            return None
+        return int(self.timestamps[(self._head - self._size) % self.capacity])
+
+    def append(
+        self,
+        timestamp_ns: int,
+        response_time: float,
+        status_code: int,
+        endpoint: str,
+        service: str,
+        environment: str,
+        error: Optional[str] = None
+    ):
+        """Append a single entry, overwriting the oldest one when full"""
+        endpoint_id = self.endpoints.intern(endpoint)
+        service_id = self.services.intern(service)
+        environment_id = self.environments.intern(environment)
+
+        if self._last_ts is not None and timestamp_ns < self._last_ts:
+            if self._size == self.capacity and timestamp_ns < self.timestamps[self._head]:
+                return  # Older than anything retained, it would be evicted on merge
+            self._late.append(
+                (timestamp_ns, response_time, status_code, endpoint_id, service_id, environment_id, error)
+            )
+            if len(self._late) >= self.merge_buffer_size:
+                self._merge_late()
+            return
+
+        slot = self._head
+        self.timestamps[slot] = timestamp_ns
+        self.response_times[slot] = response_time
+        self.status_codes[slot] = status_code
+        self.endpoint_ids[slot] = endpoint_id
+        self.service_ids[slot] = service_id
+        self.environment_ids[slot] = environment_id
+        self.errors[slot] = error
+
+        self._head = (slot + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+        self._last_ts = timestamp_ns
+
+    def append_batch(
+        self,
+        timestamps: np.ndarray,
+        response_times: np.ndarray,
+        status_codes: np.ndarray,
+        endpoints: List[str],
+        services: List[str],
+        environments: List[str],
+        errors: List[Optional[str]]
+    ):
+        """Append a block of entries with vectorised copies into the ring"""
+        n = len(timestamps)
+        if n == 0:
+            return
+        block = LogColumns(
+            np.asarray(timestamps, dtype=np.int64),
+            np.asarray(response_times, dtype=np.float64),
+            np.asarray(status_codes, dtype=np.int16),
+            self._intern_all(self.endpoints, endpoints),
+            self._intern_all(self.services, services),
+            self._intern_all(self.environments, environments),
+            np.fromiter(errors, dtype=object, count=n)
+        )
+
+        ts = block.timestamp
+        if n > 1 and np.any(ts[1:] < ts[:-1]):
+            order = np.argsort(ts, kind="stable")
+            block = LogColumns(*(column[order] for column in block))
+
+        if self._last_ts is None or block.timestamp[0] >= self._last_ts:
+            self._write_block(block)
+            return
+
+        if self._size == self.capacity:
+            # Drop entries older than anything retained, they would be evicted anyway
+            keep = block.timestamp >= self.timestamps[self._head]
+            block = LogColumns(*(column[keep] for column in block))
+            if len(block) == 0:
+                return
+        self._merge_block(block)
+
+    @staticmethod
+    def _intern_all(interner: StringInterner, values: List[str]) -> np.ndarray:
+        intern = interner.intern
+        return np.fromiter((intern(value) for value in values), dtype=np.int32, count=len(values))
+
+    def _write_block(self, block: LogColumns):
+        """Write sorted columns (all newer than the ring) at the head"""
+        n = len(block)
+        if n == 0:
+            return
+        if n >= self.capacity:
+            block = LogColumns(*(column[-self.capacity:] for column in block))
+            self._head, self._size, n = 0, 0, self.capacity
+
+        first = min(n, self.capacity - self._head)
+        targets = (
+            self.timestamps, self.response_times, self.status_codes, self.endpoint_ids,
+            self.service_ids, self.environment_ids, self.errors
+        )
+        for target, column in zip(targets, block):
+            target[self._head:self._head + first] = column[:first]
+            if first < n:
+                target[:n - first] = column[first:]
+
+        self._head = (self._head + n) % self.capacity
+        self._size = min(self._size + n, self.capacity)
+        self._last_ts = int(block.timestamp[-1])
+
+    def _search(self, timestamp_ns: int, side: str) -> int:
+        """Binary search the sorted ring, returning a logical index"""
+        offset = 0
+        for segment in self._segments():
+            view = self.timestamps[segment]
+            idx = int(np.searchsorted(view, timestamp_ns, side=side))
+            if idx < len(view):
+                return offset + idx
+            offset += len(view)
+        return offset
+
+    def _take(self, start: int, stop: int) -> LogColumns:
+        """Logical slice [start, stop) of the ring, a view unless it wraps"""
+        parts = []
+        offset = 0
+        for segment in self._segments():
+            length = segment.stop - segment.start
+            lo, hi = max(start - offset, 0), min(stop - offset, length)
+            if lo < hi:
+                parts.append(self._view(slice(segment.start + lo, segment.start + hi)))
+            offset += length
+
+        if not parts:
+            return self._view(slice(0, 0))
+        if len(parts) == 1:
+            return parts[0]
+        return LogColumns(*(np.concatenate(columns) for columns in zip(*parts)))
+
+    def _merge_late(self):
+        """Merge out-of-order entries into the sorted tail of the ring"""
+        if not self._late:
+            return
+        timestamps, response_times, status_codes, endpoint_ids, service_ids, environment_ids, errors = zip(*self._late)
+        late = LogColumns(
+            np.array(timestamps, dtype=np.int64),
+            np.array(response_times, dtype=np.float64),
+            np.array(status_codes, dtype=np.int16),
+            np.array(endpoint_ids, dtype=np.int32),
+            np.array(service_ids, dtype=np.int32),
+            np.array(environment_ids, dtype=np.int32),
+            np.fromiter(errors, dtype=object, count=len(errors))
+        )
+        self._late = []
+        self._merge_block(late)
+
+    def _merge_block(self, block: LogColumns):
+        """Merge entries that may predate the newest ring entry into the ring"""
+        # Only the entries newer than the oldest incoming one need rewriting
+        pos = self._search(int(block.timestamp.min()), "right")
+        tail = self._take(pos, self._size)
+        merged = LogColumns(*(np.concatenate(columns) for columns in zip(tail, block)))
+        order = np.argsort(merged.timestamp, kind="stable")
+
+        self._head = (self._head - (self._size - pos)) % self.capacity
+        self._size = pos
+        self._write_block(LogColumns(*(column[order] for column in merged)))
+
+    def _segments(self) -> List[slice]:
+        """Physical slices of the ring, oldest first"""
+        start = (self._head - self._size) % self.capacity
+        if start + self._size <= self.capacity:
+            return [slice(start, start + self._size)]
+        return [slice(start, self.capacity), slice(0, self._head)]
+
+    def _view(self, segment: slice) -> LogColumns:
+        return LogColumns(
+            self.timestamps[segment],
+            self.response_times[segment],
+            self.status_codes[segment],
+            self.endpoint_ids[segment],
+            self.service_ids[segment],
+            self.environment_ids[segment],
+            self.errors[segment]
+        )
+
+    def columns(
+        self,
+        start_ns: Optional[int] = None,
+        end_ns: Optional[int] = None,
+        endpoint: Optional[str] = None,
+        service: Optional[str] = None,
+        status_code: Optional[int] = None
+    ) -> LogColumns:
+        """Return entries with start_ns <= timestamp <= end_ns, oldest first.
+
+        The time range is located by binary search, so the cost is
+        O(log n + k) for k matching entries. Without filters the result is a
+        zero-copy view unless the range spans the ring's wrap point.
+        """
+        self._merge_late()
+        start = 0 if start_ns is None else self._search(start_ns, "left")
+        stop = self._size if end_ns is None else self._search(end_ns, "right")
+        columns = self._take(start, max(start, stop))
+
+        if endpoint is None and service is None and status_code is None:
+            return columns
+
+        mask = np.ones(len(columns), dtype=bool)
+        for name, interner, values in (
+            (endpoint, self.endpoints, columns.endpoint_id),
+            (service, self.services, columns.service_id)
+        ):
+            if name is not None:
+                idx = interner.get_id(name)
+                if idx is None:
+                    return self._view(slice(0, 0))
+                mask &= values == idx
+        if status_code is not None:
+            mask &= columns.status_code == status_code
+        return LogColumns(*(column[mask] for column in columns))
+
+    def to_records(self, columns: LogColumns) -> List[Dict[str, Any]]:
+        """Materialise column arrays as log entry dicts"""
+        timestamps = np.datetime_as_string(columns.timestamp.view("datetime64[ns]"), unit="us")
+        endpoints = self.endpoints.lookup
+        services = self.services.lookup
+        environments = self.environments.lookup
+        return [
+            {
+                "timestamp": str(ts),
+                "environment": environments(env_id),
+                "service": services(service_id),
+                "api_endpoint": endpoints(endpoint_id),
+                "response_time": response_time,
+                "status_code": status_code,
+                "error": error
+            }
+            for ts, response_time, status_code, endpoint_id, service_id, env_id, error in zip(
+                timestamps,
+                columns.response_time.tolist(),
+                columns.status_code.tolist(),
+                columns.endpoint_id.tolist(),
+                columns.service_id.tolist(),
+                columns.environment_id.tolist(),
+                columns.error
+            )
+        ]
@@ -0,0 +1,265 @@
+import logging
+import asyncio
+import hashlib
+import heapq
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Dict, Any, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Status recorded for probes that got no HTTP response (timeouts, DNS or connection errors)
+PROBE_FAILURE_STATUS = 599
+
+
+@dataclass
+class Probe:
+    id: str
+    url: str
+    method: str = "GET"
+    interval: float = 60.0  # seconds
+    timeout: float = 10.0  # seconds
+    service: str = "synthetic"
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    runs: int = 0
+    failures: int = 0
+    last_run: Optional[datetime] = None
+    last_status: Optional[int] = None
+    last_timings: Dict[str, float] = field(default_factory=dict)
+    last_error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "url": self.url,
+            "method": self.method,
+            "interval": self.interval,
+            "timeout": self.timeout,
+            "service": self.service,
+            "created_at": self.created_at.isoformat(),
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+            "last_status": self.last_status,
+            "last_timings": self.last_timings,
+            "last_error": self.last_error
+        }
+
+
+class ProbeLimitError(Exception):
+    """Raised when adding a probe would exceed max_probes"""
+
+
+def validate_url(url: str):
+    """Raise ValueError unless url is an absolute http(s) URL with a host"""
+    try:
+        parts = urlsplit(url)
+        parts.port  # Raises on an out-of-range or non-numeric port
+    except ValueError as e:
+        raise ValueError(f"Invalid probe URL {url!r}: {e}")
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError(f"Probe URL must be http(s) with a host: {url!r}")
+
+
+def probe_id(method: str, url: str) -> str:
+    """Stable id, so adding the same probe twice finds the existing one"""
+    return hashlib.sha1(f"{method} {url}".encode()).hexdigest()[:12]
+
+
+def _trace_config() -> aiohttp.TraceConfig:
+    """Records perf_counter timestamps of request phases in the trace context"""
+    def mark(name):
+        async def callback(session, context, params):
+            context.trace_request_ctx.marks[name] = time.perf_counter()
+        return callback
+
+    trace_config = aiohttp.TraceConfig(trace_config_ctx_factory=SimpleNamespace)
+    trace_config.on_dns_resolvehost_start.append(mark("dns_start"))
+    trace_config.on_dns_resolvehost_end.append(mark("dns_end"))
+    trace_config.on_connection_create_start.append(mark("connect_start"))
+    trace_config.on_connection_create_end.append(mark("connect_end"))
+    return trace_config
+
+
+class ProbeScheduler:
+    """Runs synthetic HTTP probes from one task, sharing one connection pool.
+
+    Probes are kept in a heap ordered by their next run time on the
+    monotonic clock; the scheduler sleeps until the earliest is due. Each
+    run gets a random jitter of up to jitter * interval so probes added
+    together spread out. At most max_concurrency probes are in flight at
+    once, each bounded by its own timeout. Timings are taken with
+    perf_counter and split into DNS, connect and time-to-first-byte when
+    the request opened a new connection. Results are fed to the log
+    collector like any other API log.
+    """
+
+    def __init__(
+        self,
+        collector,
+        max_concurrency: int = 100,
+        default_interval: float = 60.0,
+        default_timeout: float = 10.0,
+        jitter: float = 0.1,
+        max_probes: int = 10_000
+    ):
+        self.collector = collector
+        self.max_concurrency = max_concurrency
+        self.default_interval = default_interval
+        self.default_timeout = default_timeout
+        self.jitter = jitter
+        self.max_probes = max_probes
+        self.probes: Dict[str, Probe] = {}
+        self._heap: List[Tuple[float, int, str]] = []  # (due, generation, probe id)
+        self._generations: Dict[str, int] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+
+    def start(self):
+        """Start the scheduling task on the running event loop"""
+        if self._task is not None:
+            return
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_concurrency, ttl_dns_cache=300),
+            trace_configs=[_trace_config()]
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop scheduling, cancel in-flight probes and close the session"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        for task in list(self._running):
+            task.cancel()
+        await asyncio.gather(self._task, *self._running, return_exceptions=True)
+        self._task = None
+        await self._session.close()
+        self._session = None
+
+    def add(
+        self,
+        url: str,
+        interval: Optional[float] = None,
+        timeout: Optional[float] = None,
+        method: str = "GET",
+        service: str = "synthetic"
+    ) -> Probe:
+        """Add a probe, or update the interval and timeout of an existing one.
+
+        Raises ValueError for a URL that is not http(s) with a host, and
+        ProbeLimitError when max_probes are already configured.
+        """
+        method = method.upper()
+        id = probe_id(method, url)
+        probe = self.probes.get(id)
+        if probe is None:
+            validate_url(url)
+            if len(self.probes) >= self.max_probes:
+                raise ProbeLimitError(f"Probe limit of {self.max_probes} reached")
+            probe = Probe(id, url, method, service=service)
+            self.probes[id] = probe
+        probe.interval = interval or self.default_interval
+        probe.timeout = timeout or self.default_timeout
+        # Run soon; the generation invalidates any previously scheduled run
+        self._schedule(probe, time.monotonic() + random.uniform(0, min(probe.interval, 1.0)))
+        return probe
+
+    def remove(self, id: str) -> bool:
+        """Remove a probe; its pending heap entry is skipped when it comes due"""
+        self._generations.pop(id, None)
+        return self.probes.pop(id, None) is not None
+
+    def list(self) -> List[Probe]:
+        return list(self.probes.values())
+
+    def _schedule(self, probe: Probe, due: float):
+        generation = self._generations.get(probe.id, 0) + 1
+        self._generations[probe.id] = generation
+        heapq.heappush(self._heap, (due, generation, probe.id))
+        if self._wakeup is not None and self._heap[0][2] == probe.id:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            while self._heap and self._heap[0][0] <= now:
+                due, generation, id = heapq.heappop(self._heap)
+                probe = self.probes.get(id)
+                if probe is None or self._generations.get(id) != generation:
+                    continue  # Removed or rescheduled
+                offset = random.uniform(-self.jitter, self.jitter) * probe.interval
+                self._schedule(probe, max(due + probe.interval + offset, now))
+                task = asyncio.get_running_loop().create_task(self._probe(probe))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+            self._wakeup.clear()
+            timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _probe(self, probe: Probe):
+        async with self._semaphore:
+            marks: Dict[str, float] = {}
+            status, error = PROBE_FAILURE_STATUS, None
+            start = time.perf_counter()
+            first_byte = None
+            try:
+                async with self._session.request(
+                    probe.method,
+                    probe.url,
+                    timeout=aiohttp.ClientTimeout(total=probe.timeout),
+                    trace_request_ctx=SimpleNamespace(marks=marks)
+                ) as response:
+                    first_byte = time.perf_counter()
+                    status = response.status
+                    body = await response.read()
+                    if status >= 400:
+                        error = body[:1000].decode(errors="replace")
+            except asyncio.TimeoutError:
+                error = f"Timed out after {probe.timeout}s"
+            except Exception as e:
+                # Client errors, but also anything a bad URL or response raises; still recorded as a failed run
+                error = str(e) or type(e).__name__
+            end = time.perf_counter()
+
+        timings = {"total_ms": (end - start) * 1000}
+        if "dns_start" in marks and "dns_end" in marks:
+            timings["dns_ms"] = (marks["dns_end"] - marks["dns_start"]) * 1000
+        if "connect_start" in marks and "connect_end" in marks:
+            timings["connect_ms"] = (marks["connect_end"] - marks["connect_start"]) * 1000
+        if first_byte is not None:
+            timings["ttfb_ms"] = (first_byte - marks.get("connect_end", start)) * 1000
+
+        probe.runs += 1
+        probe.failures += status >= 400
+        probe.last_run = datetime.utcnow()
+        probe.last_status = status
+        probe.last_timings = timings
+        probe.last_error = error
+
+        try:
+            await self.collector.collect_logs({
+                "endpoint": probe.url,
+                "service": probe.service,
+                "response_time": timings["total_ms"],
+                "status_code": status,
+                "timestamp": probe.last_run.isoformat(),
+                "error": error,
+                "timings": timings
+            })
+        except Exception as e:
+            logger.error(f"Error recording probe result for {probe.url}: {str(e)}")
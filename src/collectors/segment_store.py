@@ -0,0 +1,529 @@
+import logging
+import asyncio
+import json
+import mmap
+import os
+import struct
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from .log_store import to_epoch_ns
+from ..telemetry import FLUSH_SECONDS, FLUSHED_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+NS_PER_SECOND = 1_000_000_000
+
+# magic, version, flags, entries, min timestamp, max timestamp, metadata offset, metadata length
+_HEADER = struct.Struct("<4sHHqqqqq")
+MAGIC = b"APSG"
+VERSION = 1
+SUFFIX = ".seg"
+
+# Column name, dtype; widest first so every column stays aligned
+_COLUMNS = (
+    ("timestamps", "<i8"),
+    ("response_times", "<f8"),
+    ("endpoint_ids", "<i4"),
+    ("service_ids", "<i4"),
+    ("environment_ids", "<i4"),
+    ("status_codes", "<i2"),
+)
+
+# (timestamps, response_times, status_codes, endpoints, services, environments, errors),
+# the argument order of LogCollector.ingest_columns
+Batch = Tuple[np.ndarray, np.ndarray, np.ndarray, List[str], List[str], List[str], List[Any]]
+
+
+class Segment:
+    """A sorted run of log entries with dictionary-encoded strings.
+
+    Either an immutable file whose columns are read through a read-only
+    memory map, or a batch still buffered in memory; both are read the
+    same way. A file is mapped when its columns are first read, and
+    release() unmaps it again: each mapping holds a file descriptor.
+    Errors are stored sparsely as {row: error}.
+    """
+
+    def __init__(
+        self,
+        columns: Optional[Dict[str, np.ndarray]],
+        dictionaries: Dict[str, List[str]],
+        errors: Dict[int, Any],
+        path: Optional[str] = None,
+        header: Optional[Tuple[int, int, int]] = None
+    ):
+        self._columns = columns
+        self.dictionaries = dictionaries
+        self.errors = errors
+        self.path = path
+        if header is not None:
+            # (count, min timestamp, max timestamp) of an unmapped file
+            self.count, self.min_ts, self.max_ts = header
+        else:
+            self.count = len(columns["timestamps"])
+            self.min_ts = int(columns["timestamps"][0]) if self.count else 0
+            self.max_ts = int(columns["timestamps"][-1]) if self.count else 0
+        self._lookup: Dict[str, Dict[str, int]] = {}
+
+    @property
+    def columns(self) -> Dict[str, np.ndarray]:
+        columns = self._columns
+        if columns is None:
+            columns = self._columns = self._map()
+        return columns
+
+    @property
+    def mapped(self) -> bool:
+        return self.path is not None and self._columns is not None
+
+    def release(self):
+        """Unmap a file segment; it is mapped again when next read"""
+        if self.path is not None:
+            # The mapping and its descriptor close once no column view is left
+            self._columns = None
+
+    @classmethod
+    def from_batch(cls, batch: Batch) -> "Segment":
+        timestamps, response_times, status_codes, endpoints, services, environments, errors = batch
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        order = np.argsort(timestamps, kind="stable")
+        columns = {
+            "timestamps": timestamps[order],
+            "response_times": np.asarray(response_times, dtype=np.float64)[order],
+            "status_codes": np.asarray(status_codes, dtype=np.int16)[order],
+        }
+        dictionaries = {}
+        for name, values in (("endpoints", endpoints), ("services", services), ("environments", environments)):
+            ids: Dict[str, int] = {}
+            codes = np.fromiter((ids.setdefault(value, len(ids)) for value in values), dtype=np.int32, count=len(values))
+            columns[name[:-1] + "_ids"] = codes[order]
+            dictionaries[name] = list(ids)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        sparse = {int(rank[i]): error for i, error in enumerate(errors) if error is not None}
+        return cls(columns, dictionaries, sparse)
+
+    @classmethod
+    def open(cls, path: str) -> "Segment":
+        """Read a segment file's header and dictionaries; the columns are mapped on first read"""
+        with open(path, "rb") as f:
+            magic, version, _, count, min_ts, max_ts, meta_offset, meta_length = _HEADER.unpack(
+                f.read(_HEADER.size)
+            )
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"Not a log segment: {path}")
+            f.seek(meta_offset)
+            meta = json.loads(f.read(meta_length))
+        errors = {i: error for i, error in meta.pop("errors")}
+        return cls(None, meta, errors, path, (count, min_ts, max_ts))
+
+    def _map(self) -> Dict[str, np.ndarray]:
+        """Column arrays as views into a read-only mapping of the file"""
+        with open(self.path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        columns = {}
+        offset = _HEADER.size
+        for name, dtype in _COLUMNS:
+            columns[name] = np.frombuffer(mapping, dtype=dtype, count=self.count, offset=offset)
+            offset += columns[name].nbytes
+        return columns
+
+    def write(self, path: str):
+        """Write the segment to path atomically"""
+        meta = json.dumps({**self.dictionaries, "errors": list(self.errors.items())}, default=str).encode()
+        body = [np.ascontiguousarray(self.columns[name], dtype=dtype).tobytes() for name, dtype in _COLUMNS]
+        meta_offset = _HEADER.size + sum(len(part) for part in body)
+        header = _HEADER.pack(MAGIC, VERSION, 0, self.count, self.min_ts, self.max_ts, meta_offset, len(meta))
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            for part in body:
+                f.write(part)
+            f.write(meta)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _id(self, dictionary: str, value: str) -> Optional[int]:
+        lookup = self._lookup.get(dictionary)
+        if lookup is None:
+            lookup = self._lookup[dictionary] = {v: i for i, v in enumerate(self.dictionaries[dictionary])}
+        return lookup.get(value)
+
+    def select(
+        self,
+        start_ns: int,
+        end_ns: int,
+        endpoint: Optional[str] = None,
+        service: Optional[str] = None,
+        status_code: Optional[int] = None
+    ) -> np.ndarray:
+        """Row indices with start_ns <= timestamp <= end_ns matching the filters"""
+        timestamps = self.columns["timestamps"]
+        lo = int(np.searchsorted(timestamps, start_ns, side="left"))
+        hi = int(np.searchsorted(timestamps, end_ns, side="right"))
+        rows = np.arange(lo, hi)
+        if endpoint is None and service is None and status_code is None:
+            return rows
+        mask = np.ones(len(rows), dtype=bool)
+        for dictionary, column, value in (("endpoints", "endpoint_ids", endpoint), ("services", "service_ids", service)):
+            if value is not None:
+                idx = self._id(dictionary, value)
+                if idx is None:
+                    return rows[:0]
+                mask &= self.columns[column][lo:hi] == idx
+        if status_code is not None:
+            mask &= self.columns["status_codes"][lo:hi] == status_code
+        return rows[mask]
+
+    def take(self, rows: np.ndarray) -> Batch:
+        """Materialise rows as a batch of columns"""
+        strings = [
+            np.array(self.dictionaries[dictionary], dtype=object)[self.columns[column][rows]].tolist()
+            for dictionary, column in (
+                ("endpoints", "endpoint_ids"), ("services", "service_ids"), ("environments", "environment_ids")
+            )
+        ]
+        errors = self.errors
+        return (
+            np.array(self.columns["timestamps"][rows]),
+            np.array(self.columns["response_times"][rows]),
+            np.array(self.columns["status_codes"][rows]),
+            *strings,
+            [errors.get(row) for row in rows.tolist()] if errors else [None] * len(rows)
+        )
+
+
+def concat_batches(batches: List[Batch]) -> Batch:
+    """Concatenate batches and sort the result by timestamp"""
+    if not batches:
+        return (np.empty(0, dtype=np.int64), np.empty(0), np.empty(0, dtype=np.int16), [], [], [], [])
+    timestamps = np.concatenate([batch[0] for batch in batches])
+    order = np.argsort(timestamps, kind="stable")
+    result = [timestamps[order]]
+    for i in (1, 2):
+        result.append(np.concatenate([batch[i] for batch in batches])[order])
+    for i in (3, 4, 5, 6):
+        values = [value for batch in batches for value in batch[i]]
+        result.append([values[j] for j in order.tolist()])
+    return tuple(result)
+
+
+def batch_to_records(batch: Batch) -> List[Dict[str, Any]]:
+    """Materialise a batch as log entry dicts, in the format of LogStore.to_records"""
+    timestamps, response_times, status_codes, endpoints, services, environments, errors = batch
+    timestamps = np.datetime_as_string(np.asarray(timestamps).view("datetime64[ns]"), unit="us")
+    return [
+        {
+            "timestamp": str(ts),
+            "environment": environment,
+            "service": service,
+            "api_endpoint": endpoint,
+            "response_time": response_time,
+            "status_code": status_code,
+            "error": error
+        }
+        for ts, response_time, status_code, endpoint, service, environment, error in zip(
+            timestamps, response_times.tolist(), status_codes.tolist(), endpoints, services, environments, errors
+        )
+    ]
+
+
+class SegmentStore:
+    """Append-only, time-partitioned columnar log files on local disk.
+
+    Ingested batches are buffered in memory and flushed every
+    flush_interval seconds (or once flush_entries are buffered) into one
+    immutable segment file per time partition touched. A file holds
+    fixed-width binary columns sorted by timestamp, a dictionary of its
+    endpoints, services and environments, and a header with its entry
+    count and time range. Headers are read once at startup, so a range
+    scan skips every segment outside the range without touching it and
+    reads the rest through memory maps, binary searching the timestamp
+    column. At most max_open_segments files are mapped at a time, the
+    least recently read being unmapped first, so the open file descriptors
+    stay bounded however many segments an uncompacted partition has. In
+    the background, partitions that are no longer written are compacted
+    into as few segments as compact_entries allows, and segments older
+    than retention_days are deleted.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        partition_seconds: int = 3600,
+        retention_days: float = 7,
+        flush_interval: float = 10.0,
+        flush_entries: int = 100_000,
+        compact_interval: float = 60.0,
+        compact_entries: int = 5_000_000,
+        max_open_segments: int = 64
+    ):
+        self.directory = directory
+        self.partition_ns = partition_seconds * NS_PER_SECOND
+        self.retention_ns = int(retention_days * 24 * 3600 * NS_PER_SECOND)
+        self.flush_interval = flush_interval
+        self.flush_entries = flush_entries
+        self.compact_interval = compact_interval
+        self.compact_entries = compact_entries
+        self.max_open_segments = max_open_segments
+
+        os.makedirs(directory, exist_ok=True)
+        self.segments: List[Segment] = []
+        self._buffer: List[Segment] = []
+        self._buffered = 0
+        self._flushing: List[Segment] = []  # swapped out of the buffer, being written
+        self._mapped: "OrderedDict[Segment, None]" = OrderedDict()  # least recently read first
+        self._seq = 0
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._wakeup: Optional[asyncio.Event] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._load()
+
+    def __len__(self) -> int:
+        return sum(segment.count for segment in self.segments) + self._buffered + sum(
+            segment.count for segment in self._flushing
+        )
+
+    def _load(self):
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".tmp"):
+                os.unlink(path)  # Interrupted write
+                continue
+            if not name.endswith(SUFFIX):
+                continue
+            try:
+                self.segments.append(Segment.open(path))
+                self._seq = max(self._seq, int(name[:-len(SUFFIX)].split("-")[1]))
+            except (ValueError, OSError, IndexError, struct.error) as e:
+                logger.error(f"Skipping unreadable log segment {name}: {str(e)}")
+        self.segments.sort(key=lambda segment: segment.min_ts)
+        if self.segments:
+            logger.info(f"Loaded {len(self.segments)} log segments with {len(self)} entries")
+
+    def _path(self, partition: int) -> str:
+        self._seq += 1
+        return os.path.join(self.directory, f"{partition:08d}-{self._seq:08d}{SUFFIX}")
+
+    def start(self):
+        """Start the background flush and compaction task on the running event loop"""
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task after flushing whatever is buffered"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        self._stopping = False
+
+    @property
+    def pending(self) -> int:
+        """Entries buffered and not yet written to a segment file"""
+        return self._buffered + sum(segment.count for segment in self._flushing)
+
+    def append_batch(self, *batch):
+        """Buffer a batch of entries, in LogCollector.ingest_columns argument order"""
+        if len(batch[0]) == 0:
+            return
+        self._buffer.append(Segment.from_batch(batch))
+        self._buffered += len(batch[0])
+        if self._buffered >= self.flush_entries and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        next_compaction = time.monotonic() + self.compact_interval
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+                if time.monotonic() >= next_compaction:
+                    next_compaction = time.monotonic() + self.compact_interval
+                    await self.compact()
+                    self.expire()
+            except Exception as e:
+                logger.error(f"Error maintaining log segments: {str(e)}")
+        await self.flush()
+
+    async def flush(self):
+        """Write buffered entries to one new segment per time partition.
+
+        Partitions are written one at a time. If a write fails, the
+        partitions already written are kept and only the remaining entries
+        go back to the buffer, so the next attempt does not write them twice.
+        """
+        async with self._lock:
+            if not self._buffer:
+                return
+            self._flushing, self._buffer, self._buffered = self._buffer, [], 0
+            written: List[Segment] = []
+            try:
+                with FLUSH_SECONDS.labels("segments").time():
+                    await asyncio.to_thread(self._write_partitions, self._flushing, written)
+            except Exception:
+                # Keep the entries of unwritten partitions buffered for the next attempt
+                remaining = self._unwritten(self._flushing, written)
+                self._buffer = remaining + self._buffer
+                self._buffered = sum(segment.count for segment in self._buffer)
+                raise
+            finally:
+                self._flushing = []
+                self._add(written)
+                FLUSHED_ENTRIES.labels("segments").inc(sum(segment.count for segment in written))
+
+    def _write_partitions(self, buffered: List[Segment], written: List[Segment]):
+        """Write buffered segments as one file per partition, appending each to written as it is done"""
+        batch = concat_batches([segment.take(np.arange(segment.count)) for segment in buffered])
+        partitions = batch[0] // self.partition_ns
+        bounds = np.flatnonzero(np.diff(partitions)) + 1
+        for start, stop in zip(np.r_[0, bounds], np.r_[bounds, len(partitions)]):
+            path = self._path(int(partitions[start]))
+            Segment.from_batch(tuple(column[start:stop] for column in batch)).write(path)
+            written.append(Segment.open(path))
+
+    def _unwritten(self, buffered: List[Segment], written: List[Segment]) -> List[Segment]:
+        """The entries of buffered segments in partitions that have no written segment"""
+        done = np.array([segment.min_ts // self.partition_ns for segment in written], dtype=np.int64)
+        remaining = []
+        for segment in buffered:
+            rows = np.flatnonzero(~np.isin(segment.columns["timestamps"] // self.partition_ns, done))
+            if len(rows) == segment.count:
+                remaining.append(segment)
+            elif len(rows):
+                remaining.append(Segment.from_batch(segment.take(rows)))
+        return remaining
+
+    def _use(self, segment: Segment) -> Segment:
+        """Mark a segment as read, unmapping the least recently read files beyond max_open_segments"""
+        if segment.path is None:
+            return segment
+        self._mapped[segment] = None
+        self._mapped.move_to_end(segment)
+        while len(self._mapped) > self.max_open_segments:
+            self._mapped.popitem(last=False)[0].release()
+        return segment
+
+    def _add(self, segments: List[Segment], removed: Optional[List[Segment]] = None):
+        for segment in removed or []:
+            self._mapped.pop(segment, None)
+            segment.release()
+        removed_ids = {id(segment) for segment in removed or []}
+        self.segments = sorted(
+            [segment for segment in self.segments if id(segment) not in removed_ids] + segments,
+            key=lambda segment: segment.min_ts
+        )
+
+    async def compact(self):
+        """Merge the segments of each partition that is no longer written to"""
+        # Allow a couple of flushes past the partition end for entries still buffered
+        grace_ns = int(2 * self.flush_interval * NS_PER_SECOND)
+        open_from = (to_epoch_ns(datetime.utcnow()) - grace_ns) // self.partition_ns
+        by_partition: Dict[int, List[Segment]] = {}
+        for segment in self.segments:
+            partition = segment.min_ts // self.partition_ns
+            if partition < open_from:
+                by_partition.setdefault(partition, []).append(segment)
+
+        for partition, segments in by_partition.items():
+            # Greedily group small segments, so a merge never holds more than compact_entries
+            groups, group, size = [], [], 0
+            for segment in sorted(segments, key=lambda segment: segment.count):
+                if group and size + segment.count > self.compact_entries:
+                    groups.append(group)
+                    group, size = [], 0
+                group.append(segment)
+                size += segment.count
+            groups.append(group)
+
+            for group in groups:
+                if len(group) < 2:
+                    continue
+                async with self._lock:
+                    merged = await asyncio.to_thread(self._merge, partition, group)
+                    self._add([merged], group)
+                for segment in group:
+                    os.unlink(segment.path)
+                logger.info(f"Compacted {len(group)} log segments into {os.path.basename(merged.path)}")
+
+    def _merge(self, partition: int, segments: List[Segment]) -> Segment:
+        batches = []
+        for segment in segments:
+            batches.append(segment.take(np.arange(segment.count)))
+            # A partition may have hundreds of segments; keep only one mapped at a time
+            if segment not in self._mapped:
+                segment.release()
+        batch = concat_batches(batches)
+        path = self._path(partition)
+        Segment.from_batch(batch).write(path)
+        return Segment.open(path)
+
+    def expire(self, now_ns: Optional[int] = None):
+        """Delete segments whose newest entry is older than the retention period"""
+        now_ns = to_epoch_ns(datetime.utcnow()) if now_ns is None else now_ns
+        expired = [segment for segment in self.segments if segment.max_ts < now_ns - self.retention_ns]
+        if not expired:
+            return
+        self._add([], expired)
+        for segment in expired:
+            os.unlink(segment.path)
+        logger.info(f"Deleted {len(expired)} expired log segments")
+
+    def read(
+        self,
+        start_ns: int,
+        end_ns: int,
+        endpoint: Optional[str] = None,
+        service: Optional[str] = None,
+        status_code: Optional[int] = None
+    ) -> Batch:
+        """Entries with start_ns <= timestamp <= end_ns, oldest first, including unflushed ones"""
+        batches = []
+        for segment in self.segments + self._flushing + self._buffer:
+            # The header time range lets whole segments be skipped
+            if segment.count == 0 or segment.max_ts < start_ns or segment.min_ts > end_ns:
+                continue
+            rows = self._use(segment).select(start_ns, end_ns, endpoint, service, status_code)
+            if len(rows):
+                batches.append(segment.take(rows))
+        return concat_batches(batches)
+
+    def read_latest(self, start_ns: int, limit: int) -> Batch:
+        """The newest limit entries at or after start_ns, oldest first.
+
+        Segments are visited newest first, and the scan stops once no
+        remaining segment can hold an entry newer than the limit found.
+        """
+        batches, found, cutoff = [], 0, start_ns
+        segments = self.segments + self._flushing + self._buffer
+        for segment in sorted(segments, key=lambda segment: segment.max_ts, reverse=True):
+            if limit <= 0 or segment.max_ts < cutoff:
+                break
+            if segment.count == 0:
+                continue
+            rows = self._use(segment).select(cutoff, np.iinfo(np.int64).max)
+            if len(rows) == 0:
+                continue
+            batches.append(segment.take(rows))
+            found += len(rows)
+            if found >= limit:
+                timestamps = np.concatenate([batch[0] for batch in batches])
+                cutoff = int(np.partition(timestamps, found - limit)[found - limit])
+        batch = concat_batches(batches)
+        if len(batch[0]) > limit:
+            batch = tuple(column[-limit:] for column in batch)
+        return batch
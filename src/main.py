@@ -1,23 +1,32 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from contextlib import asynccontextmanager
 import uvicorn
 from datetime import datetime
 import logging
 import os
-from opentelemetry import trace
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
 
 # Import routers
-from src.api.monitoring_api import router as monitoring_router
+from src.telemetry import configure_tracing, render_metrics
+from src.api.encoding import FastJSONResponse, CompressionMiddleware
+from src.api.monitoring_api import (
+    router as monitoring_router, ingest_router, start_components, stop_components, INGEST_ROLE
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_components()
+    yield
+    await stop_components()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="API Monitoring System",
     description="AI-powered API monitoring and anomaly detection system",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # Configure CORS
@@ -28,6 +37,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Brotli or gzip for large responses; event streams are left uncompressed
+app.add_middleware(CompressionMiddleware)
 
 # Configure logging
 logging.basicConfig(
@@ -36,31 +47,20 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Initialize OpenTelemetry
-trace.set_tracer_provider(TracerProvider())
-tracer = trace.get_tracer(__name__)
-
-# Include routers
-app.include_router(monitoring_router, prefix="/api/v1")
-
-# Mount static files
-static_dir = os.path.join(os.path.dirname(__file__), "static")
-app.mount("/", StaticFiles(directory=static_dir, html=True), name="static")
+# Initialize OpenTelemetry; off unless a share of traces is to be sampled
+configure_tracing(app, float(os.getenv("OTEL_TRACES_SAMPLE_RATIO", "0")))
 
-# Routes
-@app.get("/")
-async def root():
-    return {
-        "message": "API Monitoring System is running",
-        "version": "1.0.0",
-        "docs_url": "/docs",
-        "timestamp": datetime.utcnow().isoformat()
-    }
+# Registered before the static mount at "/", which would otherwise shadow them
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
 @app.get("/health")
 async def health_check():
     return {
         "status": "healthy",
+        "role": INGEST_ROLE,
         "timestamp": datetime.utcnow().isoformat(),
         "components": {
             "api": "healthy",
@@ -70,6 +70,25 @@ async def health_check():
         }
     }
 
+# Include routers; ingest workers only accept logs, the aggregator serves the rest
+app.include_router(ingest_router, prefix="/api/v1")
+if INGEST_ROLE != "ingest":
+    app.include_router(monitoring_router, prefix="/api/v1")
+
+    # Mount static files
+    static_dir = os.path.join(os.path.dirname(__file__), "static")
+    app.mount("/", StaticFiles(directory=static_dir, html=True), name="static")
+
+# Routes
+@app.get("/")
+async def root():
+    return {
+        "message": "API Monitoring System is running",
+        "version": "1.0.0",
+        "docs_url": "/docs",
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
 def create_app():
     return app
 
@@ -0,0 +1,117 @@
+import logging
+import os
+from contextlib import nullcontext
+from typing import Callable, Dict, Tuple
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+)
+from prometheus_client.core import CounterMetricFamily
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from sub-millisecond batch handling to slow model fits
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+SLOW_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+LAG_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0, 6 * 3600.0, 24 * 3600.0)
+
+INGEST_BATCH_SECONDS = Histogram(
+    "api_monitor_ingest_batch_seconds", "Time to store a batch of log entries and notify listeners",
+    buckets=FAST_BUCKETS
+)
+INGEST_LAG_SECONDS = Histogram(
+    "api_monitor_ingest_lag_seconds", "Delay between a log's event time and its ingestion",
+    buckets=LAG_BUCKETS
+)
+BUFFERED_ENTRIES = Gauge(
+    "api_monitor_buffered_entries", "Entries waiting to be written, per buffer", ["buffer"],
+    multiprocess_mode="livesum"
+)
+FLUSH_SECONDS = Histogram(
+    "api_monitor_flush_seconds", "Time to write a batch to storage", ["sink"], buckets=SLOW_BUCKETS
+)
+FLUSHED_ENTRIES = Counter("api_monitor_flushed_entries_total", "Log entries written to storage", ["sink"])
+
+TRAIN_SECONDS = Histogram("api_monitor_train_seconds", "Global anomaly model training time", buckets=SLOW_BUCKETS)
+DETECTION_SECONDS = Histogram(
+    "api_monitor_detection_seconds", "Anomaly detection time for one window", buckets=SLOW_BUCKETS
+)
+ANOMALIES_DETECTED = Counter("api_monitor_anomalies_total", "New anomalies published by detection cycles")
+
+ALERT_SEND_SECONDS = Histogram(
+    "api_monitor_alert_send_seconds", "Alert webhook request time", ["channel"], buckets=SLOW_BUCKETS
+)
+ALERT_SEND_FAILURES = Counter("api_monitor_alert_send_failures_total", "Failed alert webhook requests", ["channel"])
+
+
+class ScrapedCounters:
+    """Counters their owners keep as plain ints, read at scrape time.
+
+    For per-entry counts a Prometheus Counter's lock would cost more than
+    the work being counted.
+    """
+
+    def __init__(self):
+        self._counters: Dict[str, Tuple[str, Callable[[], float]]] = {}
+
+    def add(self, name: str, documentation: str, read: Callable[[], float]):
+        self._counters[name] = (documentation, read)
+
+    def collect(self):
+        for name, (documentation, read) in self._counters.items():
+            yield CounterMetricFamily(name, documentation, value=read())
+
+
+SCRAPED_COUNTERS = ScrapedCounters()
+REGISTRY.register(SCRAPED_COUNTERS)
+
+_NO_SPAN = nullcontext()
+_tracer = None
+
+
+def render_metrics():
+    """(body, content type) of the Prometheus exposition.
+
+    With PROMETHEUS_MULTIPROC_DIR set (one directory shared by all uvicorn
+    workers), the histograms and counters of every worker are aggregated;
+    values read at scrape time are per process and left out.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def configure_tracing(app, sample_ratio: float):
+    """Export a sample_ratio share of traces over OTLP/HTTP; no-op when the ratio is 0.
+
+    The exporter reads its endpoint and headers from the standard
+    OTEL_EXPORTER_OTLP_* variables. Spans are batched and exported from a
+    background thread.
+    """
+    global _tracer
+    if sample_ratio <= 0:
+        return
+    provider = TracerProvider(
+        sampler=ParentBased(TraceIdRatioBased(sample_ratio)),
+        resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", "api-monitor")})
+    )
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("api-monitor")
+    FastAPIInstrumentor.instrument_app(app, tracer_provider=provider, excluded_urls="metrics,health,api/v1/stream")
+    logger.info(f"Tracing {sample_ratio:.1%} of requests")
+
+
+def span(name: str):
+    """Context manager for an internal span, free when tracing is off"""
+    if _tracer is None:
+        return _NO_SPAN
+    return _tracer.start_as_current_span(name)
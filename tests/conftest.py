@@ -0,0 +1,16 @@
+import pytest
+from src.collectors.log_collector import LogCollector
+from .fake_elasticsearch import FakeElasticsearch
+
+
+@pytest.fixture
+def fake_es() -> FakeElasticsearch:
+    return FakeElasticsearch()
+
+
+@pytest.fixture
+def es_collector(fake_es) -> LogCollector:
+    """A collector in Elasticsearch mode talking to fake_es"""
+    collector = LogCollector(es_host="http://localhost:9200")
+    collector.es_client = fake_es
+    return collector
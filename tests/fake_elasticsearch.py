@@ -0,0 +1,153 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+import numpy as np
+import orjson
+
+
+def epoch_millis(timestamp: str) -> int:
+    return int(datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def _matches(doc: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    for clause in query["bool"]["filter"]:
+        if "range" in clause:
+            bounds = clause["range"]["timestamp"]
+            if not bounds["gte"] <= epoch_millis(doc["timestamp"]) <= bounds["lte"]:
+                return False
+        else:
+            (field, value), = clause["term"].items()
+            if doc.get(field) != value:
+                return False
+    return True
+
+
+class FakeIndices:
+    def __init__(self):
+        self.templates: Dict[str, Dict[str, Any]] = {}
+
+    async def put_index_template(self, name: str, **template):
+        self.templates[name] = template
+        return {"acknowledged": True}
+
+
+class FakeElasticsearch:
+    """In-process stand-in for the AsyncElasticsearch calls the collector makes.
+
+    Documents are kept per index. bulk_statuses, if set, is consumed one
+    list per bulk request and gives the status of each item; an item with
+    status >= 300 is not stored. Searches support the range and term
+    filters of range_query, points in time with search_after on
+    (timestamp, _shard_doc), and the minute rollup aggregation. Every
+    search and point-in-time call is recorded in calls.
+    """
+
+    def __init__(self):
+        self.indices = FakeIndices()
+        self.docs: Dict[str, List[Dict[str, Any]]] = {}
+        self.bulk_requests: List[List[Dict[str, Any]]] = []
+        self.bulk_statuses: List[List[int]] = []
+        self.closed = False
+        self.calls: List[tuple] = []
+        self.pits: Dict[str, List[Dict[str, Any]]] = {}
+        self._seq = 0
+
+    async def bulk(self, operations: List[bytes]):
+        actions = [orjson.loads(line) for line in operations]
+        pairs = list(zip(actions[::2], actions[1::2]))
+        self.bulk_requests.append([doc for _, doc in pairs])
+        statuses = self.bulk_statuses.pop(0) if self.bulk_statuses else [201] * len(pairs)
+        items = []
+        for (action, doc), status in zip(pairs, statuses):
+            item = {"_index": action["index"]["_index"], "status": status}
+            if status < 300:
+                self._store(action["index"]["_index"], doc)
+            else:
+                item["error"] = {"type": "es_rejected_execution_exception" if status == 429 else "mapper_exception"}
+            items.append({"index": item})
+        return {"errors": any(status >= 300 for status in statuses), "items": items}
+
+    def _store(self, index: str, doc: Dict[str, Any]):
+        self._seq += 1
+        self.docs.setdefault(index, []).append({**doc, "_seq": self._seq})
+
+    def add(self, index: str, doc: Dict[str, Any]):
+        """Index a document directly, bypassing bulk"""
+        self._store(index, doc)
+
+    def _resolve(self, index: str) -> List[Dict[str, Any]]:
+        docs = []
+        for name in index.split(","):
+            if name.endswith("*"):
+                for index_name, index_docs in self.docs.items():
+                    if index_name.startswith(name[:-1]):
+                        docs += index_docs
+            else:
+                docs += self.docs.get(name, [])
+        return docs
+
+    async def open_point_in_time(self, index: str, keep_alive: str, ignore_unavailable: bool = False):
+        self.calls.append(("open_point_in_time", index))
+        pit_id = f"pit-{len(self.calls)}"
+        # A point in time sees the documents as they were when it was opened
+        self.pits[pit_id] = list(self._resolve(index))
+        return {"id": pit_id}
+
+    async def close_point_in_time(self, id: str):
+        self.calls.append(("close_point_in_time", id))
+        del self.pits[id]
+        return {"succeeded": True}
+
+    async def search(
+        self,
+        query: Dict[str, Any],
+        index: Optional[str] = None,
+        pit: Optional[Dict[str, Any]] = None,
+        size: int = 10,
+        search_after: Optional[List[Any]] = None,
+        source: Optional[List[str]] = None,
+        aggs: Optional[Dict[str, Any]] = None,
+        **params
+    ):
+        self.calls.append(("search", index, pit["id"] if pit else None, search_after))
+        pool = self.pits[pit["id"]] if pit else self._resolve(index)
+        hits = sorted(
+            (doc for doc in pool if _matches(doc, query)),
+            key=lambda doc: (epoch_millis(doc["timestamp"]), doc["_seq"])
+        )
+        if aggs is not None:
+            return {"hits": {"hits": []}, "aggregations": {"minutes": {"buckets": self._minute_buckets(hits, aggs)}}}
+        if search_after is not None:
+            hits = [doc for doc in hits if (epoch_millis(doc["timestamp"]), doc["_seq"]) > tuple(search_after)]
+        return {
+            "pit_id": pit["id"] if pit else None,
+            "hits": {"hits": [
+                {
+                    "_source": {field: doc[field] for field in source} if source else doc,
+                    "sort": [epoch_millis(doc["timestamp"]), doc["_seq"]]
+                }
+                for doc in hits[:size]
+            ]}
+        }
+
+    @staticmethod
+    def _minute_buckets(hits: List[Dict[str, Any]], aggs: Dict[str, Any]) -> List[Dict[str, Any]]:
+        percents = aggs["minutes"]["aggs"]["percentiles"]["percentiles"]["percents"]
+        minutes: Dict[int, List[Dict[str, Any]]] = {}
+        for doc in hits:
+            minutes.setdefault(epoch_millis(doc["timestamp"]) // 60_000 * 60_000, []).append(doc)
+        buckets = []
+        for key, docs in sorted(minutes.items()):
+            response_times = np.array([doc["response_time"] for doc in docs], dtype=np.float64)
+            buckets.append({
+                "key": key,
+                "doc_count": len(docs),
+                "response_time": {"value": float(response_times.mean())},
+                "errors": {"doc_count": sum(doc["status_code"] >= 400 for doc in docs)},
+                "percentiles": {"values": {
+                    f"{percent:.1f}": float(np.percentile(response_times, percent)) for percent in percents
+                }}
+            })
+        return buckets
+
+    async def close(self):
+        self.closed = True
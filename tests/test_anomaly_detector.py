@@ -0,0 +1,95 @@
+import asyncio
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from src.analyzers.anomaly_detector import AnomalyDetector, DetectionJob, run_detection_jobs
+from src.analyzers.detection_scheduler import DetectionScheduler
+from src.analyzers.engines import RobustZScoreEngine
+from src.analyzers.feature_aggregator import NS_PER_MINUTE
+from src.analyzers.model_registry import EndpointModel
+from src.collectors.log_store import to_epoch_ns
+
+
+def observe_minutes(detector, first_minute, requests_per_minute, rng):
+    """Feed evenly spread requests for consecutive minutes, one count per minute"""
+    timestamps = np.concatenate([
+        (first_minute + i) * NS_PER_MINUTE + np.linspace(0, NS_PER_MINUTE - 1, count, dtype=np.int64)
+        for i, count in enumerate(requests_per_minute)
+    ])
+    n = len(timestamps)
+    detector.observe(
+        timestamps,
+        rng.normal(120.0, 5.0, n),
+        np.full(n, 200),
+        ["/api/v1/orders"] * n,
+        ["checkout"] * n
+    )
+
+
+@pytest.mark.parametrize("engine", ["robust_zscore", "isolation_forest"])
+def test_detection_leaves_out_the_partial_current_minute(engine):
+    detector = AnomalyDetector(engine=engine)
+    current = to_epoch_ns(datetime.utcnow()) // NS_PER_MINUTE
+    rng = np.random.default_rng(3)
+    # Sixty complete minutes at a steady rate, then the first seconds of the current one
+    observe_minutes(detector, current - 60, [600] * 60 + [20], rng)
+
+    jobs = detector.plan_detection()
+    anomalies = detector.finish_detection(jobs, run_detection_jobs(jobs, detector.engine))
+
+    current = to_epoch_ns(datetime.utcnow()) // NS_PER_MINUTE
+    assert len(jobs) == 1
+    assert jobs[0].index[-1].value // NS_PER_MINUTE < current
+    assert jobs[0].features[:, 2].min() == 600
+    assert all(anomaly["metrics"]["request_rate"] == 600 for anomaly in anomalies)
+
+
+def test_detection_respects_an_earlier_end_time():
+    detector = AnomalyDetector(engine="robust_zscore")
+    current = to_epoch_ns(datetime.utcnow()) // NS_PER_MINUTE
+    observe_minutes(detector, current - 60, [600] * 61, np.random.default_rng(3))
+
+    end_time = datetime.utcnow() - timedelta(minutes=30)
+    jobs = detector.plan_detection(end_time - timedelta(minutes=15), end_time)
+
+    assert jobs[0].index[-1].value <= to_epoch_ns(end_time)
+
+
+def test_failed_global_training_does_not_stop_endpoint_detection(monkeypatch):
+    def fail(*args):
+        raise ValueError("Input X contains infinity")
+
+    monkeypatch.setattr("src.analyzers.detection_scheduler.fit_model", fail)
+    detector = AnomalyDetector(engine="robust_zscore")
+    current = to_epoch_ns(datetime.utcnow()) // NS_PER_MINUTE
+    # A burst in the last complete minute
+    observe_minutes(detector, current - 61, [600] * 60 + [3000], np.random.default_rng(3))
+    scheduler = DetectionScheduler(detector)
+
+    results = asyncio.run(scheduler.run_once())
+
+    assert detector.training_data is None
+    assert 3000 in [anomaly["metrics"]["request_rate"] for anomaly in results.anomalies]
+    assert len(scheduler.cache.anomalies()) == len(results.anomalies)
+
+
+class FailingFitEngine(RobustZScoreEngine):
+    def fit(self, features):
+        raise ValueError("cannot fit")
+
+
+def test_failed_refit_scores_with_the_previous_model():
+    engine = FailingFitEngine()
+    history = np.tile([120.0, 0.0, 600.0, 130.0, 140.0], (60, 1))
+    previous = EndpointModel(engine.name, RobustZScoreEngine.fit(engine, history))
+    features = np.array([[120.0, 0.0, 600.0, 130.0, 140.0], [120.0, 0.0, 3000.0, 130.0, 140.0]])
+    jobs = [
+        DetectionJob(("checkout", "/a"), None, features, previous, training_features=history),
+        DetectionJob(("checkout", "/b"), None, features, None, training_features=history),
+    ]
+
+    outputs = run_detection_jobs(jobs, engine)
+
+    assert outputs[0].predictions.tolist() == [1, -1]
+    assert outputs[0].model is None
+    assert outputs[1] is None
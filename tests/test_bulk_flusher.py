@@ -0,0 +1,180 @@
+import asyncio
+from datetime import datetime, timedelta
+from src.collectors.bulk_flusher import BulkFlusher
+
+
+def entries(count, start=0):
+    return [{"n": i} for i in range(start, start + count)]
+
+
+class RecordingSender:
+    """Bulk sender that records batches and fails the entries fail(entry, attempt) picks"""
+
+    def __init__(self, fail=None, raise_times=0):
+        self.batches = []
+        self.stored = []
+        self.fail = fail or (lambda entry, attempt: False)
+        self.raise_times = raise_times
+
+    async def __call__(self, batch):
+        attempt = len(self.batches)
+        self.batches.append(list(batch))
+        if self.raise_times:
+            self.raise_times -= 1
+            raise ConnectionError("connection refused")
+        failed = [entry for entry in batch if self.fail(entry, attempt)]
+        self.stored.extend(entry for entry in batch if entry not in failed)
+        return failed
+
+
+def test_flush_splits_into_max_batch_chunks():
+    async def scenario():
+        sender = RecordingSender()
+        flusher = BulkFlusher(sender, max_batch=1000, max_age=60)
+        assert await flusher.put(entries(2500)) == 2500
+        await flusher.stop()
+        return sender, flusher
+
+    sender, flusher = asyncio.run(scenario())
+    assert [len(batch) for batch in sender.batches] == [1000, 1000, 500]
+    assert sender.stored == entries(2500)
+    assert flusher.flushed == 2500
+    assert flusher.pending == 0
+
+
+def test_flushes_once_oldest_entry_reaches_max_age():
+    async def scenario():
+        sender = RecordingSender()
+        flusher = BulkFlusher(sender, max_batch=1000, max_age=0.05)
+        await flusher.put(entries(3))
+        await asyncio.sleep(0.3)
+        flushed_before_stop = list(sender.stored)
+        await flusher.stop()
+        return flushed_before_stop
+
+    assert asyncio.run(scenario()) == entries(3)
+
+
+def test_retries_only_the_failed_entries():
+    async def scenario():
+        # Odd entries fail on the first attempt only
+        sender = RecordingSender(fail=lambda entry, attempt: attempt == 0 and entry["n"] % 2 == 1)
+        flusher = BulkFlusher(sender, max_batch=100, base_backoff=0)
+        await flusher.put(entries(10))
+        await flusher.stop()
+        return sender, flusher
+
+    sender, flusher = asyncio.run(scenario())
+    assert sender.batches[1] == [entry for entry in entries(10) if entry["n"] % 2 == 1]
+    assert sorted(entry["n"] for entry in sender.stored) == list(range(10))
+    assert flusher.flushed == 10
+    assert flusher.dropped == 0
+
+
+def test_retries_after_a_failed_request():
+    async def scenario():
+        sender = RecordingSender(raise_times=2)
+        flusher = BulkFlusher(sender, max_batch=100, base_backoff=0)
+        await flusher.put(entries(5))
+        await flusher.stop()
+        return sender, flusher
+
+    sender, flusher = asyncio.run(scenario())
+    assert len(sender.batches) == 3
+    assert sender.stored == entries(5)
+    assert flusher.flushed == 5
+
+
+def test_gives_up_after_max_retries():
+    async def scenario():
+        sender = RecordingSender(fail=lambda entry, attempt: entry["n"] == 0)
+        flusher = BulkFlusher(sender, max_batch=100, max_retries=3, base_backoff=0)
+        await flusher.put(entries(4))
+        await flusher.stop()
+        return sender, flusher
+
+    sender, flusher = asyncio.run(scenario())
+    assert len(sender.batches) == 4
+    assert flusher.flushed == 3
+    assert flusher.dropped == 1
+    assert flusher.failed_flushes == 1
+
+
+def test_drop_policy_discards_entries_beyond_max_buffered():
+    async def scenario():
+        flusher = BulkFlusher(RecordingSender(), max_batch=100, max_buffered=10, policy="drop")
+        accepted = await flusher.put(entries(15))
+        pending = flusher.pending
+        await flusher.stop()
+        return accepted, pending, flusher
+
+    accepted, pending, flusher = asyncio.run(scenario())
+    assert (accepted, pending) == (10, 10)
+    assert flusher.dropped == 5
+
+
+def test_block_policy_waits_for_room():
+    async def scenario():
+        sender = RecordingSender()
+        flusher = BulkFlusher(sender, max_batch=5, max_buffered=5, policy="block")
+        accepted = await asyncio.wait_for(flusher.put(entries(12)), timeout=5)
+        await flusher.stop()
+        return accepted, sender, flusher
+
+    accepted, sender, flusher = asyncio.run(scenario())
+    assert accepted == 12
+    assert sender.stored == entries(12)
+    assert flusher.dropped == 0
+
+
+def log_entry(timestamp: datetime, status_code: int = 200):
+    return {
+        "timestamp": timestamp.isoformat(),
+        "environment": "test",
+        "service": "checkout",
+        "api_endpoint": "/api/v1/orders",
+        "response_time": 120.0,
+        "status_code": status_code,
+        "error": None
+    }
+
+
+def test_bulk_index_routes_to_daily_indices(es_collector, fake_es):
+    day = datetime(2024, 3, 1, 23, 59, 59)
+    logs = [log_entry(day), log_entry(day + timedelta(seconds=2))]
+
+    assert asyncio.run(es_collector._bulk_index(logs)) == []
+    assert sorted(fake_es.docs) == ["api-logs-2024-03-01", "api-logs-2024-03-02"]
+    assert "api-logs" in fake_es.indices.templates
+
+
+def test_bulk_index_returns_throttled_and_failed_entries_for_retry(es_collector, fake_es):
+    logs = [log_entry(datetime(2024, 3, 1, 12, 0, i)) for i in range(4)]
+    fake_es.bulk_statuses = [[201, 429, 503, 400]]
+
+    retry = asyncio.run(es_collector._bulk_index(logs))
+
+    # 429 and 5xx are retried; a 400 mapping error would fail again and is dropped
+    assert retry == [logs[1], logs[2]]
+    assert [doc["timestamp"] for doc in fake_es.docs["api-logs-2024-03-01"]] == [logs[0]["timestamp"]]
+
+
+def test_collector_flushes_batches_through_elasticsearch(es_collector, fake_es):
+    now = datetime.utcnow()
+
+    async def scenario():
+        es_collector.flusher.base_backoff = 0
+        fake_es.bulk_statuses = [[429] * 3]
+        es_collector.start()
+        accepted, rejected = await es_collector.collect_batch([
+            {"timestamp": (now - timedelta(seconds=i)).isoformat(), "endpoint": "/a", "status_code": 200}
+            for i in range(3)
+        ])
+        await es_collector.cleanup()
+        return accepted, rejected
+
+    assert asyncio.run(scenario()) == (3, 0)
+    assert len(fake_es.bulk_requests) == 2
+    assert sum(len(docs) for docs in fake_es.docs.values()) == 3
+    assert es_collector.flusher.flushed == 3
+    assert fake_es.closed
@@ -0,0 +1,218 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pandas as pd
+from src.analyzers.feature_aggregator import FEATURE_COLUMNS, MinuteAggregator
+from src.collectors.es_queries import (
+    LOG_FIELDS, MAX_LISTED_INDICES, index_name, index_names, range_query, rollup_frame, search_pages
+)
+from src.collectors.log_store import to_epoch_ns
+
+
+def log_doc(timestamp: datetime, endpoint: str = "/a", status_code: int = 200, response_time: float = 100.0):
+    return {
+        "timestamp": timestamp.isoformat(),
+        "environment": "test",
+        "service": "checkout",
+        "api_endpoint": endpoint,
+        "response_time": response_time,
+        "status_code": status_code,
+        "error": None,
+        "data": {"raw": True}
+    }
+
+
+def index_docs(fake_es, docs):
+    for doc in docs:
+        fake_es.add(index_name(doc["timestamp"]), doc)
+
+
+async def collect_pages(fake_es, index, query, page_size):
+    return [page async for page in search_pages(fake_es, index, query, page_size)]
+
+
+def test_index_name_is_the_utc_day():
+    assert index_name("2024-03-01T23:59:59.999") == "api-logs-2024-03-01"
+
+
+def test_index_names_lists_every_overlapping_day():
+    start = datetime(2024, 2, 28, 22, 0)
+    assert index_names(start, datetime(2024, 3, 1, 1, 0)) == (
+        "api-logs-2024-02-28,api-logs-2024-02-29,api-logs-2024-03-01"
+    )
+    assert index_names(start, start + timedelta(minutes=5)) == "api-logs-2024-02-28"
+
+
+def test_index_names_converts_aware_times_to_utc():
+    start = datetime(2024, 3, 1, 1, 0, tzinfo=timezone(timedelta(hours=2)))
+    assert index_names(start, start + timedelta(hours=1)) == "api-logs-2024-02-29,api-logs-2024-03-01"
+
+
+def test_index_names_empty_and_long_ranges():
+    start = datetime(2024, 3, 1)
+    assert index_names(start, start - timedelta(days=1)) == ""
+    assert index_names(start, start + timedelta(days=MAX_LISTED_INDICES - 1)).count(",") == MAX_LISTED_INDICES - 1
+    assert index_names(start, start + timedelta(days=MAX_LISTED_INDICES)) == "api-logs-*"
+
+
+def test_range_query_filters_in_epoch_millis():
+    start = datetime(2024, 3, 1)
+    query = range_query(start, start + timedelta(minutes=1), endpoint="/a", status_code=500)
+    filters = query["bool"]["filter"]
+    assert filters[0]["range"]["timestamp"] == {
+        "gte": to_epoch_ns(start) // 1_000_000,
+        "lte": to_epoch_ns(start) // 1_000_000 + 60_000,
+        "format": "epoch_millis"
+    }
+    assert filters[1:] == [{"term": {"api_endpoint": "/a"}}, {"term": {"status_code": 500}}]
+
+
+def test_search_pages_on_an_empty_index_yields_nothing(fake_es):
+    start = datetime(2024, 3, 1)
+    pages = asyncio.run(collect_pages(fake_es, index_names(start, start), range_query(start, start), 10))
+
+    assert pages == []
+    assert [call[0] for call in fake_es.calls] == ["open_point_in_time", "search", "close_point_in_time"]
+    assert fake_es.pits == {}
+
+
+def test_search_pages_partial_last_page(fake_es):
+    start = datetime(2024, 3, 1)
+    index_docs(fake_es, [log_doc(start + timedelta(seconds=i)) for i in range(25)])
+
+    query = range_query(start, start + timedelta(minutes=1))
+    pages = asyncio.run(collect_pages(fake_es, index_names(start, start), query, 10))
+
+    assert [len(page) for page in pages] == [10, 10, 5]
+    timestamps = [entry["timestamp"] for page in pages for entry in page]
+    assert timestamps == [(start + timedelta(seconds=i)).isoformat() for i in range(25)]
+    # Only the listed fields are fetched, and each page continues after the previous one
+    assert set(pages[0][0]) == set(LOG_FIELDS)
+    searches = [call for call in fake_es.calls if call[0] == "search"]
+    assert [call[3] for call in searches][0] is None
+    assert all(call[3] is not None for call in searches[1:])
+    assert fake_es.pits == {}
+
+
+def test_search_pages_full_last_page_needs_one_empty_read(fake_es):
+    start = datetime(2024, 3, 1)
+    # Equal timestamps: the tiebreaker keeps pages from repeating or skipping entries
+    index_docs(fake_es, [log_doc(start, endpoint=f"/{i}") for i in range(20)])
+
+    pages = asyncio.run(collect_pages(fake_es, index_names(start, start), range_query(start, start), 10))
+
+    assert [len(page) for page in pages] == [10, 10]
+    assert sorted(entry["api_endpoint"] for page in pages for entry in page) == sorted(f"/{i}" for i in range(20))
+    assert len([call for call in fake_es.calls if call[0] == "search"]) == 3
+
+
+def test_search_pages_reads_a_point_in_time(fake_es):
+    start = datetime(2024, 3, 1)
+    index_docs(fake_es, [log_doc(start + timedelta(seconds=i)) for i in range(4)])
+
+    query = range_query(start, start + timedelta(hours=1))
+
+    async def scenario():
+        pages = []
+        async for page in search_pages(fake_es, index_names(start, start), query, 2):
+            pages.append(page)
+            # Indexed while paging: not part of this result
+            fake_es.add(index_name(start.isoformat()), log_doc(start))
+        return pages
+
+    assert sum(len(page) for page in asyncio.run(scenario())) == 4
+
+
+def test_search_pages_closes_the_pit_when_abandoned(fake_es):
+    start = datetime(2024, 3, 1)
+    index_docs(fake_es, [log_doc(start + timedelta(seconds=i)) for i in range(30)])
+
+    async def scenario():
+        pages = search_pages(fake_es, index_names(start, start), range_query(start, start + timedelta(hours=1)), 10)
+        first = await pages.__anext__()
+        await pages.aclose()
+        return first
+
+    assert len(asyncio.run(scenario())) == 10
+    assert fake_es.pits == {}
+
+
+def test_iter_logs_in_range_searches_only_overlapping_days(es_collector, fake_es):
+    midnight = datetime(2024, 3, 2)
+    index_docs(fake_es, [
+        log_doc(midnight - timedelta(days=1)),
+        log_doc(midnight - timedelta(minutes=1), endpoint="/b"),
+        log_doc(midnight + timedelta(minutes=1)),
+        log_doc(midnight + timedelta(minutes=2), status_code=500),
+    ])
+
+    async def scenario():
+        return [
+            page async for page in es_collector.iter_logs_in_range(
+                midnight - timedelta(minutes=5), midnight + timedelta(minutes=5), endpoint="/a"
+            )
+        ]
+
+    pages = asyncio.run(scenario())
+    assert [entry["timestamp"] for page in pages for entry in page] == [
+        (midnight + timedelta(minutes=1)).isoformat(), (midnight + timedelta(minutes=2)).isoformat()
+    ]
+    assert fake_es.calls[0] == ("open_point_in_time", "api-logs-2024-03-01,api-logs-2024-03-02")
+
+
+def test_get_logs_in_range_with_no_overlapping_index(es_collector, fake_es):
+    start = datetime(2024, 3, 1)
+    assert asyncio.run(es_collector.get_logs_in_range(start, start - timedelta(hours=1))) == []
+    assert fake_es.calls == []
+
+
+def test_minute_rollups_compute_the_detector_features(es_collector, fake_es):
+    start = datetime(2024, 3, 1, 12, 0)
+    docs = [
+        log_doc(start + timedelta(seconds=10), response_time=100.0),
+        log_doc(start + timedelta(seconds=20), response_time=300.0, status_code=500),
+        log_doc(start + timedelta(minutes=2, seconds=5), response_time=50.0),
+        log_doc(start + timedelta(minutes=2, seconds=6), endpoint="/b", response_time=900.0),
+    ]
+    index_docs(fake_es, docs)
+
+    frame = asyncio.run(es_collector.get_minute_rollups(start, start + timedelta(minutes=5), endpoint="/a"))
+
+    assert list(frame.columns) == FEATURE_COLUMNS
+    assert list(frame.index) == [pd.Timestamp(start), pd.Timestamp(start + timedelta(minutes=2))]
+    assert frame["request_rate"].tolist() == [2.0, 1.0]
+    assert frame["error_rate"].tolist() == [0.5, 0.0]
+    assert frame["response_time"].tolist() == [200.0, 50.0]
+    assert frame["p99_response_time"].iloc[1] == 50.0
+
+
+def test_minute_rollups_match_the_in_memory_aggregator(es_collector, fake_es):
+    start = datetime.utcnow().replace(second=0, microsecond=0) - timedelta(minutes=30)
+    rng = np.random.default_rng(7)
+    offsets = np.sort(rng.uniform(0, 20 * 60, 500))
+    docs = [
+        log_doc(start + timedelta(seconds=float(offset)), response_time=float(rt), status_code=int(code))
+        for offset, rt, code in zip(offsets, rng.lognormal(4.5, 0.3, 500), np.where(rng.random(500) < 0.1, 500, 200))
+    ]
+    index_docs(fake_es, docs)
+    aggregator = MinuteAggregator()
+    aggregator.update(
+        np.array([to_epoch_ns(datetime.fromisoformat(doc["timestamp"])) for doc in docs], dtype=np.int64),
+        np.array([doc["response_time"] for doc in docs]),
+        np.array([doc["status_code"] for doc in docs])
+    )
+
+    end = start + timedelta(minutes=30)
+    rollups = asyncio.run(es_collector.get_minute_rollups(start, end))
+    expected = aggregator.frame(start, end)
+
+    assert list(rollups.index) == list(expected.index)
+    for column in ("response_time", "error_rate", "request_rate"):
+        np.testing.assert_allclose(rollups[column].to_numpy(), expected[column].to_numpy())
+
+
+def test_minute_rollups_without_buckets_are_empty(es_collector, fake_es):
+    start = datetime(2024, 3, 1)
+    frame = asyncio.run(es_collector.get_minute_rollups(start, start + timedelta(hours=1)))
+    assert frame.empty and list(frame.columns) == FEATURE_COLUMNS
+    assert rollup_frame([]).empty
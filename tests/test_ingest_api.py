@@ -0,0 +1,81 @@
+import asyncio
+import gzip
+import orjson
+import pytest
+from fastapi import FastAPI
+from src.api import monitoring_api
+
+
+async def post(app, path, body, headers, chunk_size=1024):
+    """Send a POST through the ASGI app in chunks, returning (status, JSON body)"""
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] or [b""]
+    received = iter(
+        [{"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1} for i, chunk in enumerate(chunks)]
+    )
+    messages = []
+
+    async def receive():
+        return next(received, {"type": "http.disconnect"})
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+        "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80),
+    }
+    await app(scope, receive, send)
+    status = next(message["status"] for message in messages if message["type"] == "http.response.start")
+    body = b"".join(message.get("body", b"") for message in messages if message["type"] == "http.response.body")
+    return status, orjson.loads(body)
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(monitoring_api, "MAX_PAYLOAD_BYTES", 4096)
+    app = FastAPI()
+    app.include_router(monitoring_api.ingest_router, prefix="/api/v1")
+    return app
+
+
+def ndjson(count):
+    return b"\n".join(orjson.dumps({"endpoint": "/a", "response_time": i, "status_code": 200}) for i in range(count))
+
+
+def test_plain_body_within_the_limit_is_ingested(app):
+    status, body = asyncio.run(post(app, "/api/v1/logs", ndjson(10), {"content-type": "application/x-ndjson"}))
+    assert status == 200
+    assert body["rejected"] == 0
+
+
+def test_plain_body_over_the_limit_is_refused(app):
+    body = ndjson(200)
+    assert len(body) > 4096
+
+    declared = asyncio.run(post(app, "/api/v1/logs", body, {
+        "content-type": "application/x-ndjson", "content-length": str(len(body))
+    }))
+    # Chunked transfer: no Content-Length, so the bytes are counted as they arrive
+    streamed = asyncio.run(post(app, "/api/v1/logs", body, {"content-type": "application/x-ndjson"}))
+
+    assert declared[0] == streamed[0] == 413
+
+
+def test_gzip_body_is_limited_after_decompression(app):
+    body = gzip.compress(ndjson(200))
+    assert len(body) < 4096
+
+    status, _ = asyncio.run(post(app, "/api/v1/logs", body, {
+        "content-type": "application/x-ndjson", "content-encoding": "gzip"
+    }))
+    assert status == 413
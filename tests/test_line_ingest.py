@@ -0,0 +1,225 @@
+import asyncio
+import gzip
+import os
+import zlib
+import orjson
+import pytest
+from src.collectors.line_ingest import FileTailer, LineBatcher, gunzip_chunks, ingest_stream
+from src.collectors.log_collector import LogCollector
+
+
+class RecordingCollector:
+    """Collector stand-in that accepts every entry and records it"""
+
+    parse_log_line = staticmethod(LogCollector.parse_log_line)
+
+    def __init__(self):
+        self.entries = []
+
+    async def collect_batch(self, batch):
+        self.entries.extend(batch)
+        return len(batch), 0
+
+    @property
+    def lines(self):
+        return [entry["n"] for entry in self.entries]
+
+
+def lines(*numbers):
+    return b"".join(orjson.dumps({"n": n}) + b"\n" for n in numbers)
+
+
+async def chunked(data, size):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def collect(chunks):
+    return b"".join([chunk async for chunk in chunks])
+
+
+def test_batcher_splits_chunks_into_batches():
+    batcher = LineBatcher(orjson.loads, batch_size=3)
+    data = lines(*range(8))
+
+    batches = [batch for start in range(0, len(data), 5) for batch in batcher.feed(data[start:start + 5])]
+
+    assert [[entry["n"] for entry in batch] for batch in batches] == [[0, 1, 2], [3, 4, 5]]
+    assert [entry["n"] for entry in batcher.finish()] == [6, 7]
+    assert batcher.lines == 8
+
+
+def test_batcher_keeps_partial_lines_until_complete():
+    batcher = LineBatcher(orjson.loads)
+    assert list(batcher.feed(b'{"n": 1}\n{"n"')) == []
+    assert batcher.pending == 4
+    assert list(batcher.feed(b': 2}\n\n   \n{"n": 3}')) == []
+
+    assert [entry["n"] for entry in batcher.finish()] == [1, 2, 3]
+    assert batcher.pending == 0
+
+
+def test_batcher_rejects_overlong_and_invalid_lines():
+    batcher = LineBatcher(LogCollector.parse_log_line, max_line_bytes=20)
+    chunks = [b'{"n": 1}\n{"n": "', b"x" * 30, b'"}\n{"n": 2}\nnot json\n', b"y" * 15, b"z" * 15, b'\n{"n": 3}\n']
+
+    entries = [entry for chunk in chunks for batch in batcher.feed(chunk) for entry in batch]
+    entries += batcher.finish()
+
+    assert [entry["n"] for entry in entries] == [1, 2, 3]
+    assert batcher.rejected == 3
+    assert batcher.pending == 0
+
+
+def test_ingest_stream_counts_accepted_and_rejected():
+    collector = RecordingCollector()
+    data = lines(*range(10)) + b"garbage\n" + orjson.dumps({"n": 10})
+
+    assert asyncio.run(ingest_stream(collector, chunked(data, 7), batch_size=4)) == (11, 1)
+    assert collector.lines == list(range(11))
+
+
+def test_gunzip_chunks_handles_concatenated_members_and_small_reads():
+    data = lines(*range(1000))
+    body = gzip.compress(data[:5000]) + gzip.compress(data[5000:])
+
+    assert asyncio.run(collect(gunzip_chunks(chunked(body, 1)))) == data
+    assert asyncio.run(collect(gunzip_chunks(chunked(body, len(body))))) == data
+
+
+def test_gunzip_chunks_bounds_each_output_chunk():
+    data = b"\n" * 100_000
+
+    async def sizes():
+        return [len(chunk) async for chunk in gunzip_chunks(chunked(gzip.compress(data), 1 << 20), chunk_size=4096)]
+
+    result = asyncio.run(sizes())
+    assert sum(result) == len(data)
+    assert max(result) <= 4096
+
+
+def test_gunzip_chunks_rejects_truncated_and_invalid_streams():
+    body = gzip.compress(lines(*range(100)))
+    with pytest.raises(zlib.error):
+        asyncio.run(collect(gunzip_chunks(chunked(body[:-10], 16))))
+    with pytest.raises(zlib.error):
+        asyncio.run(collect(gunzip_chunks(chunked(b"not gzip at all", 16))))
+    assert asyncio.run(collect(gunzip_chunks(chunked(b"", 16)))) == b""
+
+
+def append(path, data):
+    with open(path, "ab") as f:
+        f.write(data)
+
+
+def make_tailer(tmp_path, collector, *patterns, **kwargs):
+    return FileTailer(
+        collector, [str(tmp_path / pattern) for pattern in patterns], str(tmp_path / "checkpoints.json"), **kwargs
+    )
+
+
+def test_tailer_reads_appended_lines_and_waits_for_complete_ones(tmp_path):
+    collector = RecordingCollector()
+    tailer = make_tailer(tmp_path, collector, "app.log", chunk_size=8)
+    append(tmp_path / "app.log", lines(1, 2) + b'{"n": 3')
+
+    asyncio.run(tailer.poll())
+    assert collector.lines == [1, 2]
+
+    append(tmp_path / "app.log", b"}\n" + lines(4))
+    asyncio.run(tailer.poll())
+    assert collector.lines == [1, 2, 3, 4]
+
+
+def test_tailer_reads_a_rotated_file_matched_by_the_pattern_once(tmp_path):
+    collector = RecordingCollector()
+    tailer = make_tailer(tmp_path, collector, "app.log*")
+    log = tmp_path / "app.log"
+    append(log, lines(1, 2))
+    asyncio.run(tailer.poll())
+
+    # Written just before the rename, then rotated and followed by a new file
+    append(log, lines(3))
+    os.rename(log, tmp_path / "app.log.1")
+    append(log, lines(4))
+    asyncio.run(tailer.poll())
+    append(log, lines(5))
+    asyncio.run(tailer.poll())
+
+    assert collector.lines == [1, 2, 3, 4, 5]
+    assert len(tailer.files) == 2
+
+
+def test_tailer_finishes_a_file_rotated_out_of_the_pattern(tmp_path):
+    collector = RecordingCollector()
+    tailer = make_tailer(tmp_path, collector, "app.log")
+    log = tmp_path / "app.log"
+    append(log, lines(1))
+    asyncio.run(tailer.poll())
+
+    append(log, lines(2) + b'{"n": 3}')
+    os.rename(log, tmp_path / "app.log.1")
+    append(log, lines(4))
+    asyncio.run(tailer.poll())
+
+    assert collector.lines == [1, 2, 3, 4]
+    assert len(tailer.files) == 1
+
+
+def test_tailer_rereads_a_truncated_file(tmp_path):
+    collector = RecordingCollector()
+    tailer = make_tailer(tmp_path, collector, "app.log")
+    log = tmp_path / "app.log"
+    append(log, lines(1, 2, 3))
+    asyncio.run(tailer.poll())
+
+    with open(log, "wb") as f:
+        f.write(lines(4))
+    asyncio.run(tailer.poll())
+
+    assert collector.lines == [1, 2, 3, 4]
+
+
+def test_tailer_resumes_from_checkpoints_after_a_restart(tmp_path):
+    log = tmp_path / "app.log"
+    append(log, lines(1, 2))
+    append(tmp_path / "other.log", lines(10))
+    first = RecordingCollector()
+
+    async def first_run():
+        tailer = make_tailer(tmp_path, first, "*.log*")
+        tailer.start()
+        await asyncio.sleep(0.1)
+        await tailer.stop()
+
+    asyncio.run(first_run())
+    assert sorted(first.lines) == [1, 2, 10]
+
+    # Rotated while stopped
+    append(log, lines(3))
+    os.rename(log, tmp_path / "app.log.1")
+    append(log, lines(4))
+    second = RecordingCollector()
+    tailer = make_tailer(tmp_path, second, "*.log*", start_at_end=True)
+    asyncio.run(tailer.poll())
+
+    # The renamed file resumes at its offset; files without a checkpoint start at the end
+    assert second.lines == [3]
+    append(tmp_path / "other.log", lines(11))
+    append(log, lines(5))
+    asyncio.run(tailer.poll())
+    assert sorted(second.lines) == [3, 5, 11]
+
+
+def test_tailer_reads_checkpoints_keyed_by_path(tmp_path):
+    log = tmp_path / "app.log"
+    append(log, lines(1, 2))
+    stat = os.stat(log)
+    (tmp_path / "checkpoints.json").write_bytes(orjson.dumps({
+        str(log): {"device": stat.st_dev, "inode": stat.st_ino, "offset": len(lines(1))}
+    }))
+    collector = RecordingCollector()
+
+    asyncio.run(make_tailer(tmp_path, collector, "app.log").poll())
+
+    assert collector.lines == [2]
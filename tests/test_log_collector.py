@@ -0,0 +1,42 @@
+import asyncio
+from datetime import datetime, timedelta
+import numpy as np
+from src.collectors.log_collector import LogCollector
+
+
+def test_collect_batch_rejects_invalid_response_times_and_status_codes():
+    collector = LogCollector(es_host=None)
+    observed = []
+    collector.add_listener(lambda timestamps, response_times, *rest: observed.extend(response_times))
+    now = datetime.utcnow().isoformat()
+    logs = [
+        {"timestamp": now, "response_time": 120.5, "status_code": 200},
+        {"timestamp": now, "response_time": "inf", "status_code": 200},
+        {"timestamp": now, "response_time": "-inf", "status_code": 200},
+        {"timestamp": now, "response_time": "nan", "status_code": 200},
+        {"timestamp": now, "response_time": -1, "status_code": 200},
+        {"timestamp": now, "response_time": "slow", "status_code": 200},
+        {"timestamp": now, "response_time": 80, "status_code": 1000},
+        {"timestamp": now, "response_time": 0, "status_code": 404},
+        "not an object",
+    ]
+
+    assert asyncio.run(collector.collect_batch(logs)) == (2, 7)
+    assert collector.rejected == 7
+    assert len(collector.store) == 2
+    assert observed == [120.5, 0.0]
+    assert np.isfinite(observed).all()
+
+
+def test_collect_batch_rejects_timestamps_outside_retention_and_clock_skew():
+    collector = LogCollector(es_host=None, retention_days=1)
+    now = datetime.utcnow()
+    logs = [
+        {"timestamp": (now - timedelta(hours=1)).isoformat(), "response_time": 1},
+        {"timestamp": (now - timedelta(days=2)).isoformat(), "response_time": 1},
+        {"timestamp": (now + timedelta(hours=1)).isoformat(), "response_time": 1},
+        {"response_time": 1},  # Missing timestamps default to now
+    ]
+
+    assert asyncio.run(collector.collect_batch(logs)) == (2, 2)
+    assert len(collector.store) == 2
@@ -0,0 +1,155 @@
+import numpy as np
+import pytest
+from src.collectors.log_store import LogStore
+
+
+def append_all(store, timestamps, endpoint="/a"):
+    for ts in timestamps:
+        store.append(int(ts), float(ts), 200, endpoint, "checkout", "test")
+
+
+def append_batch(store, timestamps, endpoints=None, status_codes=None):
+    n = len(timestamps)
+    store.append_batch(
+        np.asarray(timestamps, dtype=np.int64),
+        np.asarray(timestamps, dtype=np.float64),
+        np.asarray(status_codes if status_codes is not None else [200] * n),
+        endpoints or ["/a"] * n,
+        ["checkout"] * n,
+        ["test"] * n,
+        [None] * n
+    )
+
+
+def test_wraparound_keeps_the_newest_capacity_entries():
+    store = LogStore(capacity=5)
+    append_all(store, range(8))
+
+    assert len(store) == 5
+    assert store.oldest_timestamp() == 3
+    assert store.columns().timestamp.tolist() == [3, 4, 5, 6, 7]
+    # The ring now wraps at slot 3; ranges on either side and across it
+    assert store.columns(3, 4).timestamp.tolist() == [3, 4]
+    assert store.columns(6, 7).timestamp.tolist() == [6, 7]
+    assert store.columns(4, 6).timestamp.tolist() == [4, 5, 6]
+
+
+def test_range_within_one_segment_is_a_view():
+    store = LogStore(capacity=10)
+    append_batch(store, range(6))
+
+    columns = store.columns(1, 3)
+    assert columns.timestamp.tolist() == [1, 2, 3]
+    assert np.shares_memory(columns.timestamp, store.timestamps)
+
+
+def test_batches_larger_than_capacity_keep_the_newest():
+    store = LogStore(capacity=4)
+    append_batch(store, [1, 2])
+    append_batch(store, range(10, 20))
+
+    assert store.columns().timestamp.tolist() == [16, 17, 18, 19]
+    assert store.columns().response_time.tolist() == [16.0, 17.0, 18.0, 19.0]
+
+
+def test_late_entries_are_merged_in_time_order():
+    store = LogStore(capacity=10, merge_buffer_size=100)
+    append_all(store, [10, 20, 30, 40])
+    append_all(store, [25, 15], endpoint="/late")
+
+    # Parked in the merge buffer until the next read
+    assert len(store) == 6
+    columns = store.columns()
+    assert columns.timestamp.tolist() == [10, 15, 20, 25, 30, 40]
+    assert columns.response_time.tolist() == [10.0, 15.0, 20.0, 25.0, 30.0, 40.0]
+    assert store.columns(15, 25, endpoint="/late").timestamp.tolist() == [15, 25]
+
+    append_all(store, [50, 35])
+    assert store.columns(30).timestamp.tolist() == [30, 35, 40, 50]
+
+
+def test_full_merge_buffer_is_merged_on_append():
+    store = LogStore(capacity=10, merge_buffer_size=2)
+    append_all(store, [10, 20])
+    append_all(store, [5])
+    assert len(store._late) == 1
+    append_all(store, [6])
+    assert store._late == []
+    assert store.timestamps[:4].tolist() == [5, 6, 10, 20]
+
+
+def test_late_entries_older_than_a_full_ring_are_dropped():
+    store = LogStore(capacity=3)
+    append_all(store, [10, 20, 30, 40])
+    append_all(store, [15, 25])
+    append_batch(store, [5, 35])
+
+    assert store.columns().timestamp.tolist() == [30, 35, 40]
+
+
+def test_unsorted_batch_merges_with_the_ring_across_the_wrap_point():
+    store = LogStore(capacity=6)
+    append_batch(store, [1, 2, 3, 4, 5])
+    append_batch(store, [9, 6, 7, 8])  # wraps
+    append_batch(store, [8, 6, 10])
+
+    assert store.columns().timestamp.tolist() == [6, 7, 8, 8, 9, 10]
+    assert store.oldest_timestamp() == 6
+
+
+def test_empty_ranges():
+    store = LogStore(capacity=5)
+    assert len(store.columns()) == 0
+    assert store.oldest_timestamp() is None
+
+    append_all(store, [10, 20, 30])
+    assert len(store.columns(11, 19)) == 0
+    assert len(store.columns(40, 50)) == 0
+    assert len(store.columns(0, 5)) == 0
+    assert len(store.columns(30, 10)) == 0
+    assert len(store.columns(endpoint="/unknown")) == 0
+    assert store.columns(10, 30, endpoint="/a", status_code=500).timestamp.tolist() == []
+
+
+def test_filters_and_records():
+    store = LogStore(capacity=10)
+    append_batch(store, [1, 2, 3, 4], endpoints=["/a", "/b", "/a", "/b"], status_codes=[200, 500, 500, 200])
+
+    assert store.columns(endpoint="/b").timestamp.tolist() == [2, 4]
+    assert store.columns(status_code=500).timestamp.tolist() == [2, 3]
+    assert store.columns(2, 3, endpoint="/a").timestamp.tolist() == [3]
+    records = store.to_records(store.columns(endpoint="/b", status_code=500))
+    assert records == [{
+        "timestamp": "1970-01-01T00:00:00.000000",
+        "environment": "test",
+        "service": "checkout",
+        "api_endpoint": "/b",
+        "response_time": 2.0,
+        "status_code": 500,
+        "error": None
+    }]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_a_sorted_reference_under_random_appends(seed):
+    rng = np.random.default_rng(seed)
+    store = LogStore(capacity=50, merge_buffer_size=7)
+    reference = []
+    # Distinct timestamps, mostly increasing with some late arrivals
+    timestamps = iter(np.argsort(np.arange(5000) + rng.normal(0, 20, 5000)))
+    for _ in range(200):
+        if rng.random() < 0.5:
+            ts = int(next(timestamps))
+            append_all(store, [ts])
+            batch = [ts]
+        else:
+            batch = [int(next(timestamps)) for _ in range(rng.integers(1, 40))]
+            append_batch(store, batch)
+        reference = sorted(reference + batch)[-50:]
+
+        if rng.random() < 0.2:
+            lo, hi = sorted(rng.choice(reference, 2))
+            assert store.columns(lo, hi).timestamp.tolist() == [ts for ts in reference if lo <= ts <= hi]
+
+    assert store.columns().timestamp.tolist() == reference
+    assert store.columns().response_time.tolist() == [float(ts) for ts in reference]
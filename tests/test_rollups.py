@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from src.analyzers.rollups import MetricsRollup
+from src.collectors.log_store import to_epoch_ns
+
+
+def ring_bytes(rings):
+    return sum(
+        ring.buckets.nbytes + ring.totals.nbytes + ring.mins.nbytes + ring.maxs.nbytes + ring.sketches.nbytes
+        for ring in rings.values()
+    )
+
+
+def test_endpoint_series_memory_is_bounded():
+    rollup = MetricsRollup()
+    now = to_epoch_ns(datetime.utcnow())
+    n = 2 * rollup.max_series
+    rollup.update(
+        np.full(n, now), np.full(n, 100.0), np.full(n, 200), [f"/{i}" for i in range(n)], ["checkout"] * n
+    )
+
+    assert len(rollup) == rollup.max_series
+    total = ring_bytes(rollup.overall) + sum(ring_bytes(rings) for rings in rollup.series.values())
+    assert total < 30_000_000
+
+
+def test_endpoint_queries_choose_a_resolution_the_series_retains():
+    rollup = MetricsRollup()
+    start = datetime.utcnow() - timedelta(hours=12)
+    end = start + timedelta(hours=1)
+    rollup.update(
+        np.array([to_epoch_ns(start + timedelta(minutes=30))]), np.array([100.0]), np.array([200]),
+        ["/a"], ["checkout"]
+    )
+
+    assert rollup.choose_resolution(start, end) == "1m"
+    assert rollup.choose_resolution(start, end, per_series=True) == "1h"
+    assert rollup.query(start, end, "1h", endpoint="/a")[0]["count"] == 1
+    assert rollup.query(start, end, "1m")[0]["count"] == 1
+
+
+def test_series_resolutions_must_match_the_bucket_widths():
+    with pytest.raises(ValueError):
+        MetricsRollup(series_resolutions={"10s": (10, 60)})
@@ -0,0 +1,181 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from src.collectors.log_collector import LogCollector
+from src.collectors.log_store import to_epoch_ns
+from src.collectors.segment_store import SUFFIX, Segment, SegmentStore
+
+NS_PER_HOUR = 3600 * 1_000_000_000
+
+
+def batch(timestamps, endpoint="/a", status_code=200, error=None):
+    n = len(timestamps)
+    return (
+        np.asarray(timestamps, dtype=np.int64),
+        np.asarray(timestamps, dtype=np.float64) % 1000,
+        np.full(n, status_code, dtype=np.int16),
+        [endpoint] * n,
+        ["checkout"] * n,
+        ["test"] * n,
+        [error] * n
+    )
+
+
+def write(store, *batches):
+    """Append and flush each batch in turn, one flush per batch"""
+    async def scenario():
+        store.start()
+        for entries in batches:
+            store.append_batch(*entries)
+            await store.flush()
+        await store.stop()
+
+    asyncio.run(scenario())
+
+
+def segment_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(SUFFIX))
+
+
+def test_flush_writes_one_segment_per_partition(tmp_path):
+    store = SegmentStore(str(tmp_path))
+    base = 1000 * NS_PER_HOUR
+    write(store, batch([base + NS_PER_HOUR + 1, base + 5, base + 2 * NS_PER_HOUR, base + 3]))
+
+    assert [name.split("-")[0] for name in segment_files(tmp_path)] == ["00001000", "00001001", "00001002"]
+    assert [segment.count for segment in store.segments] == [2, 1, 1]
+    assert store.pending == 0
+    timestamps = store.read(base, base + 3 * NS_PER_HOUR)[0]
+    assert timestamps.tolist() == [base + 3, base + 5, base + NS_PER_HOUR + 1, base + 2 * NS_PER_HOUR]
+
+
+def test_read_merges_segments_and_buffered_entries_with_filters(tmp_path):
+    store = SegmentStore(str(tmp_path))
+    write(store, batch([10, 30], endpoint="/a"), batch([20], endpoint="/b", status_code=500, error="boom"))
+    store.append_batch(*batch([15, 40], endpoint="/b"))
+
+    timestamps, response_times, status_codes, endpoints, services, environments, errors = store.read(0, 35)
+    assert timestamps.tolist() == [10, 15, 20, 30]
+    assert endpoints == ["/a", "/b", "/b", "/a"]
+    assert errors == [None, None, "boom", None]
+    assert store.read(0, 100, endpoint="/b")[0].tolist() == [15, 20, 40]
+    assert store.read(0, 100, endpoint="/b", status_code=500)[3] == ["/b"]
+    assert store.read(0, 100, service="unknown")[0].tolist() == []
+    assert store.read(50, 100)[0].tolist() == []
+
+
+def test_restart_loads_segments_and_reads_the_latest(tmp_path):
+    store = SegmentStore(str(tmp_path), partition_seconds=1)
+    write(store, *(batch(np.arange(i * 100, i * 100 + 100) * 10_000_000) for i in range(5)))
+    (tmp_path / "00000099-00000099.seg.tmp").write_bytes(b"interrupted")
+    (tmp_path / "00000099-00000100.seg").write_bytes(b"not a segment")
+
+    reopened = SegmentStore(str(tmp_path), partition_seconds=1)
+
+    assert len(reopened) == 500
+    assert not (tmp_path / "00000099-00000099.seg.tmp").exists()
+    latest = reopened.read_latest(0, 150)
+    assert latest[0].tolist() == (np.arange(350, 500) * 10_000_000).tolist()
+    assert reopened.read_latest(480 * 10_000_000, 150)[0].tolist() == (np.arange(480, 500) * 10_000_000).tolist()
+    assert len(reopened.read_latest(0, 0)[0]) == 0
+    # New segments do not reuse the sequence numbers of loaded ones
+    write(reopened, batch([600 * 10_000_000]))
+    assert len(set(name.split("-")[1] for name in segment_files(tmp_path))) == len(segment_files(tmp_path))
+
+
+def test_collector_replays_the_latest_segments_after_a_restart(tmp_path):
+    now = datetime.utcnow()
+    logs = [
+        {"timestamp": (now - timedelta(minutes=i)).isoformat(), "endpoint": f"/{i % 3}", "response_time": i}
+        for i in range(30)
+    ]
+
+    async def first_run():
+        collector = LogCollector(es_host=None, data_dir=str(tmp_path))
+        collector.start()
+        await collector.collect_batch(logs)
+        await collector.cleanup()
+
+    async def second_run():
+        collector = LogCollector(es_host=None, data_dir=str(tmp_path), store_capacity=20)
+        replayed = []
+        collector.add_listener(lambda timestamps, *rest: replayed.extend(timestamps.tolist()))
+        collector.start()
+        await collector.cleanup()
+        return collector, replayed
+
+    asyncio.run(first_run())
+    collector, replayed = asyncio.run(second_run())
+
+    expected = sorted(to_epoch_ns(now - timedelta(minutes=i)) for i in range(20))
+    assert collector.store.columns().timestamp.tolist() == expected
+    assert replayed == expected
+
+
+def test_compaction_merges_closed_partitions(tmp_path):
+    store = SegmentStore(str(tmp_path), compact_entries=250)
+    old = to_epoch_ns(datetime.utcnow()) - 5 * NS_PER_HOUR
+    write(store, *(batch(old + np.arange(i, 500, 5)) for i in range(5)))
+    current = to_epoch_ns(datetime.utcnow())
+    write(store, batch([current]), batch([current + 1]))
+    before = store.read(0, current + 1)
+
+    asyncio.run(store.compact())
+
+    # Groups stay within compact_entries; the open partition is left alone
+    assert sorted(segment.count for segment in store.segments) == [1, 1, 100, 200, 200]
+    assert len(segment_files(tmp_path)) == 5
+    after = store.read(0, current + 1)
+    assert after[0].tolist() == before[0].tolist()
+    assert after[1].tolist() == before[1].tolist()
+
+
+def test_expire_deletes_segments_past_retention(tmp_path):
+    store = SegmentStore(str(tmp_path), retention_days=1)
+    now = 100 * 24 * NS_PER_HOUR
+    write(store, batch([now - 30 * NS_PER_HOUR]), batch([now - 2 * NS_PER_HOUR]))
+
+    store.expire(now)
+
+    assert [segment.max_ts for segment in store.segments] == [now - 2 * NS_PER_HOUR]
+    assert len(segment_files(tmp_path)) == 1
+
+
+def test_failed_flush_keeps_only_unwritten_partitions(tmp_path, monkeypatch):
+    store = SegmentStore(str(tmp_path))
+    write_segment = Segment.write
+
+    def fail_second_partition(segment, path):
+        if segment.min_ts >= NS_PER_HOUR:
+            raise OSError("disk full")
+        write_segment(segment, path)
+
+    async def scenario():
+        store.start()
+        store.append_batch(*batch([1, NS_PER_HOUR + 1, 2]))
+        monkeypatch.setattr(Segment, "write", fail_second_partition)
+        with pytest.raises(OSError):
+            await store.flush()
+        assert store.pending == 1
+        monkeypatch.setattr(Segment, "write", write_segment)
+        await store.stop()
+
+    asyncio.run(scenario())
+    assert store.read(0, 2 * NS_PER_HOUR)[0].tolist() == [1, 2, NS_PER_HOUR + 1]
+    assert len(segment_files(tmp_path)) == 2
+
+
+def test_mapped_segments_are_bounded(tmp_path):
+    store = SegmentStore(str(tmp_path), max_open_segments=2)
+    write(store, *(batch([i * 10, i * 10 + 1]) for i in range(6)))
+    reopened = SegmentStore(str(tmp_path), max_open_segments=2)
+    assert not any(segment.mapped for segment in reopened.segments)
+
+    assert len(reopened.read(0, 100)[0]) == 12
+    assert sum(segment.mapped for segment in reopened.segments) == 2
+    assert len(reopened.read_latest(0, 12)[0]) == 12
+    assert sum(segment.mapped for segment in reopened.segments) == 2
+    # Unmapped segments are mapped again when read
+    assert reopened.read(0, 1)[0].tolist() == [0, 1]